@@ -14,7 +14,7 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 class Ui_PlacesQgisDialogBase(object):
     def setupUi(self, PlacesQgisDialogBase):
         PlacesQgisDialogBase.setObjectName("PlacesQgisDialogBase")
-        PlacesQgisDialogBase.resize(490, 661)
+        PlacesQgisDialogBase.resize(980, 861)
         self.gapiKey = QtWidgets.QLineEdit(PlacesQgisDialogBase)
         self.gapiKey.setGeometry(QtCore.QRect(160, 10, 321, 31))
         self.gapiKey.setObjectName("gapiKey")
@@ -115,6 +115,120 @@ class Ui_PlacesQgisDialogBase(object):
         self.photosUsage = QtWidgets.QLabel(PlacesQgisDialogBase)
         self.photosUsage.setGeometry(QtCore.QRect(430, 620, 51, 31))
         self.photosUsage.setObjectName("photosUsage")
+        self.label_13 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_13.setGeometry(QtCore.QRect(210, 240, 91, 31))
+        self.label_13.setObjectName("label_13")
+        self.apiBackend = QtWidgets.QComboBox(PlacesQgisDialogBase)
+        self.apiBackend.setGeometry(QtCore.QRect(300, 240, 181, 31))
+        self.apiBackend.setObjectName("apiBackend")
+        self.apiBackend.addItem("")
+        self.apiBackend.addItem("")
+        self.label_14 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_14.setGeometry(QtCore.QRect(500, 10, 161, 31))
+        self.label_14.setObjectName("label_14")
+        self.minRating = QtWidgets.QLineEdit(PlacesQgisDialogBase)
+        self.minRating.setGeometry(QtCore.QRect(670, 10, 301, 31))
+        self.minRating.setObjectName("minRating")
+        self.label_15 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_15.setGeometry(QtCore.QRect(500, 60, 161, 31))
+        self.label_15.setObjectName("label_15")
+        self.minRatingsTotal = QtWidgets.QLineEdit(PlacesQgisDialogBase)
+        self.minRatingsTotal.setGeometry(QtCore.QRect(670, 60, 301, 31))
+        self.minRatingsTotal.setObjectName("minRatingsTotal")
+        self.twoPassDetails = QtWidgets.QCheckBox(PlacesQgisDialogBase)
+        self.twoPassDetails.setGeometry(QtCore.QRect(500, 110, 471, 31))
+        self.twoPassDetails.setObjectName("twoPassDetails")
+        self.label_16 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_16.setGeometry(QtCore.QRect(500, 160, 161, 31))
+        self.label_16.setObjectName("label_16")
+        self.placeTypes = QtWidgets.QLineEdit(PlacesQgisDialogBase)
+        self.placeTypes.setGeometry(QtCore.QRect(670, 160, 301, 31))
+        self.placeTypes.setObjectName("placeTypes")
+        self.matchKeywordLocally = QtWidgets.QCheckBox(PlacesQgisDialogBase)
+        self.matchKeywordLocally.setGeometry(QtCore.QRect(500, 210, 471, 31))
+        self.matchKeywordLocally.setObjectName("matchKeywordLocally")
+        self.label_17 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_17.setGeometry(QtCore.QRect(500, 260, 161, 31))
+        self.label_17.setObjectName("label_17")
+        self.aoiLayer = QtWidgets.QComboBox(PlacesQgisDialogBase)
+        self.aoiLayer.setGeometry(QtCore.QRect(670, 260, 301, 31))
+        self.aoiLayer.setObjectName("aoiLayer")
+        self.aoiSelectedOnly = QtWidgets.QCheckBox(PlacesQgisDialogBase)
+        self.aoiSelectedOnly.setGeometry(QtCore.QRect(670, 300, 301, 31))
+        self.aoiSelectedOnly.setObjectName("aoiSelectedOnly")
+        self.label_18 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_18.setGeometry(QtCore.QRect(500, 350, 161, 31))
+        self.label_18.setObjectName("label_18")
+        self.batchFilePath = QtWidgets.QLineEdit(PlacesQgisDialogBase)
+        self.batchFilePath.setGeometry(QtCore.QRect(670, 350, 261, 31))
+        self.batchFilePath.setObjectName("batchFilePath")
+        self.batchFilePicker = QtWidgets.QPushButton(PlacesQgisDialogBase)
+        self.batchFilePicker.setGeometry(QtCore.QRect(940, 350, 31, 31))
+        self.batchFilePicker.setObjectName("batchFilePicker")
+        self.batchStartButton = QtWidgets.QPushButton(PlacesQgisDialogBase)
+        self.batchStartButton.setGeometry(QtCore.QRect(500, 390, 471, 31))
+        self.batchStartButton.setObjectName("batchStartButton")
+        self.label_19 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_19.setGeometry(QtCore.QRect(500, 440, 161, 31))
+        self.label_19.setObjectName("label_19")
+        self.maxConcurrentJobs = QtWidgets.QLineEdit(PlacesQgisDialogBase)
+        self.maxConcurrentJobs.setGeometry(QtCore.QRect(670, 440, 91, 31))
+        self.maxConcurrentJobs.setObjectName("maxConcurrentJobs")
+        self.label_20 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_20.setGeometry(QtCore.QRect(770, 440, 101, 31))
+        self.label_20.setObjectName("label_20")
+        self.maxQps = QtWidgets.QLineEdit(PlacesQgisDialogBase)
+        self.maxQps.setGeometry(QtCore.QRect(880, 440, 91, 31))
+        self.maxQps.setObjectName("maxQps")
+        self.jobTable = QtWidgets.QTableWidget(PlacesQgisDialogBase)
+        self.jobTable.setGeometry(QtCore.QRect(500, 480, 471, 121))
+        self.jobTable.setObjectName("jobTable")
+        self.jobTable.setColumnCount(0)
+        self.jobTable.setRowCount(0)
+        self.cancelJobButton = QtWidgets.QPushButton(PlacesQgisDialogBase)
+        self.cancelJobButton.setGeometry(QtCore.QRect(500, 610, 231, 31))
+        self.cancelJobButton.setObjectName("cancelJobButton")
+        self.clearJobsButton = QtWidgets.QPushButton(PlacesQgisDialogBase)
+        self.clearJobsButton.setGeometry(QtCore.QRect(740, 610, 231, 31))
+        self.clearJobsButton.setObjectName("clearJobsButton")
+        self.label_21 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_21.setGeometry(QtCore.QRect(10, 660, 161, 31))
+        self.label_21.setObjectName("label_21")
+        self.detailsPriority = QtWidgets.QComboBox(PlacesQgisDialogBase)
+        self.detailsPriority.setGeometry(QtCore.QRect(170, 660, 311, 31))
+        self.detailsPriority.setObjectName("detailsPriority")
+        self.detailsPriority.addItem("")
+        self.detailsPriority.addItem("")
+        self.detailsPriority.addItem("")
+        self.detailsPriority.addItem("")
+        self.detailsPriority.addItem("")
+        self.lazyPhotos = QtWidgets.QCheckBox(PlacesQgisDialogBase)
+        self.lazyPhotos.setGeometry(QtCore.QRect(500, 660, 471, 31))
+        self.lazyPhotos.setObjectName("lazyPhotos")
+        self.label_22 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_22.setGeometry(QtCore.QRect(10, 710, 161, 31))
+        self.label_22.setObjectName("label_22")
+        self.photoSize = QtWidgets.QComboBox(PlacesQgisDialogBase)
+        self.photoSize.setGeometry(QtCore.QRect(170, 710, 311, 31))
+        self.photoSize.setObjectName("photoSize")
+        self.photoSize.addItem("")
+        self.photoSize.addItem("")
+        self.photoSize.addItem("")
+        self.packPhotos = QtWidgets.QCheckBox(PlacesQgisDialogBase)
+        self.packPhotos.setGeometry(QtCore.QRect(500, 710, 471, 31))
+        self.packPhotos.setObjectName("packPhotos")
+        self.incrementalHarvest = QtWidgets.QCheckBox(PlacesQgisDialogBase)
+        self.incrementalHarvest.setGeometry(QtCore.QRect(10, 760, 471, 31))
+        self.incrementalHarvest.setObjectName("incrementalHarvest")
+        self.loadHarvestButton = QtWidgets.QPushButton(PlacesQgisDialogBase)
+        self.loadHarvestButton.setGeometry(QtCore.QRect(500, 760, 471, 31))
+        self.loadHarvestButton.setObjectName("loadHarvestButton")
+        self.label_23 = QtWidgets.QLabel(PlacesQgisDialogBase)
+        self.label_23.setGeometry(QtCore.QRect(10, 810, 161, 31))
+        self.label_23.setObjectName("label_23")
+        self.memoryBudget = QtWidgets.QLineEdit(PlacesQgisDialogBase)
+        self.memoryBudget.setGeometry(QtCore.QRect(170, 810, 311, 31))
+        self.memoryBudget.setObjectName("memoryBudget")
 
         self.retranslateUi(PlacesQgisDialogBase)
         QtCore.QMetaObject.connectSlotsByName(PlacesQgisDialogBase)
@@ -145,3 +259,37 @@ class Ui_PlacesQgisDialogBase(object):
         self.nearbysearchUsage.setText(_translate("PlacesQgisDialogBase", "-"))
         self.reviewsUsage.setText(_translate("PlacesQgisDialogBase", "-"))
         self.photosUsage.setText(_translate("PlacesQgisDialogBase", "-"))
+        self.label_13.setText(_translate("PlacesQgisDialogBase", "places api"))
+        self.apiBackend.setItemText(0, _translate("PlacesQgisDialogBase", "legacy"))
+        self.apiBackend.setItemText(1, _translate("PlacesQgisDialogBase", "new"))
+        self.label_14.setText(_translate("PlacesQgisDialogBase", "min rating"))
+        self.label_15.setText(_translate("PlacesQgisDialogBase", "min ratings count"))
+        self.twoPassDetails.setText(_translate("PlacesQgisDialogBase", "fetch reviews in a second pass (new api)"))
+        self.label_16.setText(_translate("PlacesQgisDialogBase", "place types"))
+        self.matchKeywordLocally.setText(_translate("PlacesQgisDialogBase", "keyword must match place name or type"))
+        self.label_17.setText(_translate("PlacesQgisDialogBase", "search area"))
+        self.aoiSelectedOnly.setText(_translate("PlacesQgisDialogBase", "selected features only"))
+        self.label_18.setText(_translate("PlacesQgisDialogBase", "batch file"))
+        self.batchFilePicker.setText(_translate("PlacesQgisDialogBase", "..."))
+        self.batchStartButton.setText(_translate("PlacesQgisDialogBase", "START BATCH"))
+        self.label_19.setText(_translate("PlacesQgisDialogBase", "concurrent jobs"))
+        self.maxConcurrentJobs.setText(_translate("PlacesQgisDialogBase", "2"))
+        self.label_20.setText(_translate("PlacesQgisDialogBase", "requests / sec"))
+        self.maxQps.setText(_translate("PlacesQgisDialogBase", "10"))
+        self.cancelJobButton.setText(_translate("PlacesQgisDialogBase", "CANCEL SELECTED"))
+        self.clearJobsButton.setText(_translate("PlacesQgisDialogBase", "CLEAR FINISHED"))
+        self.label_21.setText(_translate("PlacesQgisDialogBase", "details priority"))
+        self.detailsPriority.setItemText(0, _translate("PlacesQgisDialogBase", "arrival order"))
+        self.detailsPriority.setItemText(1, _translate("PlacesQgisDialogBase", "distance to centre"))
+        self.detailsPriority.setItemText(2, _translate("PlacesQgisDialogBase", "ratings count"))
+        self.detailsPriority.setItemText(3, _translate("PlacesQgisDialogBase", "rating"))
+        self.detailsPriority.setItemText(4, _translate("PlacesQgisDialogBase", "type match"))
+        self.lazyPhotos.setText(_translate("PlacesQgisDialogBase", "fetch photos only when a place is opened"))
+        self.label_22.setText(_translate("PlacesQgisDialogBase", "photo size"))
+        self.photoSize.setItemText(0, _translate("PlacesQgisDialogBase", "preview (1600 px)"))
+        self.photoSize.setItemText(1, _translate("PlacesQgisDialogBase", "thumbnail (400 px)"))
+        self.photoSize.setItemText(2, _translate("PlacesQgisDialogBase", "full size"))
+        self.packPhotos.setText(_translate("PlacesQgisDialogBase", "pack photos into one photos.sqlite file"))
+        self.incrementalHarvest.setText(_translate("PlacesQgisDialogBase", "incremental: fetch only new or changed places"))
+        self.loadHarvestButton.setText(_translate("PlacesQgisDialogBase", "LOAD PREVIOUS HARVEST"))
+        self.label_23.setText(_translate("PlacesQgisDialogBase", "memory budget (MB)"))
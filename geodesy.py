@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    vectorized geodesy helpers working on numpy arrays of WGS84 degrees:
+    distances, bounding boxes, circles, point in polygon, covering of
+    areas with search circles and the tile grid of the search cache.
+    polygons are given as a list of rings, each an (n, 2) array-like of
+    (longitude, latitude) vertices; parts and holes are resolved with the
+    even-odd rule. every function takes a million points in well under a
+    second.
+"""
+
+import numpy as np
+
+EARTH_RADIUS = 6_371_008.8      # mean earth radius in metres
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great circle distance in metres; arguments broadcast like numpy arrays."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def destination(lat, lon, bearing, distance):
+    """(lats, lons) reached from (lat, lon) after distance metres on the
+    initial bearing in degrees; arguments broadcast like numpy arrays."""
+    lat, lon, bearing = map(np.radians, (lat, lon, bearing))
+    angle = np.asarray(distance, dtype=float) / EARTH_RADIUS
+    lat2 = np.arcsin(np.sin(lat) * np.cos(angle) + np.cos(lat) * np.sin(angle) * np.cos(bearing))
+    lon2 = lon + np.arctan2(np.sin(bearing) * np.sin(angle) * np.cos(lat), np.cos(angle) - np.sin(lat) * np.sin(lat2))
+    return np.degrees(lat2), (np.degrees(lon2) + 540) % 360 - 180
+
+
+def circle_polygon(lat, lon, radius, segments=64):
+    """(lats, lons) of the vertices of the circle of radius metres around
+    (lat, lon), clockwise from north."""
+    return destination(lat, lon, np.arange(segments) * 360 / segments, radius)
+
+
+def bounding_box(lats, lons):
+    """(latMin, lonMin, latMax, lonMax) of points."""
+    lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+    return lats.min(), lons.min(), lats.max(), lons.max()
+
+
+def circle_bbox(lat, lon, radius):
+    """(latMin, lonMin, latMax, lonMax) around circles of radius metres;
+    arguments broadcast like numpy arrays."""
+    lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    latSpan = np.degrees(np.asarray(radius, dtype=float) / EARTH_RADIUS)
+    lonSpan = latSpan / np.maximum(np.cos(np.radians(lat)), 1e-12)
+    return lat - latSpan, lon - lonSpan, lat + latSpan, lon + lonSpan
+
+
+def _rings(polygon):
+    return [np.asarray(ring, dtype=float).reshape(-1, 2) for ring in polygon]
+
+
+def points_in_polygon(lats, lons, polygon):
+    """Boolean mask of the points lying inside polygon."""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    inside = np.zeros(lats.shape, dtype=bool)
+    rings = _rings(polygon)
+    if lats.size == 0 or len(rings) == 0:
+        return inside
+
+    # only points within the bounding box can be inside; they are sorted by latitude
+    # so that the points level with an edge are one slice instead of a full scan
+    lonMin, latMin = np.concatenate(rings).min(axis=0)
+    lonMax, latMax = np.concatenate(rings).max(axis=0)
+    candidates = np.flatnonzero((lats >= latMin) & (lats <= latMax) & (lons >= lonMin) & (lons <= lonMax))
+    order = candidates[np.argsort(lats[candidates], kind='stable')]
+    sortedLats, sortedLons = lats[order], lons[order]
+    sortedInside = np.zeros(order.shape, dtype=bool)
+
+    for ring in rings:
+        x1, y1 = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        # the points in [min(y1, y2), max(y1, y2)) of every edge
+        starts = np.searchsorted(sortedLats, np.minimum(y1, y2), 'left')
+        ends = np.searchsorted(sortedLats, np.maximum(y1, y2), 'left')
+        for i in np.flatnonzero(ends > starts):
+            # edges crossed by a ray running east from the point
+            a, b = starts[i], ends[i]
+            xIntersect = (x2[i] - x1[i]) * (sortedLats[a:b] - y1[i]) / (y2[i] - y1[i]) + x1[i]
+            sortedInside[a:b] ^= sortedLons[a:b] < xIntersect
+
+    inside[order] = sortedInside
+    return inside
+
+
+class _LocalProjection:
+    # equirectangular projection in metres around a reference point;
+    # accurate enough for areas the size of a city or district
+    def __init__(self, lat0, lon0):
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.kx = np.radians(1) * EARTH_RADIUS * np.cos(np.radians(lat0))
+        self.ky = np.radians(1) * EARTH_RADIUS
+
+    def forward(self, lats, lons):
+        return (np.asarray(lons) - self.lon0) * self.kx, (np.asarray(lats) - self.lat0) * self.ky
+
+    def inverse(self, x, y):
+        return self.lat0 + np.asarray(y) / self.ky, self.lon0 + np.asarray(x) / self.kx
+
+
+def _distance_to_edges(px, py, rings):
+    # minimum distance from each point to any polygon edge (projected metres)
+    dist = np.full(px.shape, np.inf)
+    for x1, y1 in rings:
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        for i in range(len(x1)):
+            dx, dy = x2[i] - x1[i], y2[i] - y1[i]
+            length = dx * dx + dy * dy
+            t = 0.0 if length == 0 else np.clip(((px - x1[i]) * dx + (py - y1[i]) * dy) / length, 0, 1)
+            dist = np.minimum(dist, np.hypot(px - (x1[i] + t * dx), py - (y1[i] + t * dy)))
+    return dist
+
+
+def cover_polygon(polygon, radius):
+    """Centres (lats, lons) of circles of radius metres that together cover
+    polygon. circles are laid on a hexagonal grid, the sparsest regular
+    arrangement that leaves no gaps, and only those touching the polygon
+    are kept."""
+    if not radius > 0:
+        # the grid step would be zero
+        raise ValueError(f"radius must be positive to cover a polygon, not {radius}")
+    rings = _rings(polygon)
+    allVertices = np.concatenate(rings)
+    lonMin, latMin = allVertices.min(axis=0)
+    lonMax, latMax = allVertices.max(axis=0)
+
+    proj = _LocalProjection((latMin + latMax) / 2, (lonMin + lonMax) / 2)
+    projRings = [proj.forward(ring[:, 1], ring[:, 0]) for ring in rings]
+    xMin, yMin = proj.forward(latMin, lonMin)
+    xMax, yMax = proj.forward(latMax, lonMax)
+
+    # a single circle suffices when it contains the whole bounding box
+    if np.hypot(xMax - xMin, yMax - yMin) / 2 <= radius:
+        return np.array([(latMin + latMax) / 2]), np.array([(lonMin + lonMax) / 2])
+
+    dx = np.sqrt(3) * radius
+    dy = 1.5 * radius
+    rows = np.arange(yMin - radius, yMax + dy + radius, dy)
+    cols = np.arange(xMin - radius, xMax + dx + radius, dx)
+    gx, gy = np.meshgrid(cols, rows)
+    # shift every other row by half a column
+    gx = gx + (np.arange(len(rows)) % 2)[:, None] * dx / 2
+    gx, gy = gx.ravel(), gy.ravel()
+
+    lats, lons = proj.inverse(gx, gy)
+    keep = points_in_polygon(lats, lons, polygon) | (_distance_to_edges(gx, gy, projRings) <= radius)
+
+    return lats[keep], lons[keep]
+
+
+def cover_circle(lat, lon, radius, circleRadius, segments=64):
+    """Centres (lats, lons) of circles of circleRadius metres that together
+    cover the circle of radius metres around (lat, lon)."""
+    # the polygon is inscribed; push its vertices out so that its edges reach the circle
+    lats, lons = circle_polygon(lat, lon, radius / np.cos(np.pi / segments), segments)
+    return cover_polygon([np.column_stack((lons, lats))], circleRadius)
+
+
+def tile_index(lats, lons, level):
+    """(rows, cols) of the tiles holding the points on the 2**level x 2**level
+    grid of equal-angle latitude/longitude cells; for even bit counts these
+    are the cells of a geohash of level * 2 bits."""
+    count = 2 ** level
+    rows = np.clip(((np.asarray(lats, dtype=float) + 90) / 180 * count).astype(int), 0, count - 1)
+    cols = np.clip(((np.asarray(lons, dtype=float) + 180) / 360 * count).astype(int), 0, count - 1)
+    return rows, cols
+
+
+def tile_bounds(rows, cols, level):
+    """(latMin, lonMin, latMax, lonMax) of tiles."""
+    latSize, lonSize = 180 / 2 ** level, 360 / 2 ** level
+    rows, cols = np.asarray(rows), np.asarray(cols)
+    return rows * latSize - 90, cols * lonSize - 180, (rows + 1) * latSize - 90, (cols + 1) * lonSize - 180
+
+
+def tiles_in_circle(lat, lon, radius, level):
+    """Tiles touching the circle of radius metres around (lat, lon), as
+    (rows, cols, inside) where inside marks the tiles lying entirely
+    within the circle."""
+    proj = _LocalProjection(lat, lon)
+    latMin, lonMin, latMax, lonMax = circle_bbox(lat, lon, radius)
+    rowMin, colMin = tile_index(latMin, lonMin, level)
+    rowMax, colMax = tile_index(latMax, lonMax, level)
+    rows, cols = np.meshgrid(np.arange(rowMin, rowMax + 1), np.arange(colMin, colMax + 1), indexing='ij')
+    rows, cols = rows.ravel(), cols.ravel()
+
+    latMin, lonMin, latMax, lonMax = tile_bounds(rows, cols, level)
+    x1, y1 = proj.forward(latMin, lonMin)
+    x2, y2 = proj.forward(latMax, lonMax)
+
+    # nearest and farthest point of each tile from the centre
+    near = np.hypot(np.clip(0, x1, x2), np.clip(0, y1, y2))
+    far = np.hypot(np.maximum(np.abs(x1), np.abs(x2)), np.maximum(np.abs(y1), np.abs(y2)))
+    touching = near <= radius
+    return rows[touching], cols[touching], far[touching] <= radius
+
+
+def bounding_circle(latMin, lonMin, latMax, lonMax):
+    """(lat, lon, radius metres) of the circle around a bounding box."""
+    lat, lon = (latMin + latMax) / 2, (lonMin + lonMax) / 2
+    return lat, lon, float(np.max(haversine(lat, lon, [latMin, latMin, latMax, latMax], [lonMin, lonMax, lonMin, lonMax])))
@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    clients for the google places web services. both backends return
+    places_model records so the worker, exporters and layers do not need
+    to know which api produced them.
+"""
+
+import time
+import calendar
+import threading
+from concurrent.futures import CancelledError
+
+import requests
+
+from .geodesy import circle_bbox
+from .places_model import Place, Review, Photo
+from .places_http import create_session, HedgedRequests, HTTP_TIMEOUT
+from .places_keys import KeyPool, parse_keys, key_label, is_daily_quota, RETIRE_STATUSES, THROTTLE_STATUSES
+from .places_retry import http_status
+
+LEGACY_BACKEND = 'legacy'
+NEW_BACKEND = 'new'
+
+NPT_VALIDITY_DELAY = 5      # time taken for next page token to be valid after being issued
+NEW_API_PAGE_SIZE = 20      # maximum results per page for the places api (new)
+SEARCH_RESULTS = 60         # places a paged search returns at most
+
+# photo endpoints answer with a bare http status instead of a json status
+PHOTO_RETIRE_CODES = {403: 'REQUEST_DENIED', 429: 'OVER_QUERY_LIMIT'}
+
+# throttled answers a call takes, waiting out the backoff of its keys, before it fails
+THROTTLE_RETRIES = 5
+
+# raised by every request of a client once cancel() was called
+CANCELLED = 'CANCELLED'
+
+
+class PlacesApiError(Exception):
+    def __init__(self, status, message=''):
+        Exception.__init__(self, f"{status}. {message}" if message else status)
+        self.status = status
+        self.message = message
+
+
+class PlacesApi:
+    """Http session, optional rate limiter, api key pool and per-api request
+    counters for the usage report. gapiKey is a KeyPool or a string of one
+    or more comma separated keys. session, rate limiter and key pool may be
+    shared between clients, e.g. by all jobs of a batch. countThrottled
+    counts throttling answers and timeouts. details and photo requests are
+    hedged (see places_http.py). cancel() abandons the requests in flight
+    and fails every later one."""
+
+    def max_results(self, keyword):
+        # places one search of a circle returns at most
+        return SEARCH_RESULTS
+
+    def __init__(self, gapiKey, session=None, rateLimiter=None):
+        self.keyPool = gapiKey if isinstance(gapiKey, KeyPool) else KeyPool(parse_keys(gapiKey))
+        self.session = session if session is not None else create_session()
+        self.rateLimiter = rateLimiter
+        self.usage = {"NEARBY": 0, "REVIEWS": 0, "PHOTOS": 0}
+        self.keyUsage = {}
+        self.countThrottled = 0
+        self.usageLock = threading.Lock()
+        self.hedger = HedgedRequests()
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        self.hedger.close()
+
+    def _parse_json(self, res):
+        # body of an answer; a truncated or non json body is an error like any other
+        try:
+            return res.json()
+        except ValueError as ex:
+            raise PlacesApiError('INVALID_RESPONSE', str(ex))
+
+    def _request(self, method, url, usage, hedge=False, **kwargs):
+        """Send a request counted as usage (api, key). every attempt has a
+        deadline; network failures and cancellation raise PlacesApiError.
+        hedge only idempotent requests: a hedged request may be sent twice.
+        the rate limit is taken before the hedger's latency clock starts,
+        and hedges are only sent while the limit has a token to spare."""
+        def send():
+            self._count(*usage)
+            try:
+                return self.session.request(method, url, timeout=HTTP_TIMEOUT, **kwargs)
+            except requests.Timeout as ex:
+                self._throttled()
+                raise PlacesApiError('TIMEOUT', str(ex))
+            except requests.RequestException as ex:
+                raise PlacesApiError('CONNECTION_ERROR', str(ex))
+
+        if self.cancelled.is_set():
+            raise PlacesApiError(CANCELLED)
+        mayHedge = None
+        if self.rateLimiter is not None:
+            self.rateLimiter.acquire()
+            mayHedge = self.rateLimiter.try_acquire
+
+        try:
+            return self.hedger.call(usage[0], send, lambda res: res.close(), hedge, self.cancelled, mayHedge)
+        except CancelledError:
+            raise PlacesApiError(CANCELLED)
+
+    def _throttled(self):
+        with self.usageLock:
+            self.countThrottled += 1
+
+    def _keyed(self, call):
+        # run call(key) with the next key of the pool. a throttled key is benched and the call
+        # repeated with another key, or the same one once its backoff ran out; a key denied or out
+        # of its daily quota is retired
+        throttled = 0
+        while True:
+            key = self.keyPool.acquire()
+            if key is None:
+                wait = self.keyPool.wait_time()
+                if wait is None:
+                    raise PlacesApiError('NO_API_KEY', 'every api key is over its daily quota or was denied')
+                if self.cancelled.wait(wait):
+                    raise PlacesApiError(CANCELLED)
+                continue
+            try:
+                result = call(key)
+            except PlacesApiError as ex:
+                if ex.status in RETIRE_STATUSES or is_daily_quota(ex.status, ex.message):
+                    self.keyPool.retire(key, ex.status)
+                    continue
+                if ex.status not in THROTTLE_STATUSES:
+                    raise
+                self._throttled()
+                self.keyPool.bench(key, ex.status)
+                throttled += 1
+                if throttled > THROTTLE_RETRIES:
+                    raise
+                continue
+            self.keyPool.succeeded(key)
+            return result
+
+    def _count(self, api, key):
+        # requests may be issued from several threads
+        with self.usageLock:
+            self.usage[api] += 1
+            keyUsage = self.keyUsage.setdefault(key_label(key), {"NEARBY": 0, "REVIEWS": 0, "PHOTOS": 0})
+            keyUsage[api] += 1
+
+    def usage_report(self):
+        # request counts in total and per key label, as stored in usage.dat
+        with self.usageLock:
+            report = dict(self.usage)
+            report["KEYS"] = {label: dict(usage) for label, usage in self.keyUsage.items()}
+        return report
+
+    def _get_photo(self, url, params):
+        # image response read in full; other failures are left to the caller's status check
+        def call(key):
+            res = self._request('GET', url, ("PHOTOS", key), hedge=True, params=dict(params, key=key))
+            if res.status_code in PHOTO_RETIRE_CODES:
+                raise PlacesApiError(PHOTO_RETIRE_CODES[res.status_code])
+            return res
+
+        return self._keyed(call)
+
+
+class LegacyPlacesApi(PlacesApi):
+    """Places API: nearbysearch followed by one details call per place."""
+    nearbyURL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    detailsURL = "https://maps.googleapis.com/maps/api/place/details/json"
+    photoURL = "https://maps.googleapis.com/maps/api/place/photo"
+
+    # reviews and photos are not part of nearbysearch results
+    inlineDetails = False
+
+    # results per search page; a full last page means the results were cut at 60
+    pageSize = 20
+
+    # details field names for the fields used by the worker
+    detailFieldNames = {'reviews': 'review', 'photos': 'photo'}
+
+    def _get(self, url, params, api):
+        # legacy endpoints answer http 200 with the outcome in a status field
+        def call(key):
+            # searches page through tokens; only details requests are hedged
+            res = self._request('GET', url, (api, key), hedge=api == "REVIEWS", params=dict(params, key=key))
+            # server errors and proxies answer with an html page
+            if res.status_code != 200:
+                raise PlacesApiError(http_status(res.status_code))
+            data = self._parse_json(res)
+            if data['status'] not in ('OK', 'ZERO_RESULTS'):
+                raise PlacesApiError(data['status'], data.get('error_message', ''))
+            return data
+
+        return self._keyed(call)
+
+    def search(self, lat, long, radius, keyword=None, fields=(), types=()):
+        """Yield pages of places within radius metres of (lat, long).
+        nearbysearch has no field selection, so fields is ignored. it only
+        accepts a single type; several types are left to local filtering."""
+        params = {
+            "location"  : f"{lat},{long}",
+            "radius"    : str(radius)
+        }
+        if keyword:
+            params["keyword"] = keyword
+        if len(types) == 1:
+            params["type"] = types[0]
+
+        while True:
+            data = self._get(self.nearbyURL, params, "NEARBY")
+
+            if data['status'] == 'ZERO_RESULTS':
+                return
+
+            yield [Place.from_nearby(result) for result in data['results']]
+
+            if 'next_page_token' in data and data['next_page_token'] != '':
+                params['pagetoken'] = data['next_page_token']
+            else:
+                # no more pages
+                return
+
+            # wait for next page token to be valid
+            if self.cancelled.wait(NPT_VALIDITY_DELAY):
+                raise PlacesApiError(CANCELLED)
+
+    def details(self, place, fields=('reviews', 'photos')):
+        """Fetch the given detail fields (reviews and/or photos) of place."""
+        params = {
+            'fields'    : ','.join(self.detailFieldNames[field] for field in fields),
+            'place_id'  : place.place_id
+        }
+        data = self._get(self.detailsURL, params, "REVIEWS")
+
+        if data['status'] != 'OK':
+            raise PlacesApiError(data['status'], data.get('error_message', ''))
+
+        place.set_details(data['result'])
+
+    def photo(self, photo, maxwidth, maxheight):
+        """Return a response with the image bytes of photo."""
+        params = {
+            "photoreference": photo.reference,
+            "sensor": "false",
+            "maxheight": maxheight,
+            "maxwidth": maxwidth
+        }
+        return self._get_photo(self.photoURL, params)
+
+
+class NewPlacesApi(PlacesApi):
+    """Places API (New): searchNearby / searchText return reviews and photos
+    inline through the field mask, so no per-place details call is needed."""
+    baseURL = "https://places.googleapis.com/v1"
+
+    inlineDetails = True
+    pageSize = NEW_API_PAGE_SIZE
+
+    # basic fields used for filtering and ordering; requesting only these
+    # keeps the search in a cheaper billing tier
+    placeFields = ['id', 'displayName', 'location', 'types', 'rating', 'userRatingCount']
+
+    def _field_mask(self, fields, prefix=''):
+        return ','.join(prefix + field for field in fields)
+
+    def max_results(self, keyword):
+        # searchNearby, used without a keyword, has a single page
+        return SEARCH_RESULTS if keyword else NEW_API_PAGE_SIZE
+
+    def _post(self, endpoint, body, fields):
+        def call(key):
+            mask = self._field_mask(fields, 'places.')
+            # only searchText answers in pages
+            if endpoint == 'searchText':
+                mask += ',nextPageToken'
+            headers = {
+                'X-Goog-Api-Key': key,
+                'X-Goog-FieldMask': mask
+            }
+            res = self._request('POST', f"{self.baseURL}/places:{endpoint}", ("NEARBY", key), json=body, headers=headers)
+            return self._json(res)
+
+        return self._keyed(call)
+
+    def _json(self, res):
+        if res.status_code != 200:
+            # api errors come as json; server errors and proxies may answer with an html page
+            try:
+                error = res.json().get('error', {})
+            except (ValueError, AttributeError):
+                error = {}
+            raise PlacesApiError(error.get('status', http_status(res.status_code)), error.get('message', ''))
+        return self._parse_json(res)
+
+    def _circle(self, lat, long, radius):
+        return {'circle': {'center': {'latitude': lat, 'longitude': long}, 'radius': float(radius)}}
+
+    def _rectangle(self, lat, long, radius):
+        # box around the circle; searchText only restricts to rectangles
+        latMin, lonMin, latMax, lonMax = map(float, circle_bbox(lat, long, radius))
+        return {'rectangle': {'low': {'latitude': latMin, 'longitude': lonMin}, 'high': {'latitude': latMax, 'longitude': lonMax}}}
+
+    def search(self, lat, long, radius, keyword=None, fields=(), types=()):
+        """Yield pages of places within radius metres of (lat, long).
+        uses searchText when a keyword is given, searchNearby otherwise.
+        searchText is restricted to the box around the circle, so its pages
+        also hold places in the corners of the box. detail fields (reviews,
+        photos) are returned inline."""
+        fields = self.placeFields + list(fields)
+
+        if not keyword:
+            # searchNearby returns a single page of at most 20 places, against 60 for the other
+            # searches; the worker searches a full circle again as smaller ones (see max_results)
+            body = {
+                'maxResultCount': NEW_API_PAGE_SIZE,
+                'locationRestriction': self._circle(lat, long, radius)
+            }
+            if types:
+                body['includedTypes'] = list(types)
+            data = self._post('searchNearby', body, fields)
+            yield [self._parse_place(result) for result in data.get('places', [])]
+            return
+
+        body = {
+            'textQuery': keyword,
+            'pageSize': NEW_API_PAGE_SIZE,
+            'locationRestriction': self._rectangle(lat, long, radius)
+        }
+        # searchText only accepts a single type
+        if len(types) == 1:
+            body['includedType'] = types[0]
+
+        while True:
+            data = self._post('searchText', body, fields)
+            yield [self._parse_place(result) for result in data.get('places', [])]
+
+            if data.get('nextPageToken'):
+                body['pageToken'] = data['nextPageToken']
+            else:
+                return
+
+    def details(self, place, fields=('reviews', 'photos')):
+        """Fetch the given detail fields of place (only needed when search
+        was issued without them)."""
+        def call(key):
+            headers = {
+                'X-Goog-Api-Key': key,
+                'X-Goog-FieldMask': self._field_mask(fields)
+            }
+            res = self._request('GET', f"{self.baseURL}/places/{place.place_id}", ("REVIEWS", key), hedge=True, headers=headers)
+            return self._json(res)
+
+        self._set_details(place, self._keyed(call))
+
+    def photo(self, photo, maxwidth, maxheight):
+        """Return a response with the image bytes of photo."""
+        params = {
+            "maxHeightPx": maxheight,
+            "maxWidthPx": maxwidth
+        }
+        return self._get_photo(f"{self.baseURL}/{photo.reference}/media", params)
+
+    def _parse_place(self, result):
+        location = result['location']
+        place = Place(
+            location['latitude'],
+            location['longitude'],
+            result.get('displayName', {}).get('text', ''),
+            result['id'],
+            result.get('types', ()),
+            result.get('rating', 0),
+            result.get('userRatingCount', 0)
+        )
+        self._set_details(place, result)
+        return place
+
+    def _set_details(self, place, result):
+        place.reviews = tuple(
+            Review(
+                review.get('authorAttribution', {}).get('displayName', ''),
+                review.get('text', review.get('originalText', {})).get('text', ''),
+                _parse_timestamp(review.get('publishTime'))
+            )
+            for review in result.get('reviews', ())
+        )
+        place.photos = tuple(
+            Photo(photo['name'], photo.get('widthPx', 0), photo.get('heightPx', 0))
+            for photo in result.get('photos', ())
+        )
+
+
+def _parse_timestamp(publishTime):
+    # RFC 3339 timestamp, e.g. 2023-04-01T10:20:30.123456789Z
+    if not publishTime:
+        return 0
+    return calendar.timegm(time.strptime(publishTime[:19], '%Y-%m-%dT%H:%M:%S'))
+
+
+BACKENDS = {
+    LEGACY_BACKEND: LegacyPlacesApi,
+    NEW_BACKEND: NewPlacesApi
+}
+
+
+def create_api(backend, gapiKey, session=None, rateLimiter=None):
+    return BACKENDS[backend](gapiKey, session, rateLimiter)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    reading batch job lists: one search per row of a csv or xlsx file with
+    the columns lat, lon, radius, keyword and limit. empty or missing
+    radius, keyword and limit cells fall back to the dialog values.
+"""
+
+import os
+import csv
+
+from .places_model import HarvestJob
+
+# accepted header names for each column
+COLUMN_ALIASES = {
+    'lat': ('lat', 'latitude'),
+    'long': ('lon', 'long', 'lng', 'longitude'),
+    'radius': ('radius', 'radius_km'),
+    'keyword': ('keyword', 'query'),
+    'limit': ('limit', 'limit_entries', 'limitentries'),
+    'name': ('name', 'id', 'job')
+}
+
+
+def _read_rows(path):
+    if os.path.splitext(path)[1].lower() in ('.xlsx', '.xlsm'):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ValueError("reading spreadsheets needs the openpyxl package; save the batch as csv instead")
+
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        rows = [["" if cell is None else str(cell) for cell in row] for row in workbook.active.iter_rows(values_only=True)]
+        workbook.close()
+        return rows
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return list(csv.reader(f))
+
+
+def read_jobs(path, radius=None, keyword=None, limitEntries=None):
+    """Parse a batch file into HarvestJobs. raises ValueError with the
+    offending row on bad input."""
+    rows = [row for row in _read_rows(path) if any(cell.strip() for cell in row)]
+    if len(rows) < 2:
+        raise ValueError("batch file needs a header row and at least one job")
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    columns = {}
+    for key, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in header:
+                columns[key] = header.index(alias)
+                break
+
+    if 'lat' not in columns or 'long' not in columns:
+        raise ValueError("batch file needs lat and lon columns")
+
+    def cell(row, key, default=None):
+        if key not in columns or columns[key] >= len(row) or row[columns[key]].strip() == '':
+            return default
+        return row[columns[key]].strip()
+
+    jobs = []
+    for number, row in enumerate(rows[1:], start=2):
+        try:
+            lat = float(cell(row, 'lat'))
+            long = float(cell(row, 'long'))
+            jobRadius = float(cell(row, 'radius', radius))
+            jobLimit = int(float(cell(row, 'limit', limitEntries)))
+        except (TypeError, ValueError):
+            raise ValueError(f"row {number}: lat, lon, radius and limit must be numeric")
+
+        if not (-90 <= lat <= 90) or not (-180 <= long <= 180):
+            raise ValueError(f"row {number}: coordinates out of range")
+        if not (0 <= jobRadius <= 50):
+            raise ValueError(f"row {number}: radius must lie between 0 and 50 kms")
+        if jobLimit < 0:
+            raise ValueError(f"row {number}: entry limit cannot be negative")
+
+        jobs.append(HarvestJob(lat, long, jobRadius, cell(row, 'keyword', keyword), jobLimit, name=cell(row, 'name')))
+
+    return jobs
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    in-process caches shared between the jobs of a harvest, and between
+    harvests running at the same time
+"""
+
+import time
+import threading
+
+DETAILS_CACHE_TTL = 3600        # seconds a place's fetched details are served to later requests
+
+# status of the errors raised by requests of a stopped harvest (see places_api.py)
+CANCELLED = 'CANCELLED'
+
+
+def _cancelled(error):
+    return getattr(error, 'status', None) == CANCELLED
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Calls for the same key made while one is in flight wait for it and
+    share its result or exception instead of making their own. a waiting
+    caller for which retryIf(exception) holds tries again instead."""
+
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, call, retryIf=None):
+        while True:
+            with self.lock:
+                flight = self.flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self.flights[key] = _Flight()
+
+            if leader:
+                break
+
+            flight.done.wait()
+            if flight.error is None:
+                return flight.result
+            if retryIf is None or not retryIf(flight.error):
+                raise flight.error
+
+        try:
+            flight.result = call()
+        except Exception as ex:
+            flight.error = ex
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result
+
+    def __len__(self):
+        return len(self.flights)
+
+
+class DetailsCache:
+    """place_id -> fetched detail fields, reviews and photos. a cached entry
+    serves any later request for the same or fewer fields; concurrent
+    requests for the same place, or the same photo, share one request.
+    callers waiting on the request of a stopped harvest make their own.
+    entries expire after ttl seconds."""
+
+    def __init__(self, ttl=DETAILS_CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.detailFlights = SingleFlight()
+        self.photoFlights = SingleFlight()
+
+    def fill(self, place, fields):
+        # copy cached details into place; False if they have to be fetched
+        with self.lock:
+            entry = self.entries.get(place.place_id)
+            if entry is not None and entry[0] < time.monotonic():
+                del self.entries[place.place_id]
+                entry = None
+
+        if entry is None or not set(fields) <= entry[1]:
+            return False
+
+        place.reviews = entry[2]
+        place.photos = entry[3]
+        return True
+
+    def put(self, place, fields):
+        with self.lock:
+            self.entries[place.place_id] = (time.monotonic() + self.ttl, frozenset(fields), place.reviews, place.photos)
+
+    def discard(self, place_id):
+        # forget a place, e.g. one whose reviews a harvest spilled to disk
+        with self.lock:
+            self.entries.pop(place_id, None)
+
+    def fetch(self, place, fields, fetchDetails, fresh=False):
+        """Fill place with its detail fields, calling fetchDetails(place, fields)
+        unless they are cached or already being fetched for another place
+        object with the same place_id. fresh skips the cached details, e.g.
+        for a place known to have changed, and replaces them. errors of the
+        shared call are raised to every caller."""
+        if not fresh and self.fill(place, fields):
+            return
+
+        def call():
+            # the details may have been put while this call waited for the lock
+            if fresh or not self.fill(place, fields):
+                fetchDetails(place, fields)
+                self.put(place, fields)
+
+        self.detailFlights.do((place.place_id, frozenset(fields)), call, _cancelled)
+        self.fill(place, fields)
+
+    def fetch_photo(self, photo, maxwidth, maxheight, download):
+        """(status code, image bytes or None) of a photo downloaded with
+        download(photo, maxwidth, maxheight), which returns a response.
+        images are not kept; only downloads in flight are shared."""
+        def call():
+            r = download(photo, maxwidth, maxheight)
+            return r.status_code, r.content if r.status_code == 200 else None
+
+        return self.photoFlights.do((photo.reference, maxwidth, maxheight), call, _cancelled)
+
+    def __len__(self):
+        return len(self.entries)
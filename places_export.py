@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    xlsx export of harvested places
+"""
+
+from datetime import datetime
+
+import xlsxwriter
+
+XLSX_COL_WIDTHS = {
+    'A': 2,
+    'B': 15,
+    'C': 15,
+    'D': 25,
+    'E': 30,
+    'F': 30,
+    'G': 25,
+    'H': 100,
+    'I': 30
+}
+
+PLACE_COLUMNS = ['lat', 'long', 'name', 'place_id', 'types']
+REVIEW_COLUMNS = ['author', 'comment', 'timestamp']
+JOB_COLUMNS = ['name', 'lat', 'long', 'radius', 'keyword', 'limit', 'found', 'kept', 'new', 'with reviews', 'reviews']
+FAILURE_COLUMNS = ['request', 'place_id', 'photo', 'photo reference', 'error', 'attempts']
+
+
+def _format_time(timestamp):
+    return datetime.utcfromtimestamp(timestamp).strftime('%A, %d %B, %Y')
+
+
+def _write_header(worksheet, bold):
+    worksheet.write(0, 0, "No.", bold)
+    for index, colName in enumerate(PLACE_COLUMNS + REVIEW_COLUMNS):
+        worksheet.write(0, index+1, colName, bold)
+
+
+def _place_values(place):
+    return [place.lat, place.long, place.name, place.place_id, ', '.join(place.types)]
+
+
+def _write_jobs(workbook, bold, summaries):
+    # one row per job of a batch
+    worksheet = workbook.add_worksheet('jobs')
+    for col, colName in enumerate(JOB_COLUMNS):
+        worksheet.write(0, col, colName, bold)
+
+    for row, summary in enumerate(summaries, start=1):
+        job = summary.job
+        values = [
+            job.name, job.lat, job.long, job.radius, job.keyword or '', job.limitEntries,
+            summary.countFound, len(summary.placeIds), summary.countNew, summary.countPlaces, summary.countReviews
+        ]
+        for col, data in enumerate(values):
+            worksheet.write(row, col, data)
+
+    worksheet.set_column(0, 0, 25)
+    worksheet.set_column(4, 4, 25)
+
+
+def _write_failures(workbook, bold, failures):
+    # one row per request still failing after the retry round, enough to fetch it again on its own
+    worksheet = workbook.add_worksheet('failed')
+    for col, colName in enumerate(FAILURE_COLUMNS):
+        worksheet.write(0, col, colName, bold)
+
+    for row, failure in enumerate(failures, start=1):
+        reference = failure.item.reference if failure.index is not None else ''
+        values = [failure.kind, failure.place_id, failure.index or '', reference, failure.status, failure.attempts]
+        for col, data in enumerate(values):
+            worksheet.write(row, col, data)
+
+    worksheet.set_column(1, 1, 30)
+    worksheet.set_column(3, 3, 50)
+
+
+def write_xlsx(xlsxFilePath, places, isRunning=lambda: True, summaries=None, failures=None, constantMemory=False):
+    """Write places and their reviews to a workbook with a formatted
+    (one merged block per place) and an unformatted (one row per review)
+    sheet, plus a sheet of per-job summaries for batches and one of the
+    failed requests (places_retry.FailedRequest). Returns False if
+    isRunning() turned false before completion.
+
+    constantMemory streams every row to disk as soon as the next one is
+    started. cells cannot be merged then; the place values of the
+    formatted sheet are only written on the first row of their block."""
+    workbook = xlsxwriter.Workbook(xlsxFilePath, {'constant_memory': constantMemory})
+
+    bold = workbook.add_format({'bold': True})
+
+    # FORMATTED WORKSHEET
+    worksheet_formatted = workbook.add_worksheet('reviews-formatted')
+    _write_header(worksheet_formatted, bold)
+
+    currRow = 1
+
+    for index, place in enumerate(places):
+        if not isRunning():
+            workbook.close()
+            return False
+
+        numReviews = len(place.reviews)
+        if numReviews == 0:
+            continue
+
+        for col, data in enumerate([index] + _place_values(place)):
+            if numReviews > 1 and not constantMemory:
+                worksheet_formatted.merge_range(currRow, col, currRow + numReviews - 1, col, data)
+            else:
+                worksheet_formatted.write(currRow, col, data)
+
+        for review in place.reviews:
+            worksheet_formatted.write(currRow, 6, review.author_name)
+            worksheet_formatted.write(currRow, 7, review.text)
+            worksheet_formatted.write(currRow, 8, _format_time(review.time))
+            currRow += 1
+
+    # UNFORMATTED WORKSHEET
+    worksheet_unformatted = workbook.add_worksheet('reviews-unformatted')
+    _write_header(worksheet_unformatted, bold)
+
+    currRow = 1
+
+    for index, place in enumerate(places):
+        if not isRunning():
+            workbook.close()
+            return False
+
+        values = [index] + _place_values(place)
+
+        for review in place.reviews:
+            for col, data in enumerate(values):
+                worksheet_unformatted.write(currRow, col, data)
+            worksheet_unformatted.write(currRow, 6, review.author_name)
+            worksheet_unformatted.write(currRow, 7, review.text)
+            worksheet_unformatted.write(currRow, 8, _format_time(review.time))
+            currRow += 1
+
+    # widen columns to improve readability
+    for col, width in XLSX_COL_WIDTHS.items():
+        worksheet_formatted.set_column(f"{col}:{col}", width)
+        worksheet_unformatted.set_column(f"{col}:{col}", width)
+
+    if summaries:
+        _write_jobs(workbook, bold, summaries)
+
+    if failures:
+        _write_failures(workbook, bold, failures)
+
+    workbook.close()
+    return True
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    filters and priority order applied to search results before any
+    details are requested
+"""
+
+# orders in which places are kept under limitEntries and get their details;
+# index matches the detailsPriority combo box
+ARRIVAL = 'arrival'
+DISTANCE = 'distance'
+RATINGS_TOTAL = 'ratings_total'
+RATING = 'rating'
+TYPE_MATCH = 'type_match'
+PRIORITIES = [ARRIVAL, DISTANCE, RATINGS_TOTAL, RATING, TYPE_MATCH]
+
+
+def parse_types(text):
+    # comma separated place types, e.g. "cafe, bakery"
+    return tuple(t.strip().lower().replace(' ', '_') for t in text.split(',') if t.strip() != '')
+
+
+class PlaceFilter:
+    """Decide from the basic (search) fields of a place whether its
+    reviews are worth fetching. unset criteria accept every place.
+
+    keyword: any of its words must occur in the name or the types
+    types:   the place must have at least one of these types"""
+
+    def __init__(self, minRating=None, minRatingsTotal=None, keyword=None, types=()):
+        self.minRating = minRating
+        self.minRatingsTotal = minRatingsTotal
+        self.keywordTerms = tuple(keyword.lower().split()) if keyword else ()
+        self.types = frozenset(types)
+
+    def with_keyword(self, keyword):
+        # the same filter matching another keyword, used for the rows of a batch;
+        # filters that do not match keywords are returned unchanged
+        if len(self.keywordTerms) == 0:
+            return self
+        return PlaceFilter(self.minRating, self.minRatingsTotal, keyword, self.types)
+
+    def active(self):
+        return self.minRating is not None or self.minRatingsTotal is not None or \
+            len(self.keywordTerms) > 0 or len(self.types) > 0
+
+    def _matches_keyword(self, place):
+        text = ' '.join((place.name.lower(),) + place.types).replace('_', ' ')
+        return any(term in text for term in self.keywordTerms)
+
+    def __call__(self, place):
+        if self.types and self.types.isdisjoint(place.types):
+            return False
+        if self.keywordTerms and not self._matches_keyword(place):
+            return False
+        if self.minRating is not None and place.rating < self.minRating:
+            return False
+        if self.minRatingsTotal is not None and place.user_ratings_total < self.minRatingsTotal:
+            return False
+        return True
+
+
+def rank_places(places, priority=ARRIVAL, distances=None, types=()):
+    """Return places most valuable first. distances (metres from the search
+    centre, parallel to places) is required for DISTANCE; types are the
+    wanted types for TYPE_MATCH. ties keep arrival order."""
+    if priority == ARRIVAL:
+        return list(places)
+
+    if priority == DISTANCE:
+        order = sorted(range(len(places)), key=lambda i: distances[i])
+        return [places[i] for i in order]
+
+    if priority == RATINGS_TOTAL:
+        key = lambda place: -place.user_ratings_total
+    elif priority == RATING:
+        key = lambda place: (-place.rating, -place.user_ratings_total)
+    elif priority == TYPE_MATCH:
+        types = frozenset(types)
+        key = lambda place: (-len(types.intersection(place.types)), -place.user_ratings_total)
+    else:
+        raise ValueError(f"unknown priority {priority}")
+
+    return sorted(places, key=key)
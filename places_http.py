@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    http plumbing shared by every request of a harvest (or of a whole
+    batch): one pooled session and one request rate limiter, request
+    deadlines and hedging, and the adaptive concurrency windows of the
+    details and photo stages
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, CancelledError, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_SIZE = 16         # keep-alive connections per host
+DEFAULT_QPS = 10            # requests per second across all threads
+
+# seconds to connect, and to wait for each read; a stalled socket fails instead of hanging the job
+HTTP_TIMEOUT = (5, 30)
+
+HEDGE_PERCENTILE = 95       # requests slower than this share of earlier ones are sent again
+HEDGE_MIN_SAMPLES = 20      # latencies seen before any request is hedged
+HEDGE_SAMPLES = 200         # latencies kept per kind of request
+CANCEL_POLL = 0.1           # seconds between checks for a cancelled request
+
+
+def create_session(poolSize=HTTP_POOL_SIZE):
+    # session whose connection pool is large enough for the worker threads
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class RateLimiter:
+    """Token bucket limiting requests per second; thread safe."""
+
+    def __init__(self, qps=DEFAULT_QPS, burst=None):
+        self.qps = float(qps)
+        self.burst = float(burst if burst is not None else max(1, qps))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, qps, burst=None):
+        # change the limit; tokens saved up at the old rate are cut to the new burst
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.qps)
+            self.updated = now
+            self.qps = float(qps)
+            self.burst = float(burst if burst is not None else max(1, qps))
+            self.tokens = min(self.tokens, self.burst)
+
+    def _take(self):
+        # take a token if one is there; otherwise seconds until there is one
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.qps)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.qps
+
+    def acquire(self):
+        # block until a request may be issued
+        while True:
+            wait = self._take()
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self):
+        # take a token without waiting; False while the budget is used up
+        return self._take() == 0
+
+
+class HedgedRequests:
+    """Runs requests on its own threads so that the caller can abandon them.
+    an idempotent request of a kind still unanswered after the p95 latency
+    of the earlier requests of that kind is sent once more; the first answer
+    wins. attempts left behind are cancelled if they have not started yet,
+    otherwise discard() is called on their answer when it arrives, e.g. to
+    close the response. a failed attempt leaves the other one running.
+    latencies are timed from the first send, so callers take their rate
+    limit before calling. thread safe."""
+
+    def __init__(self, maxWorkers=2 * HTTP_POOL_SIZE):
+        self.samples = {}           # kind -> latencies of recent requests
+        self.countHedged = 0
+        self.countWon = 0           # hedges answering first
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers)
+
+    def delay(self, kind):
+        # seconds after which a request of kind is hedged, or None while too few were seen
+        with self.lock:
+            samples = sorted(self.samples.get(kind, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[len(samples) * HEDGE_PERCENTILE // 100]
+
+    def _record(self, kind, latency):
+        with self.lock:
+            self.samples.setdefault(kind, deque(maxlen=HEDGE_SAMPLES)).append(latency)
+
+    def call(self, kind, send, discard=None, hedge=True, cancelled=None, mayHedge=None):
+        """Answer of send(). once the event cancelled is set the attempts
+        still out are abandoned and CancelledError is raised; their threads
+        are freed by the request deadlines. a due hedge is only sent when
+        mayHedge() allows it, e.g. takes a token of a rate limiter; it is
+        dropped otherwise."""
+        if cancelled is not None and cancelled.is_set():
+            raise CancelledError()
+
+        delay = self.delay(kind) if hedge else None
+        start = time.monotonic()
+        hedgeAt = start + delay if delay is not None else None
+
+        first = self.executor.submit(send)
+        winner = None
+        error = None
+        pending = {first}
+        while winner is None and len(pending) > 0:
+            timeout = CANCEL_POLL if hedgeAt is None else max(0, min(CANCEL_POLL, hedgeAt - time.monotonic()))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is not None:
+                    error = error or attempt.exception()
+                elif winner is None:
+                    winner = attempt
+                elif discard is not None:
+                    discard(attempt.result())
+
+            if cancelled is not None and cancelled.is_set():
+                break
+            if winner is None and len(pending) > 0 and hedgeAt is not None and time.monotonic() >= hedgeAt:
+                hedgeAt = None
+                if mayHedge is None or mayHedge():
+                    with self.lock:
+                        self.countHedged += 1
+                    pending.add(self.executor.submit(send))
+
+        # cancel the attempts left behind, or drop their answers once they come
+        for attempt in pending:
+            if not attempt.cancel() and discard is not None:
+                attempt.add_done_callback(lambda attempt: attempt.exception() is None and discard(attempt.result()))
+
+        if winner is None:
+            if error is None:
+                raise CancelledError()
+            raise error
+        if winner is not first:
+            with self.lock:
+                self.countWon += 1
+        self._record(kind, time.monotonic() - start)
+        return winner.result()
+
+    def close(self):
+        # threads still sending finish within the request deadlines
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AdaptiveConcurrency:
+    """Additive-increase / multiplicative-decrease limit on the requests of
+    one stage in flight; thread safe. the window grows by one request per
+    window of completions while the smoothed latency stays within tolerance
+    of the lowest seen, holds while latency rises, and is cut by decrease
+    on throttling or timeouts. after a cut, one window of completions is
+    let through before the next cut, as those requests were already out."""
+
+    SMOOTHING = 0.2             # weight of a new latency in the moving average
+    BASELINE_DRIFT = 0.01       # the lowest latency seen creeps up by this share per completion
+
+    def __init__(self, initial=2, minimum=1, maximum=HTTP_POOL_SIZE, decrease=0.5, tolerance=1.5):
+        self.window = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.tolerance = tolerance
+
+        self.inFlight = 0
+        self.latency = None
+        self.baseline = None
+        self.cooldown = 0
+        self.peak = self.limit
+        self.countThrottled = 0
+        self.condition = threading.Condition()
+
+    @property
+    def limit(self):
+        return max(self.minimum, int(self.window))
+
+    def acquire(self):
+        # block until the window has room for another request
+        with self.condition:
+            while self.inFlight >= self.limit:
+                self.condition.wait()
+            self.inFlight += 1
+
+    def release(self, latency, throttled=False):
+        """Report a finished request taking latency seconds; returns True
+        when the limit changed."""
+        with self.condition:
+            self.inFlight -= 1
+            before = self.limit
+
+            if throttled:
+                self.countThrottled += 1
+                if self.cooldown == 0:
+                    self.window = max(self.minimum, self.window * self.decrease)
+                    self.cooldown = self.limit
+                else:
+                    self.cooldown -= 1
+            else:
+                self.latency = latency if self.latency is None else self.latency + self.SMOOTHING * (latency - self.latency)
+                self.baseline = self.latency if self.baseline is None else \
+                    min(self.latency, self.baseline * (1 + self.BASELINE_DRIFT))
+                if self.cooldown > 0:
+                    self.cooldown -= 1
+                elif self.latency <= self.baseline * self.tolerance:
+                    self.window = min(self.maximum, self.window + 1 / self.window)
+
+            self.peak = max(self.peak, self.limit)
+            self.condition.notify_all()
+            return self.limit != before
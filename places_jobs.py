@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    queue of harvests run concurrently by the dialog. every harvest gets
+    its own worker thread, progress, cancel and output file, while all of
+    them share one http session, details and search caches, harvest store
+    and requests-per-second budget.
+"""
+
+import os
+
+from qgis.PyQt.QtCore import QObject, QThread, pyqtSignal
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+
+DEFAULT_MAX_CONCURRENT = 2
+
+
+class QueuedHarvest:
+    __slots__ = ('number', 'label', 'jobs', 'xlsxFilePath', 'workerArgs', 'aoiGeometry', 'status', 'progress',
+                 'thread', 'worker', 'cancelled', 'spillStore')
+
+    def __init__(self, number, label, jobs, xlsxFilePath, workerArgs, aoiGeometry=None):
+        self.number = number
+        self.label = label
+        self.jobs = jobs
+        self.xlsxFilePath = xlsxFilePath
+        self.workerArgs = workerArgs
+        self.aoiGeometry = aoiGeometry
+        self.status = QUEUED
+        self.progress = 0
+        self.thread = None
+        self.worker = None
+        self.cancelled = False
+        self.spillStore = None      # reviews spilled by a harvest over its memory budget, read by the popups
+
+
+class HarvestQueue(QObject):
+    changed = pyqtSignal(int)               # harvest number whose status or progress changed
+    message = pyqtSignal(int, str)
+    error = pyqtSignal(int, str)
+    usage = pyqtSignal(dict)
+    harvestFinished = pyqtSignal(int, list)
+
+    def __init__(self, maxConcurrent=DEFAULT_MAX_CONCURRENT, qps=None, harvestStorePath=None, memoryBudget=None):
+        QObject.__init__(self)
+        self.maxConcurrent = maxConcurrent
+        self.qps = qps
+        self.memoryBudget = memoryBudget        # MB of reviews every harvest started holds in memory; None for no bound
+        self.harvestStorePath = harvestStorePath
+        self.harvestStore = None
+        self.harvests = {}
+        self.nextNumber = 1
+
+        # shared by every harvest; created on first use to keep requests out of plugin startup
+        self.session = None
+        self.rateLimiter = None
+        self.detailsCache = None
+        self.searchCache = None
+        self.keyPools = {}          # api key text -> KeyPool, so a retired key stays retired for all harvests
+
+    def set_limits(self, maxConcurrent, qps, memoryBudget=None):
+        self.maxConcurrent = maxConcurrent
+        self.qps = qps
+        self.memoryBudget = memoryBudget
+        if self.rateLimiter is not None:
+            self.rateLimiter.set_rate(qps)
+        self._start_next()
+
+    def harvest_store(self):
+        # store every finished harvest is recorded in; None without a store path
+        if self.harvestStore is None and self.harvestStorePath is not None:
+            from .places_store import HarvestStore
+            self.harvestStore = HarvestStore(self.harvestStorePath)
+        return self.harvestStore
+
+    def is_idle(self):
+        return all(harvest.status not in (QUEUED, RUNNING) for harvest in self.harvests.values())
+
+    def _unique_output_path(self, xlsxFilePath):
+        # harvests waiting or running at the same time must not overwrite each other's workbook
+        used = {harvest.xlsxFilePath for harvest in self.harvests.values() if harvest.status in (QUEUED, RUNNING)}
+        root, ext = os.path.splitext(xlsxFilePath)
+        path, index = xlsxFilePath, 1
+        while path in used:
+            index += 1
+            path = f"{root}_{index}{ext}"
+        return path
+
+    def enqueue(self, label, jobs, xlsxFilePath, workerArgs, aoiGeometry=None):
+        """Queue a harvest of jobs. workerArgs are the remaining Worker
+        arguments (gapiKey, outputDirName, saveImages, backend, ...)."""
+        harvest = QueuedHarvest(self.nextNumber, label, jobs, self._unique_output_path(xlsxFilePath), workerArgs, aoiGeometry)
+        self.harvests[harvest.number] = harvest
+        self.nextNumber += 1
+
+        self.changed.emit(harvest.number)
+        self._start_next()
+        return harvest
+
+    def cancel(self, number):
+        harvest = self.harvests.get(number)
+        if harvest is None:
+            return
+
+        harvest.cancelled = True
+        if harvest.status == QUEUED:
+            harvest.status = CANCELLED
+            self.changed.emit(number)
+        elif harvest.status == RUNNING:
+            harvest.worker.stop()
+
+    def cancel_all(self):
+        for number in list(self.harvests):
+            self.cancel(number)
+
+    def clear_finished(self):
+        for number, harvest in list(self.harvests.items()):
+            if harvest.status in (DONE, CANCELLED):
+                del self.harvests[number]
+
+    def _start_next(self):
+        running = sum(1 for harvest in self.harvests.values() if harvest.status == RUNNING)
+        for harvest in self.harvests.values():
+            if running >= self.maxConcurrent:
+                break
+            if harvest.status == QUEUED:
+                self._start(harvest)
+                running += 1
+
+    def _start(self, harvest):
+        from .places_worker import Worker
+        from .places_http import create_session, RateLimiter
+        from .places_cache import DetailsCache
+        from .places_tiles import SearchTileCache
+        from .places_keys import KeyPool, parse_keys
+
+        if self.session is None:
+            self.session = create_session()
+            self.rateLimiter = RateLimiter(self.qps) if self.qps is not None else RateLimiter()
+            self.detailsCache = DetailsCache()
+            self.searchCache = SearchTileCache()
+
+        workerArgs = dict(harvest.workerArgs)
+        gapiKey = workerArgs['gapiKey']
+        if gapiKey not in self.keyPools:
+            self.keyPools[gapiKey] = KeyPool(parse_keys(gapiKey))
+        workerArgs['gapiKey'] = self.keyPools[gapiKey]
+
+        harvest.status = RUNNING
+        harvest.thread = QThread()
+        harvest.worker = Worker(harvest.jobs, harvest.xlsxFilePath, **workerArgs,
+                                session=self.session, rateLimiter=self.rateLimiter, detailsCache=self.detailsCache,
+                                searchCache=self.searchCache, harvestStore=self.harvest_store(), label=harvest.label,
+                                memoryBudget=self.memoryBudget)
+        harvest.spillStore = harvest.worker.spillStore
+        harvest.worker.moveToThread(harvest.thread)
+
+        number = harvest.number
+        harvest.worker.addMessage.connect(lambda message: self.message.emit(number, message))
+        harvest.worker.addError.connect(lambda message: self.error.emit(number, message))
+        harvest.worker.progress.connect(lambda progress: self._on_progress(number, progress))
+        harvest.worker.api.connect(self.usage.emit)
+
+        harvest.thread.started.connect(harvest.worker.run)
+        harvest.worker.finished.connect(harvest.thread.quit)
+        harvest.worker.finished.connect(harvest.worker.deleteLater)
+        harvest.thread.finished.connect(harvest.thread.deleteLater)
+        harvest.worker.finished.connect(lambda placesData: self._on_finished(number, placesData))
+
+        harvest.thread.start()
+        self.changed.emit(number)
+
+    def _on_progress(self, number, progress):
+        harvest = self.harvests.get(number)
+        if harvest is not None and harvest.status == RUNNING:
+            harvest.progress = progress
+            self.changed.emit(number)
+
+    def _on_finished(self, number, placesData):
+        harvest = self.harvests.get(number)
+        if harvest is None or harvest.status != RUNNING:
+            return
+
+        harvest.status = CANCELLED if harvest.cancelled else DONE
+        if len(placesData) == 0:
+            # the worker closed its spill store, nothing reads from it
+            harvest.spillStore = None
+        harvest.progress = 100
+
+        self.changed.emit(number)
+        self.harvestFinished.emit(number, placesData)
+        self._start_next()
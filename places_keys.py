@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    pool of places api keys. requests are spread over the keys round
+    robin. a key that is throttled sits out for a while with growing
+    backoff and comes back; a key denied or out of its daily quota is
+    retired and the remaining keys carry on.
+"""
+
+import re
+import time
+import threading
+
+# statuses that retire a key for good: legacy api, then places api (new)
+RETIRE_STATUSES = ('REQUEST_DENIED', 'PERMISSION_DENIED')
+# statuses that bench a key; the same statuses retire it when the quota of the day is used up
+THROTTLE_STATUSES = ('OVER_QUERY_LIMIT', 'RESOURCE_EXHAUSTED')
+
+BENCH_DELAY = 2             # seconds a key sits out after its first throttled answer
+BENCH_MAX_DELAY = 60        # doubling stops here
+
+
+def is_daily_quota(status, message):
+    # a throttling answer telling that the quota of the day is used up, not a per second or minute limit
+    message = (message or '').lower()
+    return status in THROTTLE_STATUSES and ('daily' in message or 'per day' in message)
+
+
+def parse_keys(text):
+    # keys separated by commas, semicolons or whitespace; duplicates dropped, order kept
+    keys = [key for key in re.split(r'[\s,;]+', text or '') if key]
+    return list(dict.fromkeys(keys))
+
+
+def key_label(key):
+    # short label for logs and the usage store; keys are never written out in full
+    return f"...{key[-6:]}"
+
+
+class KeyPool:
+    """Thread safe round robin over the keys that are still in service.
+    throttled keys are benched: skipped until their backoff runs out."""
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.retired = {}           # key -> status that retired it
+        self.benched = {}           # key -> monotonic time it is back in service
+        self.strikes = {}           # key -> throttled answers in a row, sets the backoff
+        self.nextIndex = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # next key in service, or None when every key is retired or benched
+        with self.lock:
+            now = time.monotonic()
+            for _ in range(len(self.keys)):
+                key = self.keys[self.nextIndex % len(self.keys)]
+                self.nextIndex += 1
+                if key not in self.retired and self.benched.get(key, 0) <= now:
+                    return key
+            return None
+
+    def wait_time(self):
+        # seconds until a benched key is back, 0 when one is in service, None when all are retired
+        with self.lock:
+            now = time.monotonic()
+            waits = [max(self.benched.get(key, 0) - now, 0) for key in self.keys if key not in self.retired]
+        return min(waits) if len(waits) > 0 else None
+
+    def bench(self, key, status):
+        # keep a throttled key out for a backoff doubling with every throttled answer in a row;
+        # answers of requests sent before it was benched do not count again
+        with self.lock:
+            if self.benched.get(key, 0) > time.monotonic():
+                return
+            strikes = self.strikes.get(key, 0)
+            self.strikes[key] = strikes + 1
+            self.benched[key] = time.monotonic() + min(BENCH_DELAY * 2 ** strikes, BENCH_MAX_DELAY)
+
+    def succeeded(self, key):
+        # an answer that was not throttled resets the backoff of the key
+        if key in self.strikes:
+            with self.lock:
+                self.strikes.pop(key, None)
+
+    def retire(self, key, status):
+        with self.lock:
+            self.retired.setdefault(key, status)
+
+    def active(self):
+        with self.lock:
+            return [key for key in self.keys if key not in self.retired]
+
+    def __len__(self):
+        return len(self.keys)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    compact in-memory model for harvested places, reviews and photos.
+    only the fields consumed by the xlsx export, the vector layers and
+    the photo stage are kept; the raw api json is dropped as soon as it
+    has been parsed.
+"""
+
+import sys
+
+# identical type lists are shared between places instead of being duplicated
+_TYPES_CACHE = {}
+
+
+def intern_types(types):
+    types = tuple(sys.intern(t) for t in types)
+    return _TYPES_CACHE.setdefault(types, types)
+
+
+class Review:
+    __slots__ = ('author_name', 'text', 'time')
+
+    def __init__(self, author_name, text, time):
+        self.author_name = sys.intern(author_name)
+        self.text = text
+        self.time = int(time)
+
+    @classmethod
+    def from_json(cls, review):
+        return cls(review.get('author_name', ''), review.get('text', ''), review.get('time', 0))
+
+    def to_dict(self):
+        return {
+            'author_name': self.author_name,
+            'text': self.text,
+            'time': self.time
+        }
+
+
+# approximate bytes taken by a review besides its texts: the object, its int and string headers
+REVIEW_OVERHEAD = 150
+
+
+def reviews_size(reviews):
+    # approximate memory held by reviews, for the memory budget of a harvest
+    return sum(len(review.author_name) + len(review.text) for review in reviews) + REVIEW_OVERHEAD * len(reviews)
+
+
+class StoredReviews:
+    """Reviews of a place spilled to a store instead of memory; any object
+    whose reviews(place_id) returns (author_name, text, time) rows. reads
+    them back on every iteration."""
+    __slots__ = ('store', 'place_id', 'count')
+
+    def __init__(self, store, place_id, count):
+        self.store = store
+        self.place_id = place_id
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (Review(*row) for row in self.store.reviews(self.place_id))
+
+
+class Photo:
+    __slots__ = ('reference', 'width', 'height')
+
+    def __init__(self, reference, width, height):
+        self.reference = reference
+        self.width = int(width)
+        self.height = int(height)
+
+    @classmethod
+    def from_json(cls, photo):
+        return cls(photo['photo_reference'], photo['width'], photo['height'])
+
+
+class Place:
+    __slots__ = ('lat', 'long', 'name', 'place_id', 'types', 'rating', 'user_ratings_total', 'reviews', 'photos')
+
+    def __init__(self, lat, long, name, place_id, types, rating=0, user_ratings_total=0, reviews=(), photos=()):
+        self.lat = float(lat)
+        self.long = float(long)
+        self.name = name
+        self.place_id = place_id
+        self.types = intern_types(types)
+        self.rating = float(rating)
+        self.user_ratings_total = int(user_ratings_total)
+        self.reviews = tuple(reviews)
+        self.photos = tuple(photos)
+
+    @classmethod
+    def from_nearby(cls, result):
+        # build a place from a nearbysearch result
+        location = result['geometry']['location']
+        return cls(
+            location['lat'], location['lng'], result['name'], result['place_id'], result.get('types', ()),
+            result.get('rating', 0), result.get('user_ratings_total', 0)
+        )
+
+    def set_details(self, result):
+        # keep only reviews and photos from a place details result
+        self.reviews = tuple(Review.from_json(review) for review in result.get('reviews', ()))
+        self.photos = tuple(Photo.from_json(photo) for photo in result.get('photos', ()))
+
+    def reviews_as_dicts(self):
+        return [review.to_dict() for review in self.reviews]
+
+
+class HarvestJob:
+    """One search area: the circle of radius kms around (lat, long), or a
+    polygon (list of (lon, lat) rings) covered with circles of that radius."""
+    __slots__ = ('lat', 'long', 'radius', 'keyword', 'limitEntries', 'polygon', 'name')
+
+    def __init__(self, lat, long, radius, keyword, limitEntries, polygon=None, name=None):
+        self.lat = float(lat)
+        self.long = float(long)
+        self.radius = radius
+        self.keyword = keyword
+        self.limitEntries = int(limitEntries)
+        self.polygon = polygon
+        self.name = name if name is not None else f"{self.lat:.5f},{self.long:.5f}"
+
+    def to_dict(self):
+        # keyword arguments that rebuild the job, e.g. from the harvest store
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class JobSummary:
+    """Per-job counts reported after a (batch) harvest."""
+    __slots__ = ('job', 'countFound', 'placeIds', 'countNew', 'countPlaces', 'countReviews')
+
+    def __init__(self, job, countFound, placeIds, countNew):
+        self.job = job
+        self.countFound = countFound        # places returned by the searches
+        self.placeIds = placeIds            # places kept after filtering and clipping
+        self.countNew = countNew            # kept places not already found by an earlier job
+        self.countPlaces = 0                # kept places with reviews
+        self.countReviews = 0
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    photos of harvested places. photos are either downloaded during the
+    harvest or, in lazy mode, fetched at thumbnail size the first time a
+    place's popup is opened and cached on disk. they are kept as loose
+    jpeg files or packed into one sqlite photo store.
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+
+THUMBNAIL_SIZE = 400        # longest side of lazily fetched photos, in pixels
+PREVIEW_SIZE = 1600
+THUMBNAIL_DIR = 'thumbnails'
+
+PHOTO_STORE_NAME = 'photos.sqlite'
+PHOTO_STORE_COMMIT_EVERY = 100
+PHOTO_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS photos (place_id TEXT NOT NULL, idx INTEGER NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (place_id, idx));
+"""
+
+# max sizes in the order of the photoSize combo box; None keeps the original size
+PHOTO_SIZES = [PREVIEW_SIZE, THUMBNAIL_SIZE, None]
+
+
+def photo_filename(place_id, index):
+    # index counts from 1 in the order of the place's photos
+    return f"{place_id}_{index}.jpg"
+
+
+def fit_photo(photo, maxSize=None):
+    # (maxwidth, maxheight) to request; the api scales the photo down to fit
+    # the box keeping its aspect ratio. unknown dimensions request maxSize
+    if maxSize is None:
+        return photo.width, photo.height
+    return min(photo.width, maxSize) or maxSize, min(photo.height, maxSize) or maxSize
+
+
+def write_photo(data, filepath):
+    # write image bytes to filepath; False if they could not be written
+    try:
+        with open(filepath, 'wb') as f:
+            f.write(data)
+    except OSError:
+        return False
+    return True
+
+
+class PhotoStore:
+    """Photos of a harvest packed into one sqlite file instead of one file
+    per photo, keyed by place_id and index. identical images are stored
+    once, by content hash. thread safe."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(PHOTO_STORE_SCHEMA)
+
+    def put(self, place_id, index, data):
+        digest = hashlib.sha1(data).hexdigest()
+        with self.lock:
+            self.connection.execute("INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)", (digest, sqlite3.Binary(data)))
+            self.connection.execute("INSERT OR REPLACE INTO photos (place_id, idx, hash) VALUES (?, ?, ?)", (place_id, index, digest))
+            # commit in batches; one transaction per photo would dominate the write time
+            self.pending += 1
+            if self.pending >= PHOTO_STORE_COMMIT_EVERY:
+                self.connection.commit()
+                self.pending = 0
+
+    def get(self, place_id, index):
+        # image bytes of a photo, or None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT blobs.data FROM photos JOIN blobs ON blobs.hash = photos.hash WHERE photos.place_id = ? AND photos.idx = ?",
+                (place_id, index)
+            ).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def count_blobs(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+    def extract(self, dirName):
+        # write every photo as a loose {place_id}_{index}.jpg file; returns the number written
+        with self.lock:
+            keys = self.connection.execute("SELECT place_id, idx FROM photos").fetchall()
+        for place_id, index in keys:
+            with open(os.path.join(dirName, photo_filename(place_id, index)), 'wb') as f:
+                f.write(self.get(place_id, index))
+        return len(keys)
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM photos").fetchone()[0]
+
+
+class PhotoCache:
+    """Photos of the places of one harvest. photos saved by the harvest, as
+    files or in its photo store, are reused; others are fetched at thumbnail
+    size on first request and kept in the store or a thumbnails folder."""
+
+    def __init__(self, outputDirName, placesApi, size=THUMBNAIL_SIZE, store=None):
+        self.outputDirName = outputDirName
+        self.thumbnailDirName = os.path.join(outputDirName, THUMBNAIL_DIR)
+        self.placesApi = placesApi
+        self.size = size
+        self.store = store
+
+    def image(self, place_id, index, photo):
+        # image bytes of a photo, fetching it if needed; None if it could not be fetched
+        if self.store is not None:
+            data = self.store.get(place_id, index)
+            if data is not None:
+                return data
+
+        filename = photo_filename(place_id, index)
+        for dirName in (self.outputDirName, self.thumbnailDirName):
+            filepath = os.path.join(dirName, filename)
+            if os.path.exists(filepath):
+                with open(filepath, 'rb') as f:
+                    return f.read()
+
+        r = self.placesApi.photo(photo, *fit_photo(photo, self.size))
+        if r.status_code != 200:
+            return None
+
+        data = r.content
+        if self.store is not None:
+            self.store.put(place_id, index, data)
+        else:
+            os.makedirs(self.thumbnailDirName, exist_ok=True)
+            with open(os.path.join(self.thumbnailDirName, filename), 'wb') as f:
+                f.write(data)
+        return data
+
+    def images(self, place_id, photos, limit=None):
+        # image bytes of the first limit photos of a place that could be fetched
+        images = []
+        for index, photo in enumerate(photos[:limit], start=1):
+            data = self.image(place_id, index, photo)
+            if data is not None:
+                images.append(data)
+        return images
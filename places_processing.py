@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    processing provider. harvests and photo downloads run as processing
+    algorithms, i.e. as QgsTasks in the task manager, in batch mode, in
+    models and from qgis_process.
+"""
+
+import os
+import json
+import threading
+
+from qgis.PyQt.QtCore import Qt, QVariant, QCoreApplication
+from qgis.PyQt.QtGui import QIcon
+from qgis.core import (
+    QgsProcessing, QgsProcessingProvider, QgsProcessingAlgorithm, QgsProcessingException,
+    QgsProcessingParameterString, QgsProcessingParameterEnum, QgsProcessingParameterPoint,
+    QgsProcessingParameterNumber, QgsProcessingParameterFeatureSource, QgsProcessingParameterFileDestination,
+    QgsProcessingParameterFeatureSink, QgsProcessingParameterFolderDestination, QgsProcessingParameterField,
+    QgsProcessingParameterBoolean, QgsProcessingOutputNumber, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsFeature, QgsFeatureSink,
+    QgsField, QgsFields, QgsGeometry, QgsPointXY, QgsWkbTypes
+)
+
+from .places_filter import PRIORITIES
+from .places_photos import PREVIEW_SIZE
+from .places_usage import add_usage, USAGE_FILE_NAME
+
+PLUGIN_DIR = os.path.dirname(__file__)
+USAGE_FILE_PATH = os.path.join(PLUGIN_DIR, USAGE_FILE_NAME)
+
+# places api backends in the order of the BACKEND enum (see places_api.py)
+API_BACKENDS = ['legacy', 'new']
+
+
+def _tr(string):
+    return QCoreApplication.translate('Processing', string)
+
+
+class PlacesProvider(QgsProcessingProvider):
+    def __init__(self):
+        QgsProcessingProvider.__init__(self)
+        # algorithms running in parallel (batch mode, models) share one
+        # http session, requests-per-second budget and details cache
+        self.sharedLock = threading.Lock()
+        self.shared = None
+        self.keyPools = {}
+
+    def id(self):
+        return 'placesforqgis'
+
+    def name(self):
+        return _tr('Places for QGIS')
+
+    def icon(self):
+        return QIcon(os.path.join(PLUGIN_DIR, 'icon.png'))
+
+    def loadAlgorithms(self):
+        self.addAlgorithm(NearbyPlacesHarvestAlgorithm())
+        self.addAlgorithm(DownloadPlacePhotosAlgorithm())
+
+    def shared_http(self):
+        # (session, rate limiter, details cache, search cache); created on first use
+        with self.sharedLock:
+            if self.shared is None:
+                from .places_http import create_session, RateLimiter
+                from .places_cache import DetailsCache
+                from .places_tiles import SearchTileCache
+
+                self.shared = (create_session(), RateLimiter(), DetailsCache(), SearchTileCache())
+            return self.shared
+
+    def key_pool(self, gapiKey):
+        # one pool per key list, so keys retired by one run stay retired for the others
+        from .places_keys import KeyPool, parse_keys
+
+        with self.sharedLock:
+            if gapiKey not in self.keyPools:
+                self.keyPools[gapiKey] = KeyPool(parse_keys(gapiKey))
+            return self.keyPools[gapiKey]
+
+
+class PlacesAlgorithm(QgsProcessingAlgorithm):
+    API_KEY = 'API_KEY'
+    BACKEND = 'BACKEND'
+
+    def group(self):
+        return _tr('Google Places')
+
+    def groupId(self):
+        return 'googleplaces'
+
+    def createInstance(self):
+        return type(self)()
+
+    def _add_api_parameters(self):
+        self.addParameter(QgsProcessingParameterString(self.API_KEY, _tr('Places API key(s), comma separated')))
+        self.addParameter(QgsProcessingParameterEnum(self.BACKEND, _tr('Places API'), options=API_BACKENDS, defaultValue=0))
+
+    def _shared_http(self):
+        provider = self.provider()
+        if provider is None:
+            return None, None, None, None
+        return provider.shared_http()
+
+    def _api_key(self, parameters, context):
+        # shared pool of the given keys, or the plain text without a provider
+        gapiKey = self.parameterAsString(parameters, self.API_KEY, context)
+        provider = self.provider()
+        return provider.key_pool(gapiKey) if provider is not None else gapiKey
+
+    def _report_usage(self, usage, feedback):
+        # counts go to the usage store of the dialog, so its monthly and per key totals include processing runs
+        feedback.pushDebugInfo(f"api usage: {usage}")
+        if not add_usage(USAGE_FILE_PATH, usage):
+            feedback.reportError(f"could not write api usage to {USAGE_FILE_PATH}")
+
+
+class NearbyPlacesHarvestAlgorithm(PlacesAlgorithm):
+    CENTER = 'CENTER'
+    RADIUS = 'RADIUS'
+    AREA = 'AREA'
+    KEYWORD = 'KEYWORD'
+    LIMIT = 'LIMIT'
+    MIN_RATING = 'MIN_RATING'
+    MIN_RATINGS_TOTAL = 'MIN_RATINGS_TOTAL'
+    TYPES = 'TYPES'
+    PRIORITY = 'PRIORITY'
+    OUTPUT_XLSX = 'OUTPUT_XLSX'
+    OUTPUT = 'OUTPUT'
+    COUNT = 'COUNT'
+
+    def name(self):
+        return 'nearbyplacesharvest'
+
+    def displayName(self):
+        return _tr('Nearby places harvest')
+
+    def shortHelpString(self):
+        return _tr(
+            "Searches places within radius km of a centre point, or inside the polygons of an area layer "
+            "covered with circles of that radius, fetches their reviews and photo references and writes "
+            "them to a point layer and an xlsx workbook. The output layer feeds 'Download place photos'."
+        )
+
+    def initAlgorithm(self, config=None):
+        self._add_api_parameters()
+        self.addParameter(QgsProcessingParameterPoint(self.CENTER, _tr('Search centre'), optional=True))
+        self.addParameter(QgsProcessingParameterNumber(self.RADIUS, _tr('Radius (km)'), QgsProcessingParameterNumber.Double,
+                                                       defaultValue=1, minValue=0, maxValue=50))
+        self.addParameter(QgsProcessingParameterFeatureSource(self.AREA, _tr('Search area (replaces the centre)'),
+                                                              [QgsProcessing.TypeVectorPolygon], optional=True))
+        self.addParameter(QgsProcessingParameterString(self.KEYWORD, _tr('Keyword')))
+        self.addParameter(QgsProcessingParameterNumber(self.LIMIT, _tr('Limit entries'), defaultValue=60, minValue=0))
+        self.addParameter(QgsProcessingParameterNumber(self.MIN_RATING, _tr('Minimum rating'), QgsProcessingParameterNumber.Double,
+                                                       optional=True, minValue=0, maxValue=5))
+        self.addParameter(QgsProcessingParameterNumber(self.MIN_RATINGS_TOTAL, _tr('Minimum ratings count'), optional=True, minValue=0))
+        self.addParameter(QgsProcessingParameterString(self.TYPES, _tr('Place types (comma separated)'), optional=True))
+        self.addParameter(QgsProcessingParameterEnum(self.PRIORITY, _tr('Details priority'), options=PRIORITIES, defaultValue=0))
+        self.addParameter(QgsProcessingParameterFileDestination(self.OUTPUT_XLSX, _tr('Reviews workbook'), 'Excel files (*.xlsx)'))
+        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT, _tr('Places'), QgsProcessing.TypeVectorPoint))
+        self.addOutput(QgsProcessingOutputNumber(self.COUNT, _tr('Places with reviews')))
+
+    def _search_area(self, parameters, context):
+        # (lat, long, polygon rings) of the area layer in EPSG:4326, or None
+        source = self.parameterAsSource(parameters, self.AREA, context)
+        if source is None:
+            return None
+
+        geometry = QgsGeometry.unaryUnion([feature.geometry() for feature in source.getFeatures()])
+        if geometry is None or geometry.isEmpty():
+            raise QgsProcessingException(_tr('The search area has no geometry'))
+
+        geometry.transform(QgsCoordinateTransform(source.sourceCrs(), QgsCoordinateReferenceSystem('EPSG:4326'), context.transformContext()))
+        polygons = geometry.asMultiPolygon() if geometry.isMultipart() else [geometry.asPolygon()]
+        rings = [[(point.x(), point.y()) for point in ring] for polygon in polygons for ring in polygon]
+
+        centroid = geometry.centroid().asPoint()
+        return centroid.y(), centroid.x(), rings
+
+    def _fields(self):
+        fields = QgsFields()
+        fields.append(QgsField('name', QVariant.String))
+        fields.append(QgsField('place_id', QVariant.String))
+        fields.append(QgsField('types', QVariant.String))
+        fields.append(QgsField('rating', QVariant.Double))
+        fields.append(QgsField('user_ratings_total', QVariant.Int))
+        fields.append(QgsField('reviews', QVariant.String))
+        fields.append(QgsField('photos', QVariant.String))
+        return fields
+
+    def processAlgorithm(self, parameters, context, feedback):
+        from .places_model import HarvestJob
+        from .places_filter import PlaceFilter, parse_types
+        from .places_worker import Worker
+
+        radius = self.parameterAsDouble(parameters, self.RADIUS, context)
+        keyword = self.parameterAsString(parameters, self.KEYWORD, context)
+        limitEntries = self.parameterAsInt(parameters, self.LIMIT, context)
+
+        area = self._search_area(parameters, context)
+        if area is not None:
+            if radius <= 0:
+                raise QgsProcessingException(_tr('The radius must be more than 0 to cover a search area'))
+            latitude, longitude, polygon = area
+        elif parameters.get(self.CENTER):
+            center = self.parameterAsPoint(parameters, self.CENTER, context, QgsCoordinateReferenceSystem('EPSG:4326'))
+            latitude, longitude, polygon = center.y(), center.x(), None
+        else:
+            raise QgsProcessingException(_tr('Either a search centre or a search area is required'))
+
+        # optional numbers are None when left empty
+        minRating = parameters.get(self.MIN_RATING)
+        minRatingsTotal = parameters.get(self.MIN_RATINGS_TOTAL)
+        placeFilter = PlaceFilter(
+            self.parameterAsDouble(parameters, self.MIN_RATING, context) if minRating is not None else None,
+            self.parameterAsInt(parameters, self.MIN_RATINGS_TOTAL, context) if minRatingsTotal is not None else None,
+            types=parse_types(self.parameterAsString(parameters, self.TYPES, context))
+        )
+
+        xlsxFilePath = self.parameterAsFileOutput(parameters, self.OUTPUT_XLSX, context)
+        (sink, destId) = self.parameterAsSink(parameters, self.OUTPUT, context, self._fields(), QgsWkbTypes.Point,
+                                              QgsCoordinateReferenceSystem('EPSG:4326'))
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+
+        session, rateLimiter, detailsCache, searchCache = self._shared_http()
+        job = HarvestJob(latitude, longitude, radius, keyword, limitEntries, polygon)
+        worker = Worker([job], xlsxFilePath, self._api_key(parameters, context), '', False,
+                        backend=API_BACKENDS[self.parameterAsEnum(parameters, self.BACKEND, context)],
+                        placeFilter=placeFilter, session=session, rateLimiter=rateLimiter, detailsCache=detailsCache, searchCache=searchCache,
+                        photoReferences=True, priority=PRIORITIES[self.parameterAsEnum(parameters, self.PRIORITY, context)])
+
+        # the worker runs inside this task's thread; its signals are delivered directly
+        results = []
+        worker.addMessage.connect(feedback.pushInfo, Qt.DirectConnection)
+        worker.addError.connect(feedback.reportError, Qt.DirectConnection)
+        worker.progress.connect(feedback.setProgress, Qt.DirectConnection)
+        worker.api.connect(lambda usage: self._report_usage(usage, feedback), Qt.DirectConnection)
+        worker.finished.connect(results.append, Qt.DirectConnection)
+        feedback.canceled.connect(worker.stop, Qt.DirectConnection)
+
+        worker.run()
+
+        # a cancelled harvest still flushes the places fetched so far to the workbook; the layer gets the same
+        placesData = results[-1] if len(results) > 0 else []
+        if feedback.isCanceled() and len(placesData) > 0:
+            feedback.pushInfo(f"harvest cancelled, keeping the {len(placesData)} places fetched")
+
+        for place in placesData:
+            feature = QgsFeature()
+            feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(place.long, place.lat)))
+            feature.setAttributes([
+                place.name,
+                place.place_id,
+                ', '.join(place.types),
+                place.rating,
+                place.user_ratings_total,
+                json.dumps(place.reviews_as_dicts()),
+                json.dumps([[photo.reference, photo.width, photo.height] for photo in place.photos])
+            ])
+            sink.addFeature(feature, QgsFeatureSink.FastInsert)
+
+        return {self.OUTPUT: destId, self.OUTPUT_XLSX: xlsxFilePath, self.COUNT: len(placesData)}
+
+
+class DownloadPlacePhotosAlgorithm(PlacesAlgorithm):
+    INPUT = 'INPUT'
+    PLACE_ID_FIELD = 'PLACE_ID_FIELD'
+    PHOTOS_FIELD = 'PHOTOS_FIELD'
+    MAX_SIZE = 'MAX_SIZE'
+    PACK = 'PACK'
+    OUTPUT_FOLDER = 'OUTPUT_FOLDER'
+    COUNT = 'COUNT'
+
+    def name(self):
+        return 'downloadplacephotos'
+
+    def displayName(self):
+        return _tr('Download place photos')
+
+    def shortHelpString(self):
+        return _tr(
+            "Downloads the photos referenced by a layer produced by 'Nearby places harvest' into a folder, "
+            "as <place_id>_<n>.jpg files. Photos larger than the maximum size are scaled down by the api."
+        )
+
+    def initAlgorithm(self, config=None):
+        self._add_api_parameters()
+        self.addParameter(QgsProcessingParameterFeatureSource(self.INPUT, _tr('Places'), [QgsProcessing.TypeVectorPoint]))
+        self.addParameter(QgsProcessingParameterField(self.PLACE_ID_FIELD, _tr('Place id field'), 'place_id', self.INPUT))
+        self.addParameter(QgsProcessingParameterField(self.PHOTOS_FIELD, _tr('Photos field'), 'photos', self.INPUT))
+        self.addParameter(QgsProcessingParameterNumber(self.MAX_SIZE, _tr('Maximum photo size (px)'),
+                                                       defaultValue=PREVIEW_SIZE, minValue=1, maxValue=4800))
+        self.addParameter(QgsProcessingParameterBoolean(self.PACK, _tr('Pack photos into one photos.sqlite file'), defaultValue=False))
+        self.addParameter(QgsProcessingParameterFolderDestination(self.OUTPUT_FOLDER, _tr('Output folder')))
+        self.addOutput(QgsProcessingOutputNumber(self.COUNT, _tr('Downloaded photos')))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        from .places_api import create_api, PlacesApiError
+        from .places_model import Photo
+        from .places_photos import photo_filename, write_photo, fit_photo, PhotoStore, PHOTO_STORE_NAME
+        from .places_retry import RetryQueue, PHOTO
+
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        if source is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+
+        placeIdField = self.parameterAsString(parameters, self.PLACE_ID_FIELD, context)
+        photosField = self.parameterAsString(parameters, self.PHOTOS_FIELD, context)
+        maxSize = self.parameterAsInt(parameters, self.MAX_SIZE, context)
+        outputDirName = self.parameterAsString(parameters, self.OUTPUT_FOLDER, context)
+        os.makedirs(outputDirName, exist_ok=True)
+        photoStore = PhotoStore(os.path.join(outputDirName, PHOTO_STORE_NAME)) if self.parameterAsBoolean(parameters, self.PACK, context) else None
+
+        # photo references of every place
+        photos = []
+        for feature in source.getFeatures():
+            try:
+                references = json.loads(feature[photosField] or '[]')
+            except ValueError:
+                feedback.reportError(f"could not read photos of place {feature[placeIdField]}")
+                continue
+            for index, (reference, width, height) in enumerate(references, start=1):
+                photos.append((feature[placeIdField], index, Photo(reference, width, height)))
+
+        session, rateLimiter, detailsCache, _ = self._shared_http()
+        if detailsCache is None:
+            from .places_cache import DetailsCache
+            detailsCache = DetailsCache()
+        placesApi = create_api(API_BACKENDS[self.parameterAsEnum(parameters, self.BACKEND, context)],
+                               self._api_key(parameters, context), session, rateLimiter)
+
+        # requests in flight are dropped as soon as the algorithm is cancelled
+        feedback.canceled.connect(placesApi.cancel, Qt.DirectConnection)
+        retryQueue = RetryQueue()
+
+        def download(place_id, index, photo):
+            # True once the photo is saved. a failed request is queued for one more attempt at the
+            # end; only running out of api keys stops the downloads
+            filename = photo_filename(place_id, index)
+            # a photo being downloaded by a harvest or another algorithm is waited for
+            try:
+                status, data = detailsCache.fetch_photo(photo, *fit_photo(photo, maxSize), placesApi.photo)
+            except PlacesApiError as ex:
+                if ex.status == 'NO_API_KEY':
+                    raise
+                if not feedback.isCanceled():
+                    feedback.reportError(f"could not download file {filename}. {ex}")
+                    retryQueue.add(PHOTO, place_id, photo, ex.status, index)
+                return False
+            retryQueue.discard(PHOTO, place_id, index)
+
+            if status != 200:
+                feedback.reportError(f"could not download file {filename}")
+                return False
+
+            if photoStore is not None:
+                photoStore.put(place_id, index, data)
+                return True
+            if write_photo(data, os.path.join(outputDirName, filename)):
+                return True
+            feedback.reportError(f"could not write file {filename}")
+            return False
+
+        feedback.pushInfo(f"downloading {len(photos)} images...")
+        countSaved = 0
+
+        try:
+            for count, (place_id, index, photo) in enumerate(photos):
+                if feedback.isCanceled():
+                    break
+                feedback.setProgress(100 * count / len(photos))
+                countSaved += download(place_id, index, photo)
+
+            # second chance for the photos that failed with a transient error
+            failures = retryQueue.retryable(PHOTO)
+            if len(failures) > 0 and not feedback.isCanceled():
+                feedback.pushInfo(f"retrying {len(failures)} images...")
+                for failure in failures:
+                    if feedback.isCanceled():
+                        break
+                    countSaved += download(failure.place_id, failure.index, failure.item)
+        except PlacesApiError as ex:
+            feedback.reportError(f"Error downloading images. {ex}")
+
+        if len(retryQueue) > 0 and not feedback.isCanceled():
+            counts = ', '.join(f"{count} {status}" for status, count in sorted(retryQueue.count_by_status().items()))
+            feedback.reportError(f"{len(retryQueue)} images could not be downloaded ({counts})")
+
+        if photoStore is not None:
+            feedback.pushInfo(f"packed {len(photoStore)} photos ({photoStore.count_blobs()} distinct) into {PHOTO_STORE_NAME}")
+            photoStore.close()
+
+        self._report_usage(placesApi.usage_report(), feedback)
+        return {self.OUTPUT_FOLDER: outputDirName, self.COUNT: countSaved}
@@ -24,11 +24,10 @@
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction
+from qgis.core import QgsApplication
 
-# Initialize Qt resources from file resources.py
-from .resources import *
-# Import the code for the dialog
-from .places_qgis_dialog import PlacesQgisDialog
+# Qt resources (resources.py) and the dialog are imported on first use in run()
+# so that loading the plugin does not slow down QGIS startup
 import os.path
 
 
@@ -157,10 +156,20 @@ class PlacesQgis:
 
         return action
 
+    def initProcessing(self):
+        """Register the processing provider; also called by qgis_process."""
+        from .places_processing import PlacesProvider
+
+        self.provider = PlacesProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
 
-        icon_path = ':/plugins/places_qgis/icon.png'
+        self.initProcessing()
+
+        # load the icon from disk; the compiled resources are only registered when the dialog is opened
+        icon_path = os.path.join(self.plugin_dir, 'icon.png')
         self.add_action(
             icon_path,
             text=self.tr(u'Google Places'),
@@ -179,6 +188,8 @@ class PlacesQgis:
                 action)
             self.iface.removeToolBarIcon(action)
 
+        QgsApplication.processingRegistry().removeProvider(self.provider)
+
 
     def run(self):
         """Run method that performs all the real work"""
@@ -187,6 +198,12 @@ class PlacesQgis:
         # Only create GUI ONCE in callback, so that it will only load when the plugin is started
         if self.first_start == True:
             self.first_start = False
+
+            # Initialize Qt resources from file resources.py
+            from . import resources
+            # Import the code for the dialog
+            from .places_qgis_dialog import PlacesQgisDialog
+
             self.dlg = PlacesQgisDialog()
 
         # show the dialog
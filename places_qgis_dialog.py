@@ -6,41 +6,57 @@
 """
 
 import os
-import requests
-import pandas as pd
-import xlsxwriter
+import json
+import importlib.util
 from datetime import datetime
-import numpy as np
-import time
 
-from qgis.PyQt import uic
 from qgis.PyQt import QtWidgets
-from qgis.PyQt.QtWidgets import QFileDialog, QMessageBox
-from qgis.PyQt.QtCore import QObject, QThread, pyqtSignal, QVariant
-from qgis.core import QgsVectorLayer, QgsFeature, QgsGeometry, QgsPointXY, QgsProject, QgsField, QgsMarkerSymbol
-
-from PyQt5.QtWebKitWidgets import QWebView
-
-XLSX_COL_WIDTHS = {
-    'A': 2,
-    'B': 15,
-    'C': 15,
-    'D': 25,
-    'E': 30,
-    'F': 30,
-    'G': 25,
-    'H': 100,
-    'I': 30
-}
-
-METADATA_DOWNLOAD_PROGRESS = 10
-IMAGE_DOWNLOAD_PROGRESS = 30
-NPT_VALIDITY_DELAY = 5      # time taken for next page token to be valid after being issued
-CHUNK_SIZE = 4096           # chunk size for files
-
-# This loads your .ui file so that PyQt can populate your plugin with the elements from Qt Designer
-FORM_CLASS, _ = uic.loadUiType(os.path.join(
-    os.path.dirname(__file__), 'places_qgis_dialog_base.ui'))
+from qgis.PyQt.QtWidgets import QFileDialog, QMessageBox, QCheckBox, QComboBox, QInputDialog
+from qgis.PyQt.QtCore import QVariant, QUrl
+from qgis.core import QgsVectorLayer, QgsFeature, QgsGeometry, QgsPointXY, QgsProject, QgsField, \
+    QgsFillSymbol, QgsWkbTypes, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsApplication, QgsTask
+
+from .places_jobs import HarvestQueue, QueuedHarvest, QUEUED, RUNNING, DONE
+from .places_filter import PRIORITIES
+from .places_usage import read_usage, add_usage, USAGE_FILE_NAME
+from .places_photos import PHOTO_SIZES
+from .places_store import HARVEST_STORE_NAME
+from .places_model import StoredReviews
+from .geodesy import circle_polygon
+
+# heavy dependencies (requests, xlsxwriter, QtWebKit) are only
+# imported when a download is started or a popup is opened; see places_worker.py
+
+PLUGIN_DIR = os.path.dirname(__file__)
+COMPILED_UI_PATH = os.path.join(PLUGIN_DIR, '.qt_for_python', 'uic', 'places_qgis_dialog_base.py')
+
+# places api backends in the order of the apiBackend combo box items (see places_api.py)
+API_BACKENDS = ['legacy', 'new']
+
+JOB_TABLE_COLUMNS = ['job', 'status', 'progress']
+
+POPUP_PHOTOS = 3            # photos shown in a place's popup
+
+
+def _load_form_class():
+    # prefer the ui module precompiled by pyuic5 over parsing the .ui file at runtime
+    if os.path.exists(COMPILED_UI_PATH):
+        spec = importlib.util.spec_from_file_location('places_qgis_dialog_base', COMPILED_UI_PATH)
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            pass
+        else:
+            return module.Ui_PlacesQgisDialogBase
+
+    # fall back to loading the .ui file so that PyQt can populate the plugin with the elements from Qt Designer
+    from qgis.PyQt import uic
+    formClass, _ = uic.loadUiType(os.path.join(PLUGIN_DIR, 'places_qgis_dialog_base.ui'))
+    return formClass
+
+
+FORM_CLASS = _load_form_class()
 
 
 class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
@@ -54,9 +70,33 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
         # #widgets-and-dialogs-with-auto-connect
         self.setupUi(self)
 
-        # initialize flags and qt elements
-        # set download in progress flag as false
-        self.isDownloadInProgress = False
+        # initialize queue and qt elements
+        # harvests are queued and several of them may run at once; every
+        # finished harvest is recorded in the harvest store of the plugin
+        self.harvestQueue = HarvestQueue(harvestStorePath=os.path.join(PLUGIN_DIR, HARVEST_STORE_NAME))
+        self.harvestQueue.changed.connect(self._harvest_changed)
+        self.harvestQueue.message.connect(self._message_from_harvest)
+        self.harvestQueue.error.connect(self._error_from_worker)
+        self.harvestQueue.usage.connect(self._report_api_usage)
+        self.harvestQueue.harvestFinished.connect(self._harvest_finished)
+
+        # table row of every harvest, map layers and browser windows of all harvests
+        self.harvestRows = {}
+        self.layerIds = []
+        self.webViews = []
+        self.photoCaches = {}
+        self.photoTasks = []        # photo fetches of open popups; referenced until they finish
+        self.spillStores = []
+
+        self.jobTable.setColumnCount(len(JOB_TABLE_COLUMNS))
+        self.jobTable.setHorizontalHeaderLabels(JOB_TABLE_COLUMNS)
+        self.jobTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.jobTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.jobTable.horizontalHeader().setStretchLastSection(True)
+        self.jobTable.setColumnWidth(0, 260)
+
+        # several keys share the load; requests rotate over them
+        self.gapiKey.setToolTip("places api key, or several keys separated by commas")
 
         # set logbox empty
         self.logBox.setPlainText("")
@@ -77,7 +117,24 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
             'KEYWORD': self.keyword,
             'SAVE_LOG': self.saveLogCheck,
             'SAVE_IMAGES': self.saveImages,
-            'LIMIT_ENTRIES': self.limitEntries
+            'LIMIT_ENTRIES': self.limitEntries,
+            'API_BACKEND': self.apiBackend,
+            'MIN_RATING': self.minRating,
+            'MIN_RATINGS_TOTAL': self.minRatingsTotal,
+            'TWO_PASS_DETAILS': self.twoPassDetails,
+            'PLACE_TYPES': self.placeTypes,
+            'MATCH_KEYWORD_LOCALLY': self.matchKeywordLocally,
+            'AOI_LAYER': self.aoiLayer,
+            'AOI_SELECTED_ONLY': self.aoiSelectedOnly,
+            'BATCH_FILE_PATH': self.batchFilePath,
+            'MAX_CONCURRENT_JOBS': self.maxConcurrentJobs,
+            'MAX_QPS': self.maxQps,
+            'DETAILS_PRIORITY': self.detailsPriority,
+            'LAZY_PHOTOS': self.lazyPhotos,
+            'PHOTO_SIZE': self.photoSize,
+            'PACK_PHOTOS': self.packPhotos,
+            'INCREMENTAL_HARVEST': self.incrementalHarvest,
+            'MEMORY_BUDGET': self.memoryBudget
         }
 
         self.api_report_map = {
@@ -86,9 +143,9 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
             'PHOTOS': self.photosUsage
         }
 
-        self.configFilePath = os.path.join(os.path.dirname(__file__), ".conf")
-        self.logFilePath = os.path.join(os.path.dirname(__file__), ".logfile")
-        self.usageFilePath = os.path.join(os.path.dirname(__file__), "usage.dat")
+        self.configFilePath = os.path.join(PLUGIN_DIR, ".conf")
+        self.logFilePath = os.path.join(PLUGIN_DIR, ".logfile")
+        self.usageFilePath = os.path.join(PLUGIN_DIR, USAGE_FILE_NAME)
 
         # connect buttons to handler
         self.startButton.clicked.connect(self._start_download_thread)
@@ -97,6 +154,16 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
         self.closeWindows.clicked.connect(self._close_browser_windows)
         self.removeLayers.clicked.connect(self._remove_layers)
         self.outputDirPicker.clicked.connect(self._select_output_folder)
+        self.batchFilePicker.clicked.connect(self._select_batch_file)
+        self.batchStartButton.clicked.connect(self._start_batch_thread)
+        self.cancelJobButton.clicked.connect(self._cancel_selected_harvests)
+        self.clearJobsButton.clicked.connect(self._clear_finished_harvests)
+        self.loadHarvestButton.clicked.connect(self._load_previous_harvest)
+
+        # list polygon layers that can be used as search area
+        self._refresh_aoi_layers()
+        QgsProject.instance().layersAdded.connect(self._refresh_aoi_layers)
+        QgsProject.instance().layersRemoved.connect(self._refresh_aoi_layers)
 
         # load previous user input
         self._load_prev_input()
@@ -128,6 +195,10 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
         outputDir = QFileDialog.getExistingDirectory(self, "choose output directory")
         self.outputDirName.setText(outputDir)
 
+    def _select_batch_file(self):
+        batchFilePath, _ = QFileDialog.getOpenFileName(self, "choose batch file", "", "Batch files (*.csv *.xlsx)")
+        self.batchFilePath.setText(batchFilePath)
+
     def _cleanup(self):
         # clean vector layer
         self._remove_layers()
@@ -135,20 +206,65 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
         # close open browser windows
         self._close_browser_windows()
 
+        # close photo stores opened for popups
+        for photoCache in self.photoCaches.values():
+            if photoCache.store is not None:
+                photoCache.store.close()
+        self.photoCaches = {}
+
+        # spilled reviews are only read by the popups of the layers just removed
+        for spillStore in self.spillStores:
+            spillStore.close()
+        self.spillStores = []
+
     def _close_browser_windows(self):
-        if hasattr(self, 'webViews'):
-            for webView in self.webViews:
-                try:
-                    webView.close()
-                except:
-                    pass
+        for webView in self.webViews:
+            try:
+                webView.close()
+            except:
+                pass
+        self.webViews = []
 
     def _remove_layers(self):
         try:
-            QgsProject.instance().removeMapLayers([self.boundaryLayer.id(), self.markerLayer.id()])
+            QgsProject.instance().removeMapLayers(self.layerIds)
             QgsProject.instance().refreshAllLayers()
         except:
             pass
+        self.layerIds = []
+
+    def _refresh_aoi_layers(self, *args):
+        # first entry searches the circle around latitude/longitude
+        currentId = self.aoiLayer.currentData()
+        self.aoiLayer.clear()
+        self.aoiLayer.addItem("circle around latitude/longitude", None)
+
+        for layer in QgsProject.instance().mapLayers().values():
+            if isinstance(layer, QgsVectorLayer) and layer.geometryType() == QgsWkbTypes.PolygonGeometry:
+                self.aoiLayer.addItem(layer.name(), layer.id())
+
+        self.aoiLayer.setCurrentIndex(max(self.aoiLayer.findData(currentId), 0))
+
+    def _aoi_geometry(self):
+        # union of the chosen polygon layer's (selected) features in EPSG:4326, or None
+        layerId = self.aoiLayer.currentData()
+        layer = QgsProject.instance().mapLayer(layerId) if layerId is not None else None
+        if layer is None:
+            return None
+
+        features = layer.selectedFeatures() if self.aoiSelectedOnly.isChecked() else layer.getFeatures()
+        geometry = QgsGeometry.unaryUnion([feature.geometry() for feature in features])
+        if geometry is None or geometry.isEmpty():
+            return None
+
+        transform = QgsCoordinateTransform(layer.crs(), QgsCoordinateReferenceSystem("EPSG:4326"), QgsProject.instance())
+        geometry.transform(transform)
+        return geometry
+
+    def _geometry_rings(self, geometry):
+        # list of (lon, lat) rings as consumed by geodesy.py
+        polygons = geometry.asMultiPolygon() if geometry.isMultipart() else [geometry.asPolygon()]
+        return [[(point.x(), point.y()) for point in ring] for polygon in polygons for ring in polygon]
 
     def _save_input(self):
         try:
@@ -159,8 +275,10 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
         l = list()
 
         for key, val in self.elem_config_map.items():
-            if key == 'SAVE_LOG' or key == 'SAVE_IMAGES':
+            if isinstance(val, QCheckBox):
                 l.append(f"{key}={'true' if val.isChecked() else 'false'}")
+            elif isinstance(val, QComboBox):
+                l.append(f"{key}={val.currentText()}")
             else:
                 l.append(f"{key}={val.text()}")
 
@@ -178,11 +296,15 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
                 return
 
             for line in f.readlines():
-                key, val = line.strip('\n').split("=")
+                key, val = line.strip('\n').split("=", 1)
+                if key not in self.elem_config_map:
+                    continue
                 elem = self.elem_config_map[key]
 
-                if key == 'SAVE_LOG' or key == 'SAVE_IMAGES':
+                if isinstance(elem, QCheckBox):
                     elem.setChecked(val == "true")
+                elif isinstance(elem, QComboBox):
+                    elem.setCurrentIndex(max(elem.findText(val), 0))
                 else:    
                     elem.setText(val)
 
@@ -190,8 +312,9 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
             return
 
     def _start_download_thread(self):
-        self._cleanup()
-        self.progressBar.setValue(0)
+        if self.harvestQueue.is_idle():
+            self._cleanup()
+            self.progressBar.setValue(0)
 
         def float_error(elem, elem_name):
             QMessageBox.warning(self, "Error", f"{elem_name} is not numeric")
@@ -213,28 +336,40 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
             elem.setFocus()
             elem.selectAll()
 
+        def area_radius_error(elem):
+            QMessageBox.warning(self, "Error", "radius must be more than 0 kms to cover a search area")
+            elem.setFocus()
+            elem.selectAll()
+
         def limit_error(elem):
             QMessageBox.warning(self, "Error", "entry limit cannot be negative")
             elem.setFocus()
             elem.selectAll()
 
-        if not self.isDownloadInProgress:
+        if self._apply_queue_limits():
             # collect data
-            try:
-                latitude = float(self.latitude.text())
-            except Exception as ex:
-                float_error(self.latitude, "latitude")
+            aoiGeometry = self._aoi_geometry()
 
-            if not (-90 <= latitude <= 90):
-                lat_error(self.latitude)
+            if aoiGeometry is not None:
+                # search inside a polygon; its centroid stands in for the centre
+                centroid = aoiGeometry.centroid().asPoint()
+                latitude, longitude = centroid.y(), centroid.x()
+            else:
+                try:
+                    latitude = float(self.latitude.text())
+                except Exception as ex:
+                    float_error(self.latitude, "latitude")
+
+                if not (-90 <= latitude <= 90):
+                    lat_error(self.latitude)
                 
-            try:
-                longitude = float(self.longitude.text())
-            except Exception as ex:
-                float_error(self.longitude, "longitude")
+                try:
+                    longitude = float(self.longitude.text())
+                except Exception as ex:
+                    float_error(self.longitude, "longitude")
 
-            if not (-180 <= longitude <= 180):
-                long_error(self.longitude)
+                if not (-180 <= longitude <= 180):
+                    long_error(self.longitude)
 
             try:
                 limitEntries = int(self.limitEntries.text())
@@ -251,6 +386,10 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
 
             if not (0 <= radius <= 50):
                 rad_error(self.radius)
+            elif aoiGeometry is not None and radius == 0:
+                area_radius_error(self.radius)
+
+            placeFilter = self._create_place_filter(self.keyword.text())
 
             gapiKey = self.gapiKey.text()
             keyword = self.keyword.text()
@@ -276,497 +415,466 @@ class PlacesQgisDialog(QtWidgets.QDialog, FORM_CLASS):
             
             if ('latitude' in locals()) and ('longitude' in locals()) and ('radius' in locals()) and\
                 -180 <= longitude <= 180 and -90 <= latitude <= 90 and limitEntries >= 0 and\
-                len(gapiKey) != 0 and len(keyword) != 0 and len(xlsxFilePath) != 0 and len(outputDirName) != 0:
-
-                # no error in input; set download thread in progress
-                self.isDownloadInProgress = True
-
-                # enable and disable start and stop buttons
-                self.startButton.setEnabled(False)
-                self.stopButton.setEnabled(True)
-
-                # clear log box
-                self.logBox.clear()
-
-                # create worker
-                self.thread = QThread()
-                self.worker = Worker(latitude, longitude, radius, xlsxFilePath, gapiKey, keyword, outputDirName, self.saveImages.isChecked(), limitEntries)
-                self.worker.moveToThread(self.thread)
-
-                # connect signals to slots
-                self.worker.addMessage.connect(self._message_from_worker)
-                self.worker.addError.connect(self._error_from_worker)
-                self.worker.progress.connect(self._progress_from_worker)
-                self.worker.total.connect(self._total_from_worker)
-                self.worker.api.connect(self._report_api_usage)
-
-                self.thread.started.connect(self.worker.run)
-                self.worker.finished.connect(self.thread.quit)
-                self.worker.finished.connect(self.worker.deleteLater)
-                self.thread.finished.connect(self.thread.deleteLater)
-
-                # start thread and run worker
-                self.thread.start()
-
-                # enable button after thread finishes; set download not in progress
-                def worker_finished(placesData): 
-                    self.startButton.setEnabled(True)    
-                    self.stopButton.setEnabled(False)
-                    self.isDownloadInProgress = False
-                    self.progressBar.setValue(self.progressBar.maximum())  
-
-                    if type(placesData) == pd.DataFrame and len(placesData) > 0:    
-                            self.placesData = placesData
-                            self._draw_layers(latitude, longitude, radius)
-                    
-                self.worker.finished.connect(worker_finished)
+                (aoiGeometry is None or radius > 0) and\
+                len(gapiKey) != 0 and len(keyword) != 0 and len(xlsxFilePath) != 0 and len(outputDirName) != 0 and placeFilter is not None:
+
+                from .places_model import HarvestJob
+
+                polygon = self._geometry_rings(aoiGeometry) if aoiGeometry is not None else None
+                jobs = [HarvestJob(latitude, longitude, radius, keyword, limitEntries, polygon)]
+                label = f"{keyword} in {self.aoiLayer.currentText()}" if aoiGeometry is not None else f"{keyword} around {jobs[0].name}"
+                self._enqueue_harvest(label, jobs, xlsxFilePath, gapiKey, outputDirName, placeFilter, aoiGeometry)
             else:
                 QMessageBox.warning(self, "Error", "Can not download without appropriate data!")
 
-    def _draw_layers(self, clat, clong, radius):
-        self.logBox.append('drawing vector layers...')
+    def _start_batch_thread(self):
+        # run every row of the batch file through one worker
+        if not self._apply_queue_limits():
+            return
 
-        # create boundary layer
-        self.boundaryLayer = QgsVectorLayer("Point?crs=epsg:4326", "places boundary", "memory")
-        self.boundaryProvider = self.boundaryLayer.dataProvider()
-        self.boundaryLayer.startEditing()
+        if self.harvestQueue.is_idle():
+            self._cleanup()
+            self.progressBar.setValue(0)
 
-        # define symbol to be a boundary
-        symbol = QgsMarkerSymbol.createSimple({
-            'name': 'circle', 
-            'color': '255, 255, 255, 0',
-            'size': str(2 * radius * 1_000),
-            'size_unit': 'RenderMetersInMapUnits',
-            'outline_color': '35,35,35,255', 
-            'outline_style': 'solid', 
-            'outline_width': '10',
-            'outline_width_unit': 'RenderMetersInMapUnits'
-        })
-        
-        self.boundaryLayer.renderer().setSymbol(symbol)
+        gapiKey = self.gapiKey.text()
+        xlsxFilePath = self.xlsxFilePath.text()
+        outputDirName = self.outputDirName.text()
+        batchFilePath = self.batchFilePath.text()
 
-        # draw circular boundary
-        boundary = QgsFeature()
-        boundary.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(clong, clat)))
-        self.boundaryProvider.addFeatures([boundary])
+        for value, elem, name in ((gapiKey, self.gapiKey, "places api key"), (xlsxFilePath, self.xlsxFilePath, "xlsx file path"),
+                                  (outputDirName, self.outputDirName, "output directory"), (batchFilePath, self.batchFilePath, "batch file")):
+            if len(value) == 0:
+                QMessageBox.warning(self, "Error", f"{name} needs to be specified")
+                elem.setFocus()
+                return
 
-        self.boundaryLayer.commitChanges()
-        QgsProject.instance().addMapLayer(self.boundaryLayer)
+        def field_default(elem, cast):
+            # dialog values serve as defaults for empty cells
+            try:
+                return cast(elem.text())
+            except ValueError:
+                return None
 
-        # create marker layer
-        self.markerLayer = QgsVectorLayer("Point?crs=epsg:4326", "places markers", "memory")
-        self.markerProvider = self.markerLayer.dataProvider()
-        self.markerLayer.startEditing()
+        from .places_batch import read_jobs
 
-        self.markerProvider.addAttributes([
-            QgsField('name', QVariant.String),
-            QgsField('latitude', QVariant.Double),
-            QgsField('longitude', QVariant.Double),
-            QgsField('place_id', QVariant.String),
-            QgsField('types', QVariant.List),
-            QgsField('reviews', QVariant.Hash)
-        ])
+        try:
+            jobs = read_jobs(
+                batchFilePath,
+                radius=field_default(self.radius, float),
+                keyword=self.keyword.text() or None,
+                limitEntries=field_default(self.limitEntries, int)
+            )
+        except (OSError, ValueError) as ex:
+            QMessageBox.warning(self, "Error", f"Could not read batch file. {ex}")
+            self.batchFilePath.setFocus()
+            return
 
-        self.logBox.append(f"adding {len(self.placesData)} features")
+        placeFilter = self._create_place_filter(self.keyword.text())
+        if placeFilter is None:
+            return
 
-        for _, row in self.placesData.iterrows():
-            marker = QgsFeature()
-            marker.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(row['long'], row['lat'])))
-            marker.setAttributes([
-                row['name'],
-                float(row['lat']),
-                float(row['long']),
-                row['place_id'],
-                row['types'],
-                row['data']['reviews']
-            ])
-            self.markerProvider.addFeatures([marker])
+        harvest = self._enqueue_harvest(f"batch {os.path.basename(batchFilePath)}", jobs, xlsxFilePath, gapiKey, outputDirName, placeFilter)
+        self.logBox.append(f"[{harvest.number}] queued batch of {len(jobs)} jobs")
 
-        self.logBox.append(f"added {len(self.placesData)} features")
+    def _create_place_filter(self, keyword):
+        # filters applied before any details are fetched; empty fields mean no filter. None on bad input
+        from .places_filter import PlaceFilter, parse_types
 
-        self.markerLayer.commitChanges()
-        QgsProject.instance().addMapLayer(self.markerLayer)
+        minRating = None
+        minRatingsTotal = None
 
-        # add selection handler
-        self.markerLayer.selectionChanged.connect(self._handle_feature_selection)
-        self.webViews = []
+        if len(self.minRating.text()) > 0:
+            try:
+                minRating = float(self.minRating.text())
+            except ValueError:
+                QMessageBox.warning(self, "Error", "min rating is not numeric")
+                self.minRating.setFocus()
+                self.minRating.selectAll()
+                return None
+
+        if len(self.minRatingsTotal.text()) > 0:
+            try:
+                minRatingsTotal = int(self.minRatingsTotal.text())
+            except ValueError:
+                QMessageBox.warning(self, "Error", "min ratings count is not numeric")
+                self.minRatingsTotal.setFocus()
+                self.minRatingsTotal.selectAll()
+                return None
+
+        return PlaceFilter(
+            minRating, minRatingsTotal,
+            keyword=keyword if self.matchKeywordLocally.isChecked() else None,
+            types=parse_types(self.placeTypes.text())
+        )
+
+    def _apply_queue_limits(self):
+        # concurrent harvests, shared requests per second and memory budget; False on bad input
+        try:
+            maxConcurrent = int(self.maxConcurrentJobs.text())
+            if maxConcurrent < 1:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Error", "concurrent jobs must be a positive integer")
+            self.maxConcurrentJobs.setFocus()
+            self.maxConcurrentJobs.selectAll()
+            return False
 
-    def _open_web_view(self, name, lat, long, place_id, types, reviews):
-        webView = QWebView()
-        self.webViews.append(webView)
+        try:
+            qps = float(self.maxQps.text())
+            if qps <= 0:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Error", "requests / sec must be a positive number")
+            self.maxQps.setFocus()
+            self.maxQps.selectAll()
+            return False
+
+        # empty memory budget keeps whole harvests in memory
+        try:
+            memoryBudget = int(self.memoryBudget.text()) if self.memoryBudget.text().strip() else None
+            if memoryBudget is not None and memoryBudget < 1:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Error", "memory budget must be a positive number of MB or empty")
+            self.memoryBudget.setFocus()
+            self.memoryBudget.selectAll()
+            return False
+
+        self.harvestQueue.set_limits(maxConcurrent, qps, memoryBudget)
+        return True
+
+    def _enqueue_harvest(self, label, jobs, xlsxFilePath, gapiKey, outputDirName, placeFilter, aoiGeometry=None):
+        # no error in input; clear log box unless other harvests are still reporting
+        if self.harvestQueue.is_idle():
+            self.logBox.clear()
+
+        harvest = self.harvestQueue.enqueue(label, jobs, xlsxFilePath, {
+            'gapiKey': gapiKey,
+            'outputDirName': outputDirName,
+            # lazy mode records photo references; images are fetched when a place is opened
+            'saveImages': self.saveImages.isChecked() and not self.lazyPhotos.isChecked(),
+            'photoReferences': self.lazyPhotos.isChecked(),
+            'photoSize': PHOTO_SIZES[self.photoSize.currentIndex()],
+            'packPhotos': self.packPhotos.isChecked(),
+            'incremental': self.incrementalHarvest.isChecked(),
+            'backend': API_BACKENDS[self.apiBackend.currentIndex()],
+            'placeFilter': placeFilter,
+            'twoPass': self.twoPassDetails.isChecked(),
+            'priority': PRIORITIES[self.detailsPriority.currentIndex()]
+        }, aoiGeometry)
+
+        if harvest.xlsxFilePath != xlsxFilePath:
+            self.logBox.append(f"[{harvest.number}] writing to {harvest.xlsxFilePath}; {xlsxFilePath} is used by another harvest")
+
+        self.stopButton.setEnabled(True)
+        return harvest
+
+    def _harvest_changed(self, number):
+        harvest = self.harvestQueue.harvests.get(number)
+        if harvest is None:
+            return
 
-        self.logBox.append(f"loading {name} ...")
+        # add a table row for new harvests, then refresh its cells
+        if number not in self.harvestRows:
+            self.harvestRows[number] = self.jobTable.rowCount()
+            self.jobTable.insertRow(self.jobTable.rowCount())
 
-    def _handle_feature_selection(self, selFeatures):
-        selFeatures = self.markerLayer.selectedFeatures()
-        if len(selFeatures) > 0:
-            for feature in selFeatures:
-                name, lat, long, place_id, types, reviews = feature.attributes()
-                # draw popup on web view or use native qt dialog
-                self._open_web_view(name, lat, long, place_id, types, reviews)
-        
-    def _stop_download_thread(self):
-        self.worker.stop()
+        row = self.harvestRows[number]
+        for col, value in enumerate([f"{number}. {harvest.label}", harvest.status, f"{harvest.progress}%"]):
+            self.jobTable.setItem(row, col, QtWidgets.QTableWidgetItem(value))
 
-    def _message_from_worker(self, message):
-        self.logBox.append(message)
+        # progress bar shows the mean progress of unfinished harvests
+        active = [harvest.progress for harvest in self.harvestQueue.harvests.values() if harvest.status in (QUEUED, RUNNING)]
+        if len(active) > 0:
+            self.progressBar.setValue(int(sum(active) / len(active)))
 
-    def _error_from_worker(self, message):
-        QMessageBox.warning(self, "Error", message)
+        self.stopButton.setEnabled(not self.harvestQueue.is_idle())
 
-    def _progress_from_worker(self, progress):
-        self.progressBar.setValue(progress)
+    def _harvest_finished(self, number, placesData):
+        harvest = self.harvestQueue.harvests[number]
 
-    def _total_from_worker(self, total):
-        self.progressBar.setMaximum(int(total))
+        if self.harvestQueue.is_idle():
+            self.progressBar.setValue(self.progressBar.maximum())
 
-    def _show_api_usage(self):
-        if os.path.exists(self.usageFilePath):
-            f = open(self.usageFilePath, 'r')
-            
-            for line in f.readlines():
-                key, val = line.strip("\n").split("=")
-                if key != 'LASTDATE':
-                    self.api_report_map[key].setText(val)
+        if placesData is not None and len(placesData) > 0:
+            self._draw_layers(harvest, placesData)
 
-    def _report_api_usage(self, usage):
-        if os.path.exists(self.usageFilePath):
-            f = open(self.usageFilePath, 'r')
-            l = []
+    def _cancel_selected_harvests(self):
+        rowNumbers = {row: number for number, row in self.harvestRows.items()}
+        for index in self.jobTable.selectionModel().selectedRows():
+            self.harvestQueue.cancel(rowNumbers[index.row()])
 
-            for line in f.readlines():
-                key, val = line.strip("\n").split("=")
-                if key != 'LASTDATE':
-                    usage[key] += int(val)
-                    l.append(f"{key}={usage[key]}")
-                else:
-                    currMonth = datetime.now().month
-                    if currMonth != val:
-                        # reset api usage data
-                        l = ["NEARBY=0", "REVIEWS=0", "PHOTOS=0"]
-                        for key in usage:
-                            usage[key] = 0
-                    
-            l.append(f"LASTDATE={datetime.now().month}")
-            f.close()
+    def _clear_finished_harvests(self):
+        # drop finished rows from the table; their layers stay on the map
+        self.harvestQueue.clear_finished()
+        self.jobTable.setRowCount(0)
+        self.harvestRows = {}
+        for number in self.harvestQueue.harvests:
+            self._harvest_changed(number)
 
-            f = open(self.usageFilePath, 'w')
-            f.truncate(0)
-            f.write('\n'.join(l))
-            f.close()
+    def _load_previous_harvest(self):
+        # reopen a stored harvest on the map without any request
+        from .places_model import Place, HarvestJob
+
+        store = self.harvestQueue.harvest_store()
+        stored = store.harvests()
+        if len(stored) == 0:
+            QMessageBox.information(self, "Load harvest", "No harvest has been stored yet")
+            return
+
+        items = [f"{harvestId}. {label} ({datetime.fromtimestamp(created):%Y-%m-%d %H:%M}, {countPlaces} places)"
+                 for harvestId, label, created, countPlaces in stored]
+        item, ok = QInputDialog.getItem(self, "Load harvest", "previous harvests", items, 0, False)
+        if not ok:
+            return
+
+        harvestId = stored[items.index(item)][0]
+        label, jobs, settings, places = store.load_harvest(harvestId)
+
+        # reviews and photos stay in the store until a place is opened
+        placesData = [Place(lat, long, name, place_id, types, rating, total)
+                      for place_id, name, lat, long, types, rating, total in places]
+        jobs = [HarvestJob(**job) for job in jobs]
+
+        # searched polygons are drawn ring by ring; only their outline is shown
+        rings = [ring for job in jobs if job.polygon is not None for ring in job.polygon]
+        aoiGeometry = None
+        if len(rings) > 0:
+            aoiGeometry = QgsGeometry.fromMultiPolygonXY([[[QgsPointXY(*point) for point in ring]] for ring in rings])
+
+        # stored harvests get negative numbers so that their popups never share a photo cache with
+        # queued ones, and read the reviews and photos of a place from the store
+        harvest = QueuedHarvest(-harvestId, label, jobs, None, dict(settings, gapiKey=self.gapiKey.text()), aoiGeometry)
+        harvest.status = DONE
+        self._draw_layers(harvest, placesData, f" (stored {harvestId})")
+
+    def _draw_layers(self, harvest, placesData, suffix=None):
+        self.logBox.append(f"[{harvest.number}] drawing vector layers...")
+
+        # layers of several harvests are told apart by the harvest number
+        if suffix is None:
+            suffix = f" {harvest.number}" if harvest.number > 1 else ""
+        if harvest.aoiGeometry is not None:
+            self._draw_aoi_boundary(harvest.aoiGeometry, suffix)
         else:
-            f = open(self.usageFilePath, 'w')
-            l = []
+            self._draw_circle_boundary(harvest.jobs, suffix)
 
-            for key, val in usage.items():
-                l.append(f"{key}={val}")
+        self._draw_markers(harvest, placesData, suffix)
 
-            l.append(f"LASTDATE={datetime.now().month}")
+    def _draw_aoi_boundary(self, aoiGeometry, suffix=""):
+        # create boundary layer from the searched polygon
+        boundaryLayer = QgsVectorLayer("MultiPolygon?crs=epsg:4326", "places boundary" + suffix, "memory")
+        boundaryProvider = boundaryLayer.dataProvider()
+        boundaryLayer.startEditing()
 
-            f.write('\n'.join(l))
-            f.close()
-        
-        self._show_api_usage()
-            
-            
+        symbol = QgsFillSymbol.createSimple({
+            'color': '255, 255, 255, 0',
+            'outline_color': '35,35,35,255',
+            'outline_style': 'solid',
+            'outline_width': '10',
+            'outline_width_unit': 'RenderMetersInMapUnits'
+        })
+        boundaryLayer.renderer().setSymbol(symbol)
 
+        boundary = QgsFeature()
+        boundary.setGeometry(aoiGeometry)
+        boundaryProvider.addFeatures([boundary])
+
+        boundaryLayer.commitChanges()
+        QgsProject.instance().addMapLayer(boundaryLayer)
+        self.layerIds.append(boundaryLayer.id())
+
+    def _draw_circle_boundary(self, jobs, suffix=""):
+        # create boundary layer; every job's circle is drawn as a geodesic polygon of its radius
+        boundaryLayer = QgsVectorLayer("Polygon?crs=epsg:4326", "places boundary" + suffix, "memory")
+        boundaryProvider = boundaryLayer.dataProvider()
+        boundaryLayer.startEditing()
+        boundaryProvider.addAttributes([
+            QgsField('name', QVariant.String),
+            QgsField('radius', QVariant.Double)
+        ])
+        boundaryLayer.updateFields()
 
-class Worker(QObject):
-    finished = pyqtSignal(pd.DataFrame)
-    progress = pyqtSignal(int)
-    addMessage = pyqtSignal(str)
-    addError = pyqtSignal(str)
-    total = pyqtSignal(int)
-    api = pyqtSignal(dict)
-
-    def __init__(self, latitude, longitude, radius, xlsxFilePath, gapiKey, keyword, outputDirName, saveImages, limitEntries):
-        QObject.__init__(self)
-        self.lat = latitude
-        self.long = longitude
-        self.radius = radius * 1000 # convert to metres
-        self.xlsxFilePath = xlsxFilePath
-        self.gapiKey = gapiKey
-        self.keyword = keyword
-        self.outputDirName = outputDirName
-        self.saveImages = saveImages
-        self.limitEntries = limitEntries
-
-        self.running = None
-        self.placeDownloadCount = 0
-        self.imageDownloadCount = 0
-
-        self.imageBaseURL = "https://maps.googleapis.com/maps/api/place/photo"
-
-        self.nearbySearchUsage = 0
-        self.placeDetailsUsage = 0
-        self.placePhotoUsage   = 0
-
-    def stop(self):
-        self.running = False
-
-    def _search_places(self):
-        # search for places within radius using the nearby places API
-        url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-        
-        # TODO: sort out the keyword issue
-        params = {
-            # "keyword"   : self.keyword,
-            "location"  : f"{self.lat},{self.long}",
-            "radius"    : str(self.radius),
-            "key"       : self.gapiKey
-        }
-        
-        self.addMessage.emit(f"searching for nearby places...")
-        results = []
-        
-        while len(results) <= self.limitEntries:
-            res = requests.get(url, params=params)
-            data = res.json()
+        symbol = QgsFillSymbol.createSimple({
+            'color': '255, 255, 255, 0',
+            'outline_color': '35,35,35,255',
+            'outline_style': 'solid',
+            'outline_width': '10',
+            'outline_width_unit': 'RenderMetersInMapUnits'
+        })
+        boundaryLayer.renderer().setSymbol(symbol)
+
+        # draw circular boundaries
+        boundaries = []
+        for job in jobs:
+            lats, lons = circle_polygon(job.lat, job.long, job.radius * 1_000)
+            boundary = QgsFeature()
+            boundary.setGeometry(QgsGeometry.fromPolygonXY([[QgsPointXY(lon, lat) for lat, lon in zip(lats.tolist(), lons.tolist())]]))
+            boundary.setAttributes([job.name, float(job.radius * 1_000)])
+            boundaries.append(boundary)
+        boundaryProvider.addFeatures(boundaries)
+
+        boundaryLayer.commitChanges()
+        QgsProject.instance().addMapLayer(boundaryLayer)
+        self.layerIds.append(boundaryLayer.id())
+
+    def _draw_markers(self, harvest, placesData, suffix=""):
+        # create marker layer
+        markerLayer = QgsVectorLayer("Point?crs=epsg:4326", "places markers" + suffix, "memory")
+        markerProvider = markerLayer.dataProvider()
+        markerLayer.startEditing()
 
-            self.nearbySearchUsage += 1
+        markerProvider.addAttributes([
+            QgsField('name', QVariant.String),
+            QgsField('latitude', QVariant.Double),
+            QgsField('longitude', QVariant.Double),
+            QgsField('place_id', QVariant.String),
+            QgsField('types', QVariant.List),
+            QgsField('reviews', QVariant.Hash),
+            QgsField('photos', QVariant.String)
+        ])
 
-            if data['status'] == 'OK':
-                results = results + data['results']
-            else:
-                self.addError.emit(f"Error fetching nearby places. {data['error_message']}")
-                break
+        self.logBox.append(f"adding {len(placesData)} features")
 
-            if 'next_page_token' in data and data['next_page_token'] != '':
-                params['pagetoken'] = data['next_page_token']
-            else:
-                # no more pages
-                break
+        # features are added in one call; adding them one by one dominates the time for large harvests
+        markers = []
+        for place in placesData:
+            marker = QgsFeature()
+            marker.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(place.long, place.lat)))
+            marker.setAttributes([
+                place.name,
+                place.lat,
+                place.long,
+                place.place_id,
+                list(place.types),
+                # spilled reviews stay on disk until the place is opened
+                place.reviews_as_dicts() if not isinstance(place.reviews, StoredReviews) else None,
+                json.dumps([[photo.reference, photo.width, photo.height] for photo in place.photos])
+            ])
+            markers.append(marker)
+        markerProvider.addFeatures(markers)
 
-            # wait for next page token to be valid
-            time.sleep(NPT_VALIDITY_DELAY)
+        self.logBox.append(f"added {len(placesData)} features")
 
-        return results[:self.limitEntries]
+        markerLayer.commitChanges()
+        QgsProject.instance().addMapLayer(markerLayer)
+        self.layerIds.append(markerLayer.id())
 
-    def _get_reviews(self, place_id):
-        self.placeDownloadCount += 1
-        self.progress.emit(int(METADATA_DOWNLOAD_PROGRESS + (100 - METADATA_DOWNLOAD_PROGRESS - IMAGE_DOWNLOAD_PROGRESS) * self.placeDownloadCount / self.countPlaces))
+        if harvest.spillStore is not None:
+            self.spillStores.append(harvest.spillStore)
 
-        if not self.running:
-            self.halt_error()
+        # add selection handler
+        markerLayer.selectionChanged.connect(lambda *args: self._handle_feature_selection(markerLayer, harvest))
+
+    def _photo_cache(self, harvest):
+        # photo files of a harvest; photos it did not save are fetched at thumbnail size
+        if harvest.number not in self.photoCaches:
+            from .places_api import create_api
+            from .places_photos import PhotoCache, PhotoStore, PHOTO_STORE_NAME
+
+            gapiKey = harvest.workerArgs['gapiKey']
+            outputDirName = harvest.workerArgs['outputDirName']
+            placesApi = create_api(harvest.workerArgs['backend'], self.harvestQueue.keyPools.get(gapiKey, gapiKey),
+                                   self.harvestQueue.session, self.harvestQueue.rateLimiter)
+            store = PhotoStore(os.path.join(outputDirName, PHOTO_STORE_NAME)) if harvest.workerArgs['packPhotos'] else None
+            self.photoCaches[harvest.number] = PhotoCache(outputDirName, placesApi, store=store)
+        return self.photoCaches[harvest.number]
+
+    def _popup_html(self, name, types, reviews, images):
+        import base64
+        from html import escape
+
+        parts = [f"<h3>{escape(name)}</h3>", f"<p>{escape(', '.join(types))}</p>"]
+        for data in images:
+            parts.append(f'<img src="data:image/jpeg;base64,{base64.b64encode(data).decode()}" style="max-width: 100%;">')
+        for review in reviews:
+            parts.append(f"<p><b>{escape(review['author_name'])}</b>: {escape(review['text'])}</p>")
+
+        f = open(os.path.join(PLUGIN_DIR, 'template.html'))
+        template = f.read()
+        f.close()
 
-        # get reviews from place_id
-        url = "https://maps.googleapis.com/maps/api/place/details/json"
-        fields = ['review', 'photo']
-        params = {
-            'fields'    : ','.join(fields),
-            'place_id'  : place_id,
-            'key'       : self.gapiKey
-        }
-        data = requests.get(url, params=params).json()
-        self.placeDetailsUsage += 1
-
-        if data['status'] == 'OK':
-            res = {}
-            if 'reviews' in data['result']:
-                self.addMessage.emit(f"Fetched reviews for place: {place_id}")
-                res['reviews'] = data['result']['reviews']
-            else:
-                self.addMessage.emit(f"No reviews found for place: {place_id}")
-                return np.nan
-            if 'photos' in data['result']:
-                self.addMessage.emit(f"Fetched photos for place: {place_id}")
-                res['photos'] = data['result']['photos']
-            else:
-                self.addMessage.emit(f"No photos found for place: {place_id}")
-            
-            return res
-        else:
-            self.addMessage.emit(f"Error fetching review and/or photos for place: {place_id}. {data['error_message']}")
-            return np.nan
-
-    def _get_photos(self, place_id, photos):
-        index = 1
-        for photo in photos:   
-            self.imageDownloadCount += 1
-            self.progress.emit(int((100 - IMAGE_DOWNLOAD_PROGRESS) + IMAGE_DOWNLOAD_PROGRESS * self.imageDownloadCount / self.countImages))
-            if not self.running:
-                self.halt_error()
-                return
+        return template.format(escape(name), '\n'.join(parts))
 
-            filename = f"{place_id}_{index}.jpg"
-            filepath = os.path.join(self.outputDirName, filename)
-            params = {
-                "photoreference": photo['photo_reference'],
-                "sensor": "false",
-                "maxheight": photo['height'],
-                "maxwidth": photo['width'],
-                "key": self.gapiKey
-            }
-            r = requests.get(self.imageBaseURL, params=params, stream=True)
-            self.placePhotoUsage += 1
-
-            if r.status_code == 200:
-                try:
-                    with open(filepath, 'wb') as f:
-                        for chunk in r.iter_content(CHUNK_SIZE):
-                            f.write(chunk)
-                except:
-                    self.addMessage.emit(f"could not write file {filename}")
-                else:
-                    self.addMessage.emit(f"saved file {filename}")
-            else:
-                self.addMessage.emit(f"could not download file {filename}")
+    def _open_web_view(self, name, lat, long, place_id, types, reviews, photos, harvest):
+        from PyQt5.QtWebKitWidgets import QWebView
+        from .places_model import Photo
 
-            index += 1
+        self.logBox.append(f"loading {name} ...")
 
-    def halt_error(self):
-        self.addMessage.emit("worker halted forcefully")
-        self.api.emit({
-            "NEARBY": self.nearbySearchUsage,
-            "REVIEWS": self.placeDetailsUsage,
-            "PHOTOS": self.placePhotoUsage
-        })
-        self.finished.emit(pd.DataFrame())
-
-    def run(self):
-        self.placeDownloadCount = 0
-        self.running = True
-        self.total.emit(100)
-
-        # download nearby places
-        places = self._search_places()
-        self.countPlaces = len(places)
-
-        self.progress.emit(METADATA_DOWNLOAD_PROGRESS)
-
-        if not self.running:
-            self.halt_error()
-
-        if places == None:
-            self.addMessage.emit("No places fetched. Aborting...")
-            self.api.emit({
-                "NEARBY": self.nearbySearchUsage,
-                "REVIEWS": self.placeDetailsUsage,
-                "PHOTOS": self.placePhotoUsage
-            })
-            self.finished.emit(pd.DataFrame())
+        try:
+            html = self._popup_html(name, types or [], reviews or [], [])
+        except OSError as ex:
+            # template.html missing from the plugin folder
+            self.logBox.append(f"could not show {name}. {ex}")
             return
-        else:
-            self.addMessage.emit(f"{len(places)} places found")
-
-        placeData = []
-        for place in places:
-            row = []
-            row.append(place['geometry']['location']['lat'])
-            row.append(place['geometry']['location']['lng'])
-            row.append(place['name'])
-            row.append(place['place_id'])
-            row.append(place['types'])
-            placeData.append(row)
-
-        placeData = pd.DataFrame(placeData, columns=['lat', 'long', 'name', 'place_id', 'types'])
-        
-        # get data from place id
-        placeData['data'] = placeData['place_id'].apply(self._get_reviews)
 
-        # drop rows with no data
-        placeData = placeData.dropna(subset=['data'])
+        webView = QWebView()
+        self.webViews.append(webView)
+        webView.setWindowTitle(name)
+        webView.setHtml(html, QUrl.fromLocalFile(PLUGIN_DIR + os.sep))
+        webView.show()
 
-        if not self.running:
-            self.halt_error()
+        # photos not saved by the harvest are only fetched now, once, at thumbnail size, by a
+        # background task; the popup shows the reviews meanwhile and is redrawn with the photos
+        try:
+            photos = [Photo(reference, width, height) for reference, width, height in json.loads(photos or '[]')]
+            photoCache = self._photo_cache(harvest)
+        except Exception as ex:
+            self.logBox.append(f"could not load photos of {name}. {ex}")
+            return
+        if len(photos) == 0:
+            return
+
+        def show_photos(exception, images=None):
+            self.photoTasks.remove(task)
+            if exception is not None:
+                self.logBox.append(f"could not load photos of {name}. {exception}")
+                return
+            try:
+                webView.setHtml(self._popup_html(name, types or [], reviews or [], images), QUrl.fromLocalFile(PLUGIN_DIR + os.sep))
+            except (RuntimeError, OSError):
+                # the window was deleted meanwhile, or the template went missing
+                pass
+
+        task = QgsTask.fromFunction(f"photos of {name}", lambda task: photoCache.images(place_id, photos, POPUP_PHOTOS),
+                                    on_finished=show_photos)
+        self.photoTasks.append(task)
+        QgsApplication.taskManager().addTask(task)
+
+    def _handle_feature_selection(self, markerLayer, harvest):
+        selFeatures = markerLayer.selectedFeatures()
+        if len(selFeatures) > 0:
+            for feature in selFeatures:
+                name, lat, long, place_id, types, reviews, photos = feature.attributes()
+                if harvest.number < 0:
+                    store = self.harvestQueue.harvest_store()
+                    reviews = [{'author_name': author_name, 'text': text, 'time': time}
+                               for author_name, text, time in store.reviews(place_id)]
+                    photos = json.dumps(store.photos(place_id))
+                elif reviews is None and harvest.spillStore is not None:
+                    reviews = [{'author_name': author_name, 'text': text, 'time': time}
+                               for author_name, text, time in harvest.spillStore.reviews(place_id)]
+                # draw popup on web view or use native qt dialog
+                self._open_web_view(name, lat, long, place_id, types, reviews, photos, harvest)
+        
+    def _stop_download_thread(self):
+        self.harvestQueue.cancel_all()
 
-        # FLUSH DATA TO XLSX FILE
-        self.addMessage.emit(f"flushing {len(placeData)} places to excel workbook...")
-        workbook = xlsxwriter.Workbook(self.xlsxFilePath)
+    def _message_from_harvest(self, number, message):
+        self.logBox.append(f"[{number}] {message}")
 
-        bold = workbook.add_format({'bold': True})
+    def _error_from_worker(self, number, message):
+        QMessageBox.warning(self, "Error", f"job {number}: {message}")
 
-        # FORMATTED WORKSHEET
-        worksheet_formatted = workbook.add_worksheet('reviews-formatted')
-        currRow = 0
-        worksheet_formatted.write(currRow, 0, "No.", bold)
-        for index, colName in enumerate(list(placeData.columns[:5]) + ["author", "comment", "timestamp"]):
-            worksheet_formatted.write(currRow, index+1, colName, bold)
-        
-        currRow = 2
-
-        for index, place in placeData.iterrows():
-            if not self.running:
-                self.halt_error()
-            reviews = place['data']['reviews']
-            numReviews = len(reviews)
-            col = 'A'
-            if numReviews > 1:
-                worksheet_formatted.merge_range(f"{col}{currRow}:{col}{currRow + numReviews - 1}", index)
-            col = chr(ord(col) + 1)
-
-            for data in place[placeData.columns[:4]]:
-                if numReviews > 1:
-                    worksheet_formatted.merge_range(f"{col}{currRow}:{col}{currRow + numReviews - 1}", data)
-                col = chr(ord(col) + 1)
-
-            if numReviews > 1:
-                worksheet_formatted.merge_range(f"{col}{currRow}:{col}{currRow + numReviews - 1}", ', '.join(place['types']))
-            col = chr(ord(col) + 1)
-
-            for review in reviews:
-                worksheet_formatted.write(currRow - 1, 6, review['author_name'])
-                worksheet_formatted.write(currRow - 1, 7, review['text'])
-                worksheet_formatted.write(currRow - 1, 8, datetime.utcfromtimestamp(review['time']).strftime('%A, %d %B, %Y'))
-                currRow += 1
-
-        # UNFORMATTED WORKSHEET
-        worksheet_unformatted = workbook.add_worksheet('reviews-unformatted')
-        currRow = 0
-        worksheet_unformatted.write(currRow, 0, "No.", bold)
-        for index, colName in enumerate(list(placeData.columns[:5]) + ["author", "comment", "timestamp"]):
-            worksheet_unformatted.write(currRow, index+1, colName, bold)
-        
-        currRow = 1
-
-        for index, place in placeData.iterrows():
-            if not self.running:
-                self.halt_error()
-            reviews = place['data']['reviews']
-           
-            for review in reviews:
-                worksheet_unformatted.write(currRow, 0, index)
-                worksheet_unformatted.write(currRow, 1, place['lat'])
-                worksheet_unformatted.write(currRow, 2, place['long'])
-                worksheet_unformatted.write(currRow, 3, place['name'])
-                worksheet_unformatted.write(currRow, 4, place['place_id'])
-                worksheet_unformatted.write(currRow, 5, ', '.join(place['types']))
-                worksheet_unformatted.write(currRow, 6, review['author_name'])
-                worksheet_unformatted.write(currRow, 7, review['text'])
-                worksheet_unformatted.write(currRow, 8, datetime.utcfromtimestamp(review['time']).strftime('%A, %d %B, %Y'))
-                currRow += 1
-
-        # widen columns to improve readability
-        for col, width in XLSX_COL_WIDTHS.items():
-            worksheet_formatted.set_column(f"{col}:{col}", width)
-            worksheet_unformatted.set_column(f"{col}:{col}", width)
+    def _show_api_usage(self):
+        totals, keys, _ = read_usage(self.usageFilePath)
 
-        try:
-            workbook.close()
-            self.addMessage.emit("saved data to excel file")
-        except Exception as ex:
-            self.addError.emit(f"Error writing to excel file. {ex}")
-
-        # download all images
-        if self.saveImages:   
-            # count number of images
-            self.countImages = 0
-            for _, place in placeData.iterrows():
-                if 'photos' in place['data']:
-                    self.countImages += len(place['data']['photos'])
-
-            self.addMessage.emit(f"downloading {self.countImages} images...")
-            for _, place in placeData.iterrows():
-                if 'photos' in place['data']:
-                    self._get_photos(place['place_id'], place['data']['photos'])
-            self.addMessage.emit(f"downloaded all {self.countImages} images")
-        else:
-            self.progress.emit(100)
+        for api, elem in self.api_report_map.items():
+            elem.setText(str(totals[api]))
+            # per key breakdown on hover
+            elem.setToolTip('\n'.join(f"{label}: {usage[api]}" for label, usage in keys.items()))
 
-        self.api.emit({
-            "NEARBY": self.nearbySearchUsage,
-            "REVIEWS": self.placeDetailsUsage,
-            "PHOTOS": self.placePhotoUsage
-        })
-        self.finished.emit(placeData)
-        return
+    def _report_api_usage(self, usage):
+        if add_usage(self.usageFilePath, usage):
+            self._show_api_usage()
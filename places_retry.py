@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    details and photo requests that failed during a harvest, kept with
+    their error class for a deferred retry round and for the report of
+    what is still missing at the end.
+"""
+
+import threading
+
+DETAILS = 'details'
+PHOTO = 'photo'
+
+# error classes worth another attempt later: deadlines, network failures,
+# throttling and server side errors. the others (not found, denied, invalid)
+# fail the same way on every attempt.
+RETRYABLE_STATUSES = frozenset((
+    'TIMEOUT', 'CONNECTION_ERROR', 'OVER_QUERY_LIMIT', 'RESOURCE_EXHAUSTED', 'UNKNOWN_ERROR',
+    'INTERNAL', 'UNAVAILABLE', 'DEADLINE_EXCEEDED', 'INVALID_RESPONSE',
+    'HTTP_429', 'HTTP_500', 'HTTP_502', 'HTTP_503', 'HTTP_504'
+))
+
+
+def http_status(statusCode):
+    # error class of a failed http response
+    return f"HTTP_{statusCode}"
+
+
+def error_status(error):
+    # error class of any exception: the api status of a PlacesApiError, the exception type otherwise
+    return getattr(error, 'status', None) or type(error).__name__
+
+
+class FailedRequest:
+    __slots__ = ('kind', 'place_id', 'index', 'item', 'status', 'attempts')
+
+    def __init__(self, kind, place_id, index, item, status):
+        self.kind = kind
+        self.place_id = place_id
+        self.index = index          # photo number within the place, None for details
+        self.item = item            # Place for details, Photo for photos
+        self.status = status
+        self.attempts = 1
+
+    def retryable(self):
+        return self.status in RETRYABLE_STATUSES
+
+
+class RetryQueue:
+    """Failed requests of one harvest, one entry per place (details) or
+    place photo. a request failing again keeps its entry with the latest
+    error class and one more attempt. thread safe."""
+
+    def __init__(self):
+        self.failures = {}      # (kind, place_id, index) -> FailedRequest
+        self.lock = threading.Lock()
+
+    def add(self, kind, place_id, item, status, index=None):
+        key = (kind, place_id, index)
+        with self.lock:
+            failure = self.failures.get(key)
+            if failure is None:
+                self.failures[key] = FailedRequest(kind, place_id, index, item, status)
+            else:
+                failure.status = status
+                failure.attempts += 1
+
+    def discard(self, kind, place_id, index=None):
+        # a retried request succeeded
+        with self.lock:
+            self.failures.pop((kind, place_id, index), None)
+
+    def retryable(self, kind):
+        # failures of kind worth another attempt, in the order they failed
+        with self.lock:
+            return [failure for failure in self.failures.values() if failure.kind == kind and failure.retryable()]
+
+    def remaining(self):
+        # failures left, per place
+        with self.lock:
+            failures = list(self.failures.values())
+        return sorted(failures, key=lambda failure: (failure.place_id, failure.kind, failure.index or 0))
+
+    def count_by_status(self):
+        counts = {}
+        with self.lock:
+            for failure in self.failures.values():
+                counts[failure.status] = counts.get(failure.status, 0) + 1
+        return counts
+
+    def __len__(self):
+        return len(self.failures)
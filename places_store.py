@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    sqlite store of harvested places, reviews and photo references, and
+    of the harvests that found them. past harvests are reopened from it
+    without network. an incremental harvest only fetches details of new
+    places or of places whose ratings count changed, and merges the
+    reviews it has not seen before. harvests over their memory budget
+    spill reviews to a temporary store.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import hashlib
+import threading
+
+HARVEST_STORE_NAME = 'harvest.sqlite'
+HARVEST_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    place_id TEXT PRIMARY KEY, name TEXT, lat REAL, long REAL, types TEXT,
+    rating REAL, user_ratings_total INTEGER
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    hash TEXT PRIMARY KEY, place_id TEXT NOT NULL, author_name TEXT, text TEXT, time INTEGER
+);
+CREATE INDEX IF NOT EXISTS reviews_place ON reviews (place_id);
+CREATE TABLE IF NOT EXISTS photos (
+    place_id TEXT NOT NULL, idx INTEGER NOT NULL, reference TEXT, width INTEGER, height INTEGER,
+    PRIMARY KEY (place_id, idx)
+);
+CREATE TABLE IF NOT EXISTS harvests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, label TEXT, created INTEGER, jobs TEXT, settings TEXT
+);
+CREATE TABLE IF NOT EXISTS harvest_places (
+    harvest_id INTEGER NOT NULL, place_id TEXT NOT NULL, PRIMARY KEY (harvest_id, place_id)
+);
+"""
+
+SPILL_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (place_id TEXT NOT NULL, author_name TEXT, text TEXT, time INTEGER);
+CREATE INDEX IF NOT EXISTS reviews_place ON reviews (place_id);
+"""
+
+
+def review_hash(place_id, author_name, time):
+    # a review is identified by its place, author and time; edited texts replace the stored one
+    return hashlib.sha1(f"{place_id}\0{author_name}\0{time}".encode('utf-8')).hexdigest()
+
+
+class HarvestStore:
+    """Places keyed by place_id with their reviews (deduplicated by
+    review_hash) and photo references. accepts and returns plain values,
+    places are read through their attributes. thread safe."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(HARVEST_STORE_SCHEMA)
+
+    def ratings_total(self, place_id):
+        # stored user_ratings_total of a place, or None for places never harvested
+        with self.lock:
+            row = self.connection.execute("SELECT user_ratings_total FROM places WHERE place_id = ?", (place_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def is_unchanged(self, place):
+        # details of a stored place are only fetched again when its ratings count moved
+        return self.ratings_total(place.place_id) == place.user_ratings_total
+
+    def merge(self, place):
+        """Store the basic fields and photo references of place, add the
+        reviews not stored yet and update the texts of edited ones. returns
+        the number of new reviews."""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO places (place_id, name, lat, long, types, rating, user_ratings_total) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (place.place_id, place.name, place.lat, place.long, ','.join(place.types), place.rating, place.user_ratings_total)
+            )
+
+            rows = [(review_hash(place.place_id, review.author_name, review.time), place.place_id, review.author_name, review.text, review.time)
+                    for review in place.reviews]
+            countBefore = self.connection.total_changes
+            self.connection.executemany("INSERT OR IGNORE INTO reviews (hash, place_id, author_name, text, time) VALUES (?, ?, ?, ?, ?)", rows)
+            countNew = self.connection.total_changes - countBefore
+            # an edited review keeps its hash; its latest text wins
+            self.connection.executemany("UPDATE reviews SET text = ? WHERE hash = ? AND text IS NOT ?",
+                                        [(text, reviewHash, text) for reviewHash, _, _, text, _ in rows])
+
+            if len(place.photos) > 0:
+                self.connection.execute("DELETE FROM photos WHERE place_id = ?", (place.place_id,))
+                self.connection.executemany(
+                    "INSERT INTO photos (place_id, idx, reference, width, height) VALUES (?, ?, ?, ?, ?)",
+                    [(place.place_id, index, photo.reference, photo.width, photo.height) for index, photo in enumerate(place.photos, start=1)]
+                )
+        return countNew
+
+    def reviews(self, place_id):
+        # (author_name, text, time) of the stored reviews of a place, newest first
+        with self.lock:
+            return self.connection.execute(
+                "SELECT author_name, text, time FROM reviews WHERE place_id = ? ORDER BY time DESC", (place_id,)
+            ).fetchall()
+
+    def photos(self, place_id):
+        # (reference, width, height) of the stored photos of a place, in index order
+        with self.lock:
+            return self.connection.execute(
+                "SELECT reference, width, height FROM photos WHERE place_id = ? ORDER BY idx", (place_id,)
+            ).fetchall()
+
+    def add_harvest(self, label, jobs, placeIds, settings=None):
+        """Record a harvest: its label, jobs (list of dicts) and the place_ids
+        it kept, in order. settings is a dict of options needed to reopen it.
+        returns the harvest id."""
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO harvests (label, created, jobs, settings) VALUES (?, ?, ?, ?)",
+                (label, int(time.time()), json.dumps(jobs), json.dumps(settings or {}))
+            )
+            harvestId = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO harvest_places (harvest_id, place_id) VALUES (?, ?)",
+                [(harvestId, place_id) for place_id in placeIds]
+            )
+            self.connection.commit()
+        return harvestId
+
+    def harvests(self):
+        # (id, label, created, number of places) of every stored harvest, newest first
+        with self.lock:
+            return self.connection.execute(
+                "SELECT harvests.id, harvests.label, harvests.created, COUNT(harvest_places.place_id) FROM harvests "
+                "LEFT JOIN harvest_places ON harvest_places.harvest_id = harvests.id GROUP BY harvests.id ORDER BY harvests.id DESC"
+            ).fetchall()
+
+    def load_harvest(self, harvestId):
+        """(label, jobs, settings, places) of a stored harvest, or None for
+        unknown ids. places are (place_id, name, lat, long, types, rating,
+        user_ratings_total) rows with types a tuple. reviews and photos are
+        left out; reading them for every place costs several times more
+        than the places, read them per place with reviews() and photos()."""
+        with self.lock:
+            row = self.connection.execute("SELECT label, jobs, settings FROM harvests WHERE id = ?", (harvestId,)).fetchone()
+            if row is None:
+                return None
+
+            places = self.connection.execute(
+                "SELECT places.place_id, name, lat, long, types, rating, user_ratings_total FROM harvest_places "
+                "JOIN places ON places.place_id = harvest_places.place_id WHERE harvest_places.harvest_id = ?",
+                (harvestId,)
+            ).fetchall()
+
+        places = [(place_id, name, lat, long, tuple(types.split(',')) if types else (), rating, total)
+                  for place_id, name, lat, long, types, rating, total in places]
+        return row[0], json.loads(row[1]), json.loads(row[2]), places
+
+    def commit(self):
+        with self.lock:
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+
+
+class SpillStore:
+    """Reviews of one harvest held on disk instead of memory, in a
+    temporary file created on the first put and deleted by close().
+    unlike HarvestStore it keeps exactly the reviews it was given, in
+    order. thread safe."""
+
+    def __init__(self, dirName=None):
+        self.dirName = dirName
+        self.path = None
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def put(self, place_id, reviews):
+        # store the reviews of a place, replacing any spilled before; returns the number stored
+        rows = [(place_id, review.author_name, review.text, review.time) for review in reviews]
+        with self.lock:
+            if self.connection is None:
+                fd, self.path = tempfile.mkstemp(prefix='places_spill_', suffix='.sqlite', dir=self.dirName)
+                os.close(fd)
+                # nothing has to survive a crash: no journal, no syncs
+                self.connection = sqlite3.connect(self.path, check_same_thread=False)
+                self.connection.execute("PRAGMA journal_mode=OFF")
+                self.connection.execute("PRAGMA synchronous=OFF")
+                self.connection.executescript(SPILL_STORE_SCHEMA)
+            self.connection.execute("DELETE FROM reviews WHERE place_id = ?", (place_id,))
+            self.connection.executemany("INSERT INTO reviews (place_id, author_name, text, time) VALUES (?, ?, ?, ?)", rows)
+            self.connection.commit()
+        return len(rows)
+
+    def reviews(self, place_id):
+        # (author_name, text, time) of the spilled reviews of a place, in the order they were put
+        with self.lock:
+            if self.connection is None:
+                return []
+            return self.connection.execute(
+                "SELECT author_name, text, time FROM reviews WHERE place_id = ? ORDER BY rowid", (place_id,)
+            ).fetchall()
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+                os.remove(self.path)
+
+    def __len__(self):
+        with self.lock:
+            if self.connection is None:
+                return 0
+            return self.connection.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    nearby search results cached per tile of the latitude/longitude grid
+    in geodesy.py. a later search is answered from the tiles already
+    covered and only searches the area of the others.
+"""
+
+import copy
+import time
+import threading
+
+import numpy as np
+
+from .geodesy import haversine, tile_index, tile_bounds, tiles_in_circle, bounding_circle
+
+SEARCH_TILE_LEVEL = 16              # tiles of about 0.3 x 0.6 km, the cells of a 32 bit geohash
+SEARCH_CACHE_TTL = 24 * 3600        # seconds
+
+
+class SearchTileCache:
+    """Places found by complete searches, per query. a search that returned
+    every place in its circle answers any later circle inside it, and
+    covers the tiles lying entirely inside it so that circles spanning
+    several earlier searches are answered from their tiles; tiles only
+    touched by a circle stay uncovered. entries expire after ttl seconds.
+    thread safe.
+
+    query is any hashable describing the search (backend, keyword, types);
+    results of different queries never mix. only the basic search fields
+    of the places are kept: details filled in later by a harvest neither
+    stay in memory for the ttl nor reach later harvests."""
+
+    def __init__(self, ttl=SEARCH_CACHE_TTL, level=SEARCH_TILE_LEVEL):
+        self.ttl = ttl
+        self.level = level
+        self.tiles = {}         # (query, row, col) -> (expiry, places in the tile)
+        self.circles = {}       # query -> [(expiry, lat, long, radius, places)]
+        self.lock = threading.Lock()
+
+    def put(self, query, lat, long, radius, places):
+        # record the places of a complete search of radius metres around (lat, long)
+        places = [self._basic(place) for place in places]
+        rows, cols, inside = tiles_in_circle(lat, long, radius, self.level)
+
+        placeTiles = {}
+        if len(places) > 0:
+            placeRows, placeCols = tile_index([place.lat for place in places], [place.long for place in places], self.level)
+            for place, row, col in zip(places, placeRows.tolist(), placeCols.tolist()):
+                placeTiles.setdefault((row, col), []).append(place)
+
+        now = time.monotonic()
+        expiry = now + self.ttl
+        with self.lock:
+            for row, col in zip(rows[inside].tolist(), cols[inside].tolist()):
+                self.tiles[(query, row, col)] = (expiry, tuple(placeTiles.get((row, col), ())))
+            circles = [circle for circle in self.circles.get(query, ()) if circle[0] >= now]
+            circles.append((expiry, lat, long, radius, tuple(places)))
+            self.circles[query] = circles
+
+    def _enclosing_circle(self, query, lat, long, radius, now):
+        # places of a fresh search whose circle contains the given one, or None
+        with self.lock:
+            circles = [circle for circle in self.circles.get(query, ()) if circle[0] >= now]
+        if len(circles) == 0:
+            return None
+
+        _, lats, longs, radii, places = zip(*circles)
+        inside = haversine(lat, long, lats, longs) + radius <= np.asarray(radii)
+        return places[int(np.argmax(inside))] if inside.any() else None
+
+    def lookup(self, query, lat, long, radius):
+        """(places, gap): copies of the cached places within the circle and
+        the circle (lat, long, radius) that still has to be searched, None
+        when the cached tiles cover the whole circle. gap is the circle
+        itself when the uncovered tiles spread over most of it."""
+        now = time.monotonic()
+
+        places = self._enclosing_circle(query, lat, long, radius, now)
+        if places is not None:
+            return self._within(places, lat, long, radius), None
+
+        rows, cols, _ = tiles_in_circle(lat, long, radius, self.level)
+        places = []
+        missing = []
+        with self.lock:
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                entry = self.tiles.get((query, row, col))
+                if entry is not None and entry[0] < now:
+                    del self.tiles[(query, row, col)]
+                    entry = None
+                if entry is None:
+                    missing.append((row, col))
+                else:
+                    places.extend(entry[1])
+
+        if len(missing) > 0:
+            # one search around the uncovered tiles, unless it would be no smaller than the circle
+            missingRows, missingCols = np.array(missing).T
+            latMin, lonMin, latMax, lonMax = tile_bounds(missingRows, missingCols, self.level)
+            gap = bounding_circle(latMin.min(), lonMin.min(), latMax.max(), lonMax.max())
+            if gap[2] >= radius:
+                return [], (lat, long, radius)
+        else:
+            gap = None
+
+        return self._within(places, lat, long, radius), gap
+
+    def _within(self, places, lat, long, radius):
+        # copies of the places within the circle; the worker fills in details, cached places stay untouched
+        if len(places) == 0:
+            return []
+        inside = haversine(lat, long, [place.lat for place in places], [place.long for place in places]) <= radius
+        return [self._basic(place) for place, keep in zip(places, inside) if keep]
+
+    @staticmethod
+    def _basic(place):
+        # copy of a place with its basic search fields only
+        place = copy.copy(place)
+        place.reviews = ()
+        place.photos = ()
+        return place
+
+    def __len__(self):
+        return len(self.tiles)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+
+    monthly api usage store (usage.dat), shared by the dialog and the
+    processing algorithms. totals per api, counts per key label and the
+    month they belong to; the counts start over in a new month.
+"""
+
+import os
+import threading
+from datetime import datetime
+
+USAGE_FILE_NAME = "usage.dat"     # in the plugin folder
+APIS = ("NEARBY", "REVIEWS", "PHOTOS")
+
+# harvests of the dialog and processing algorithms may report at the same time
+_lock = threading.Lock()
+
+
+def read_usage(filePath):
+    # (totals, usage per key label, month of the counts) from the usage store
+    totals = dict.fromkeys(APIS, 0)
+    keys = {}
+    month = None
+
+    if os.path.exists(filePath):
+        f = open(filePath, 'r')
+
+        for line in f.readlines():
+            name, val = line.strip("\n").split("=", 1)
+            if name == 'LASTDATE':
+                month = int(val)
+            elif name.startswith('KEY:'):
+                _, label, api = name.split(':')
+                keys.setdefault(label, dict.fromkeys(APIS, 0))[api] = int(val)
+            else:
+                totals[name] = int(val)
+
+        f.close()
+
+    return totals, keys, month
+
+
+def add_usage(filePath, usage):
+    """Add the request counts of a usage report (see PlacesApi.usage_report)
+    to the store; returns False when it could not be written."""
+    with _lock:
+        totals, keys, month = read_usage(filePath)
+
+        if month != datetime.now().month:
+            # reset api usage data
+            totals = dict.fromkeys(totals, 0)
+            keys = {}
+
+        for api in totals:
+            totals[api] += usage.get(api, 0)
+
+        for label, keyUsage in usage.get("KEYS", {}).items():
+            stored = keys.setdefault(label, dict.fromkeys(totals, 0))
+            for api, count in keyUsage.items():
+                stored[api] += count
+
+        l = [f"{api}={count}" for api, count in totals.items()]
+        for label, keyUsage in keys.items():
+            l += [f"KEY:{label}:{api}={count}" for api, count in keyUsage.items()]
+        l.append(f"LASTDATE={datetime.now().month}")
+
+        try:
+            f = open(filePath, 'w')
+        except:
+            return False
+
+        f.write('\n'.join(l))
+        f.close()
+        return True
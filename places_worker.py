@@ -0,0 +1,675 @@
+# -*- coding: utf-8 -*-
+"""
+    places for qgis
+    Author: Arkaprava Ghosh
+    Mail:   arkaprava.mail@gmail.com
+"""
+
+import os
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from qgis.PyQt.QtCore import QObject, pyqtSignal
+
+from .geodesy import cover_polygon, cover_circle, points_in_polygon, haversine
+from .places_api import create_api, PlacesApiError, LEGACY_BACKEND, SEARCH_RESULTS
+from .places_cache import DetailsCache
+from .places_http import AdaptiveConcurrency
+from .places_export import write_xlsx
+from .places_filter import PlaceFilter, rank_places, ARRIVAL, DISTANCE
+from .places_keys import key_label
+from .places_model import JobSummary, Review, Photo, StoredReviews, reviews_size
+from .places_photos import photo_filename, write_photo, fit_photo, PhotoStore, PHOTO_STORE_NAME
+from .places_retry import RetryQueue, DETAILS, PHOTO, http_status, error_status
+from .places_store import SpillStore
+
+METADATA_DOWNLOAD_PROGRESS = 10
+IMAGE_DOWNLOAD_PROGRESS = 30
+SEARCH_THREADS = 4          # circle searches of a polygon area run in parallel
+# upper bounds for the details and photo stages, which share the http connection pool;
+# adaptive windows decide how many of these threads have a request out at once
+DETAILS_THREADS = 8
+PHOTO_THREADS = 8
+# failed requests are tried once more after the main pass, slower and after a pause
+RETRY_THREADS = 2
+RETRY_DELAY = 5             # seconds
+
+
+class Worker(QObject):
+    finished = pyqtSignal(list)
+    progress = pyqtSignal(int)
+    addMessage = pyqtSignal(str)
+    addError = pyqtSignal(str)
+    total = pyqtSignal(int)
+    api = pyqtSignal(dict)
+
+    def __init__(self, jobs, xlsxFilePath, gapiKey, outputDirName, saveImages, backend=LEGACY_BACKEND, placeFilter=None, twoPass=False,
+                 session=None, rateLimiter=None, detailsCache=None, photoReferences=False, priority=ARRIVAL,
+                 photoSize=None, packPhotos=False, incremental=False, harvestStore=None, label=None, searchCache=None,
+                 memoryBudget=None):
+        """jobs is a list of HarvestJob; a batch runs all of them through one
+        pipeline sharing the http session, rate limiter and details cache,
+        and writes a single workbook. photoReferences fetches photo
+        references even when the images themselves are not saved. priority
+        (see places_filter.py) decides which places are kept under the
+        limit and get their details first. photoSize caps the longest side
+        of saved photos in pixels; None keeps the original size. packPhotos
+        saves photos into one sqlite store instead of loose files.
+        harvestStore (places_store.HarvestStore, shared) records the places
+        and the harvest under label so it can be reopened later.
+        incremental reuses the places stored by earlier harvests and only
+        fetches details of new or changed places. searchCache
+        (places_tiles.SearchTileCache, shared) answers basic field searches
+        of areas searched before. memoryBudget (MB) bounds the reviews held in
+        memory; reviews fetched past it are spilled to spillStore and the
+        workbook is streamed to disk. None keeps everything in memory."""
+        QObject.__init__(self)
+        self.jobs = jobs
+        self.xlsxFilePath = xlsxFilePath
+        self.gapiKey = gapiKey
+        self.outputDirName = outputDirName
+        self.saveImages = saveImages
+
+        self.running = None
+        self.placeDownloadCount = 0
+        self.imageDownloadCount = 0
+        self.countPlaces = 0
+        self.countImages = 0
+
+        # photos are downloaded by their own threads while details are still being fetched
+        self.detailsExecutor = None
+        self.photoExecutor = None
+        self.photoStore = None
+        self.progressLock = threading.Lock()
+
+        # requests in flight per stage, tuned from latency and throttling
+        self.detailsWindow = AdaptiveConcurrency(maximum=DETAILS_THREADS)
+        self.photoWindow = AdaptiveConcurrency(maximum=PHOTO_THREADS)
+
+        # places of this and earlier harvests; reused by an incremental harvest
+        self.harvestStore = harvestStore
+        self.label = label
+        self.countUnchanged = 0
+        self.countNewReviews = 0
+
+        # details and photo requests that failed, retried at the end of the harvest
+        self.retryQueue = RetryQueue()
+
+        # reviews held in memory up to the budget; the rest go to a temporary store read back in chunks
+        self.memoryBudget = memoryBudget * 2 ** 20 if memoryBudget is not None else None
+        self.spillStore = SpillStore() if memoryBudget is not None else None
+        self.heldBytes = 0
+        self.heldSizes = {}         # place_id -> bytes of its reviews counted in heldBytes, 0 once spilled
+
+        # places api client; also counts requests per api for the usage report
+        self.backend = backend
+        self.placesApi = create_api(backend, gapiKey, session, rateLimiter)
+        self.detailsCache = detailsCache if detailsCache is not None else DetailsCache()
+        self.searchCache = searchCache
+
+        # places are filtered on their basic search fields before details are fetched
+        self.placeFilter = placeFilter if placeFilter is not None else PlaceFilter()
+        self.priority = priority
+        self.photoSize = photoSize
+        self.packPhotos = packPhotos
+        self.incremental = incremental
+
+        # smallest set of detail fields consumed by the enabled outputs:
+        # reviews feed the workbook and layers, photos only the image download
+        self.detailFields = ['reviews']
+        if self.saveImages or photoReferences:
+            self.detailFields.append('photos')
+
+        # fetch details inline with the search unless a cheap basic-fields first pass was asked for.
+        # an incremental harvest always makes that pass: unchanged places are not paid for at the details tier
+        self.inlineDetails = self.placesApi.inlineDetails and not twoPass and not incremental
+
+    def stop(self):
+        # called from another thread: abandon the requests in flight and the queued photos;
+        # run() flushes what was fetched so far and emits finished once
+        self.running = False
+        self.placesApi.cancel()
+        for executor in (self.detailsExecutor, self.photoExecutor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _search_circle(self, job, placeFilter, lat, long, radius=None, split=True):
+        # search for places within radius of one centre; returns (places found, places kept, error)
+        results = []
+        countFound = 0
+        if radius is None:
+            radius = int(job.radius * 1000) # convert to metres
+
+        try:
+            inlineFields = self.detailFields if self.inlineDetails else ()
+            # narrow the search server-side by keyword and types; the filter repeats the checks locally
+            searchTypes = tuple(sorted(placeFilter.types))
+            for page in self._search_pages(lat, long, radius, job.keyword, inlineFields, searchTypes):
+                countFound += len(page)
+                # drop places failing the filters or lying outside the area so that
+                # they count neither against the limit nor for details
+                page = [place for place in page if placeFilter(place)]
+                if job.polygon is not None and len(page) > 0:
+                    inside = points_in_polygon([place.lat for place in page], [place.long for place in page], job.polygon)
+                    page = [place for place, keep in zip(page, inside) if keep]
+                results = results + page
+                # in arrival order the first places found are kept; any other priority ranks every page
+                if (self.priority == ARRIVAL and len(results) >= job.limitEntries) or not self.running:
+                    break
+        except PlacesApiError as ex:
+            return countFound, results, ex
+
+        # a search returning fewer places than the legacy api's 60 (searchNearby: 20) that came back
+        # full was cut; dense circles are searched once more as smaller circles covering them
+        maxResults = self.placesApi.max_results(job.keyword)
+        if split and maxResults < SEARCH_RESULTS and countFound >= maxResults and self.running and \
+                not (self.priority == ARRIVAL and len(results) >= job.limitEntries):
+            subRadius = math.ceil(radius * math.sqrt(maxResults / SEARCH_RESULTS))
+            lats, lons = cover_circle(lat, long, radius, subRadius)
+            seen = {place.place_id for place in results}
+            for subLat, subLong in zip(lats.tolist(), lons.tolist()):
+                found, places, error = self._search_circle(job, placeFilter, subLat, subLong, subRadius, split=False)
+                countFound += found
+                if error is not None:
+                    return countFound, results, error
+                # smaller circles reach out of this one, and overlap
+                for place in self._in_circle(places, lat, long, radius):
+                    if place.place_id not in seen:
+                        seen.add(place.place_id)
+                        results.append(place)
+                if (self.priority == ARRIVAL and len(results) >= job.limitEntries) or not self.running:
+                    break
+
+        return countFound, results, None
+
+    def _search_pages(self, lat, long, radius, keyword, fields, types):
+        # pages of places within radius metres of (lat, long): the places cached for the
+        # area first, then the api pages for the part that is not cached. an incremental
+        # harvest looks for changed ratings counts, so it always searches and refreshes the cache.
+        # the cache keeps basic fields only, so searches returning details inline bypass it
+        gap = (lat, long, radius)
+        query = (self.backend, keyword, types)
+        useCache = self.searchCache is not None and len(fields) == 0
+        if useCache and not self.incremental:
+            cached, gap = self.searchCache.lookup(query, lat, long, radius)
+            if len(cached) > 0:
+                yield cached
+            if gap is None:
+                self.addMessage.emit(f"{len(cached)} places around {lat:.5f},{long:.5f} served from the search cache")
+                return
+
+        gapLat, gapLong, gapRadius = gap[0], gap[1], math.ceil(gap[2])
+        found = []
+        lastPage = []
+        for page in self.placesApi.search(gapLat, gapLong, gapRadius, keyword, fields, types):
+            lastPage = page
+            # searches may return places outside their circle (searchText covers the box around it),
+            # and a search around the uncovered tiles returns places outside the job's circle
+            page = self._in_circle(page, gapLat, gapLong, gapRadius)
+            found = found + page
+            if gapRadius < radius:
+                page = self._in_circle(page, lat, long, radius)
+            yield page
+
+        # only reached when every page was read; a full last page may have been cut short
+        if useCache and len(lastPage) < self.placesApi.pageSize:
+            self.searchCache.put(query, gapLat, gapLong, gapRadius, found)
+
+    def _in_circle(self, places, lat, long, radius):
+        if len(places) == 0:
+            return places
+        inside = haversine(lat, long, [place.lat for place in places], [place.long for place in places]) <= radius
+        return [place for place, keep in zip(places, inside) if keep]
+
+    def _search_places(self, job):
+        # search for places within radius using the nearby places API; returns (places, places found)
+        self.addMessage.emit(f"searching for nearby places around {job.name}...")
+        placeFilter = self.placeFilter.with_keyword(job.keyword)
+
+        if job.polygon is None:
+            circles = [(job.lat, job.long)]
+        else:
+            lats, lons = cover_polygon(job.polygon, job.radius * 1000)
+            circles = list(zip(lats.tolist(), lons.tolist()))
+            self.addMessage.emit(f"covering search area with {len(circles)} circles of {job.radius} km")
+
+        results = {}
+        countFound = 0
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=min(SEARCH_THREADS, len(circles))) as executor:
+            for found, places, error in executor.map(lambda circle: self._search_circle(job, placeFilter, *circle), circles):
+                countFound += found
+                if error is not None:
+                    errors.append(error)
+                # overlapping circles return the same places
+                for place in places:
+                    results.setdefault(place.place_id, place)
+
+        # searches abandoned by a stop are not errors
+        if len(errors) > 0 and self.running:
+            self.addError.emit(f"Error fetching nearby places. {errors[0]}" + (f" ({len(errors)} searches failed)" if len(errors) > 1 else ""))
+
+        if placeFilter.active() or job.polygon is not None:
+            self.addMessage.emit(f"{len(results)} of {countFound} places passed the filters")
+
+        # most valuable places first, so that the limit and an early stop cut the least useful ones
+        places = list(results.values())
+        distances = haversine(job.lat, job.long, [place.lat for place in places], [place.long for place in places]) \
+            if self.priority == DISTANCE and len(places) > 0 else None
+        places = rank_places(places, self.priority, distances, placeFilter.types)
+
+        return places[:job.limitEntries], countFound
+
+    def _emit_progress(self):
+        # details and images advance together; the image share is weighed by the
+        # details done, as the number of images is only known once they are all in
+        with self.progressLock:
+            details = self.placeDownloadCount / self.countPlaces if self.countPlaces > 0 else 1
+            images = self.imageDownloadCount / self.countImages if self.countImages > 0 else 1
+            progress = METADATA_DOWNLOAD_PROGRESS + (100 - METADATA_DOWNLOAD_PROGRESS - IMAGE_DOWNLOAD_PROGRESS) * details
+            if self.saveImages:
+                progress += IMAGE_DOWNLOAD_PROGRESS * images * details
+        self.progress.emit(int(progress))
+
+    def _get_reviews(self, place):
+        with self.progressLock:
+            self.placeDownloadCount += 1
+        self._emit_progress()
+
+        # a stop is reported by run(); the details threads just skip the remaining places
+        if not self.running:
+            return False
+
+        return self._fetch_place(place)
+
+    def _fetch_place(self, place):
+        # fill in the reviews and photos of a place; False drops it
+        # stored reviews of a place whose ratings count did not move are still current
+        unchanged = self.incremental and self.harvestStore is not None and self.harvestStore.is_unchanged(place)
+        if unchanged:
+            self._load_stored(place)
+            with self.progressLock:
+                self.countUnchanged += 1
+            self.addMessage.emit(f"Reused stored reviews for place: {place.place_id}")
+            if len(place.reviews) == 0:
+                return False
+            self._hold(place)
+            return True
+
+        # get reviews from place_id unless the search or an earlier job already returned them;
+        # a place being fetched by another job or harvest is waited for instead of fetched again
+        if not self.inlineDetails:
+            try:
+                # a place an incremental harvest gets here is new or changed: cached details are stale
+                self.detailsCache.fetch(place, self.detailFields,
+                                        lambda place, fields: self._adaptive("details", self.detailsWindow, self.placesApi.details, place, fields),
+                                        fresh=self.incremental)
+            except PlacesApiError as ex:
+                if self.running:
+                    self.addMessage.emit(f"Error fetching review and/or photos for place: {place.place_id}. {ex}")
+                    self.retryQueue.add(DETAILS, place.place_id, place, ex.status)
+                return False
+
+        # add the reviews not seen before to the store; an incremental harvest keeps every stored review
+        if self.harvestStore is not None:
+            countNew = self.harvestStore.merge(place)
+            with self.progressLock:
+                self.countNewReviews += countNew
+            if self.incremental:
+                self._load_stored(place)
+
+        if len(place.reviews) > 0:
+            self.addMessage.emit(f"Fetched reviews for place: {place.place_id}")
+            self._hold(place)
+        else:
+            self.addMessage.emit(f"No reviews found for place: {place.place_id}")
+            return False
+        if len(place.photos) > 0:
+            self.addMessage.emit(f"Fetched photos for place: {place.place_id}")
+            self._queue_photos(place)
+        else:
+            self.addMessage.emit(f"No photos found for place: {place.place_id}")
+
+        return True
+
+    def _hold(self, place):
+        # keep the reviews of a place in memory while the budget allows, spill them past it.
+        # a place held again (found by another job, reloaded from the store) replaces its earlier count
+        if self.spillStore is None:
+            return
+        # a harvest under a budget leaves nothing in the shared cache, which outlives it
+        self.detailsCache.discard(place.place_id)
+        if isinstance(place.reviews, StoredReviews) or len(place.reviews) == 0:
+            return
+
+        size = reviews_size(place.reviews)
+        with self.progressLock:
+            heldBytes = self.heldBytes - self.heldSizes.get(place.place_id, 0)
+            spill = heldBytes + size > self.memoryBudget
+            self.heldSizes[place.place_id] = 0 if spill else size
+            self.heldBytes = heldBytes + (0 if spill else size)
+        if spill:
+            place.reviews = StoredReviews(self.spillStore, place.place_id, self.spillStore.put(place.place_id, place.reviews))
+
+    def _load_stored(self, place):
+        place.reviews = tuple(Review(*row) for row in self.harvestStore.reviews(place.place_id))
+        place.photos = tuple(Photo(*row) for row in self.harvestStore.photos(place.place_id))
+
+    def _queue_photos(self, place):
+        # hand the photos of a place to the download threads as soon as its details are in
+        if self.photoExecutor is None or not self.running:
+            return
+        try:
+            self.photoExecutor.submit(self._get_photos, place.place_id, place.photos)
+        except RuntimeError:
+            # shut down by a stop
+            return
+        with self.progressLock:
+            self.countImages += len(place.photos)
+
+    def _get_photos(self, place_id, photos):
+        for index, photo in enumerate(photos, start=1):
+            # a stop is reported by run(); the download threads just return
+            if not self.running:
+                return
+
+            self._get_photo(place_id, index, photo)
+
+            with self.progressLock:
+                self.imageDownloadCount += 1
+            self._emit_progress()
+
+    def _get_photo(self, place_id, index, photo):
+        # download and save one photo; failures go to the retry queue. returns True once saved
+        filename = photo_filename(place_id, index)
+        filepath = os.path.join(self.outputDirName, filename)
+        # harvests downloading the same photo at the same time share one download
+        try:
+            status, data = self.detailsCache.fetch_photo(photo, *fit_photo(photo, self.photoSize), self._download_photo)
+        except PlacesApiError as ex:
+            if self.running:
+                self.addMessage.emit(f"Error downloading image {filename}. {ex}")
+                self.retryQueue.add(PHOTO, place_id, photo, ex.status, index)
+            return False
+
+        if status != 200:
+            self.addMessage.emit(f"could not download file {filename}")
+            self.retryQueue.add(PHOTO, place_id, photo, http_status(status), index)
+            return False
+        elif self.photoStore is not None:
+            self.photoStore.put(place_id, index, data)
+            self.addMessage.emit(f"stored photo {filename}")
+        elif write_photo(data, filepath):
+            self.addMessage.emit(f"saved file {filename}")
+        else:
+            self.addMessage.emit(f"could not write file {filename}")
+        return True
+
+    def _adaptive(self, stage, window, call, *args):
+        # run one request of a stage inside its concurrency window and report how it went
+        window.acquire()
+        countThrottled = self.placesApi.countThrottled
+        start = time.monotonic()
+        try:
+            return call(*args)
+        finally:
+            # throttling seen by any request meanwhile counts; the window only needs the trend
+            throttled = self.placesApi.countThrottled > countThrottled
+            if window.release(time.monotonic() - start, throttled):
+                self.addMessage.emit(f"{stage} concurrency window: {window.limit}")
+
+    def _window_stats(self, stage, window):
+        latency = f", latency {window.latency:.2f}s" if window.latency is not None else ""
+        return f"{stage} concurrency: window {window.limit}, peak {window.peak}, {window.countThrottled} throttled{latency}"
+
+    def _download_photo(self, photo, maxwidth, maxheight):
+        return self._adaptive("photos", self.photoWindow, self.placesApi.photo, photo, maxwidth, maxheight)
+
+    def _summarize_jobs(self, summaries, placeData):
+        # count places with reviews and reviews per job; a place shared by jobs counts for each
+        byId = {place.place_id: place for place in placeData}
+        for summary in summaries:
+            kept = [byId[place_id] for place_id in summary.placeIds if place_id in byId]
+            summary.countPlaces = len(kept)
+            summary.countReviews = sum(len(place.reviews) for place in kept)
+            self.addMessage.emit(
+                f"job {summary.job.name}: {summary.countFound} found, {len(summary.placeIds)} kept, "
+                f"{summary.countNew} new, {summary.countPlaces} with {summary.countReviews} reviews"
+            )
+
+    def _report_usage(self):
+        # request counts for the usage store, and the keys taken out of service
+        for key, status in self.placesApi.keyPool.retired.items():
+            self.addMessage.emit(f"api key {key_label(key)} retired: {status}")
+        self.api.emit(self.placesApi.usage_report())
+
+    def _search_jobs(self):
+        # download nearby places of every job; place_ids found by several jobs are kept once
+        places = {}
+        summaries = []
+
+        for index, job in enumerate(self.jobs):
+            if not self.running:
+                break
+
+            jobPlaces, countFound = self._search_places(job)
+            newPlaces = [place for place in jobPlaces if place.place_id not in places]
+            for place in newPlaces:
+                places[place.place_id] = place
+                # reviews returned inline count against the memory budget once the place survived the
+                # ranking and the limit of its job, before the next job's search pages come in
+                if self.inlineDetails:
+                    self._hold(place)
+
+            summaries.append(JobSummary(job, countFound, [place.place_id for place in jobPlaces], len(newPlaces)))
+            self.progress.emit(int(METADATA_DOWNLOAD_PROGRESS * (index + 1) / len(self.jobs)))
+
+        return list(places.values()), summaries
+
+    def _fetch_details(self, places):
+        # get reviews and photos for each place; drop places with no data.
+        # photos start downloading while the remaining details are fetched
+        if self.saveImages:
+            self.photoExecutor = ThreadPoolExecutor(max_workers=PHOTO_THREADS)
+            if self.packPhotos:
+                self.photoStore = PhotoStore(os.path.join(self.outputDirName, PHOTO_STORE_NAME))
+
+        kept = self._run_pool(DETAILS_THREADS, self._get_reviews, places,
+                              lambda place, ex: self.retryQueue.add(DETAILS, place.place_id, place, error_status(ex)))
+        if not self.inlineDetails:
+            self.addMessage.emit(self._window_stats("details", self.detailsWindow))
+
+        # second chance for the places whose details failed; their photos join the downloads still running
+        failures = self._retry_round(DETAILS)
+        if len(failures) > 0:
+            recovered = self._run_pool(RETRY_THREADS, self._retry_place, failures, self._failed_again)
+            for failure, ok in recovered.items():
+                kept[failure.item] = ok
+        placeData = [place for place in places if kept.get(place)]
+
+        # photos that failed get their second chance once all the others are in
+        self._wait_photos()
+        failures = self._retry_round(PHOTO)
+        if len(failures) > 0:
+            self._run_pool(RETRY_THREADS, self._retry_photo, failures, self._failed_again, photos=True)
+
+        if len(self.retryQueue) > 0:
+            counts = ', '.join(f"{count} {status}" for status, count in sorted(self.retryQueue.count_by_status().items()))
+            self.addError.emit(f"{len(self.retryQueue)} requests still failing after a retry ({counts}); see the failed sheet of the workbook")
+
+        if self.incremental and self.harvestStore is not None:
+            self.addMessage.emit(
+                f"incremental harvest: {len(places) - self.countUnchanged} new or changed places, "
+                f"{self.countUnchanged} unchanged, {self.countNewReviews} new reviews"
+            )
+        return placeData
+
+    def _run_pool(self, threads, call, items, failed, photos=False):
+        # {item: result of call(item)} over a pool of threads that a stop shuts down: items not
+        # started when it comes are cancelled, the others return as their requests are abandoned.
+        # an item whose call raised is False and handed to failed(item, exception)
+        executor = ThreadPoolExecutor(max_workers=threads)
+        if photos:
+            self.photoExecutor = executor
+        else:
+            self.detailsExecutor = executor
+
+        results = {}
+        try:
+            futures = []
+            for item in items:
+                try:
+                    futures.append(executor.submit(call, item))
+                except RuntimeError:
+                    # shut down by a stop
+                    break
+
+            for item, future in zip(items, futures):
+                results[item] = False
+                if future.cancelled():
+                    continue
+                try:
+                    results[item] = future.result()
+                except Exception as ex:
+                    self.addMessage.emit(f"Unexpected error for place: {getattr(item, 'place_id', '')}. {ex}")
+                    failed(item, ex)
+        finally:
+            executor.shutdown(wait=True)
+            if photos:
+                self.photoExecutor = None
+            else:
+                self.detailsExecutor = None
+        return results
+
+    def _failed_again(self, failure, ex):
+        self.retryQueue.add(failure.kind, failure.place_id, failure.item, error_status(ex), failure.index)
+
+    def _retry_round(self, kind):
+        # failures of kind worth retrying, after a pause that lets throttling and outages pass
+        failures = self.retryQueue.retryable(kind) if self.running else []
+        if len(failures) == 0:
+            return []
+        self.addMessage.emit(f"retrying {len(failures)} failed {kind} requests in {RETRY_DELAY}s...")
+        if self.placesApi.cancelled.wait(RETRY_DELAY):
+            return []
+        return failures
+
+    def _retry_place(self, failure):
+        if not self.running:
+            return False
+        # a request failing again counts one more attempt on its entry; one that went through leaves the queue
+        attempts = failure.attempts
+        ok = self._fetch_place(failure.item)
+        if failure.attempts == attempts and self.running:
+            self.retryQueue.discard(DETAILS, failure.place_id)
+        return ok
+
+    def _retry_photo(self, failure):
+        if not self.running:
+            return False
+        attempts = failure.attempts
+        ok = self._get_photo(failure.place_id, failure.index, failure.item)
+        if failure.attempts == attempts and self.running:
+            self.retryQueue.discard(PHOTO, failure.place_id, failure.index)
+        return ok
+
+    def _wait_photos(self):
+        # wait for the images still downloading; a stop has already cancelled the queued ones
+        if self.photoExecutor is None:
+            return
+        if self.running:
+            self.addMessage.emit(f"downloading {self.countImages - self.imageDownloadCount} of {self.countImages} images...")
+        self.photoExecutor.shutdown(wait=True)
+        self.photoExecutor = None
+        self.addMessage.emit(f"downloaded {self.imageDownloadCount} of {self.countImages} images")
+        self.addMessage.emit(self._window_stats("photos", self.photoWindow))
+
+    def _flush(self, placeData, summaries):
+        # record the harvest and write the workbook; after a stop, with the places fetched so far
+        stopped = not self.running
+        if stopped:
+            self.addMessage.emit(f"worker halted forcefully; keeping the {len(placeData)} places fetched so far")
+
+        # record the harvest so that it can be reopened without network
+        if self.harvestStore is not None:
+            label = self.label or self.jobs[0].name
+            harvestId = self.harvestStore.add_harvest(
+                f"{label} (stopped)" if stopped else label, [job.to_dict() for job in self.jobs],
+                [place.place_id for place in placeData],
+                {'outputDirName': self.outputDirName, 'backend': self.backend, 'packPhotos': self.packPhotos}
+            )
+            self.addMessage.emit(f"stored harvest {harvestId} with {len(placeData)} places")
+
+        if len(self.jobs) > 1:
+            self._summarize_jobs(summaries, placeData)
+
+        # FLUSH DATA TO XLSX FILE
+        self.addMessage.emit(f"flushing {len(placeData)} places to excel workbook...")
+
+        # a stop during the write abandons it; partial results of a stopped harvest are written in full
+        isRunning = (lambda: True) if stopped else (lambda: self.running)
+        try:
+            if write_xlsx(self.xlsxFilePath, placeData, isRunning, summaries if len(self.jobs) > 1 else None,
+                          self.retryQueue.remaining(), constantMemory=self.spillStore is not None):
+                self.addMessage.emit("saved data to excel file")
+            else:
+                self.addMessage.emit("excel file left incomplete by a stop")
+        except Exception as ex:
+            self.addError.emit(f"Error writing to excel file. {ex}")
+
+    def _shutdown(self):
+        # photos are normally all in by now; after a failure, wait for those still downloading
+        self._wait_photos()
+
+        if self.photoStore is not None:
+            self.addMessage.emit(f"packed {len(self.photoStore)} photos ({self.photoStore.count_blobs()} distinct) into {PHOTO_STORE_NAME}")
+            self.photoStore.close()
+            self.photoStore = None
+
+        if self.spillStore is not None and len(self.spillStore) > 0:
+            self.addMessage.emit(f"{len(self.spillStore)} reviews past the memory budget spilled to disk")
+
+        hedger = self.placesApi.hedger
+        if hedger.countHedged > 0:
+            self.addMessage.emit(f"hedged {hedger.countHedged} slow requests, {hedger.countWon} answered first")
+        self.placesApi.close()
+
+    def run(self):
+        self.placeDownloadCount = 0
+        self.running = True
+        self.total.emit(100)
+
+        # every way out of a harvest, including a stop or a failure, ends here
+        # with one flush, one usage report and one finished signal
+        placeData = []
+        try:
+            places, summaries = self._search_jobs()
+            self.countPlaces = len(places)
+            self.progress.emit(METADATA_DOWNLOAD_PROGRESS)
+
+            if not self.running:
+                self.addMessage.emit("worker halted forcefully")
+            elif len(places) == 0:
+                self.addMessage.emit("No places fetched. Aborting...")
+            else:
+                self.addMessage.emit(f"{len(places)} places found")
+                placeData = self._fetch_details(places)
+                self._flush(placeData, summaries)
+        except Exception as ex:
+            self.addError.emit(f"Harvest failed. {ex}")
+        finally:
+            self._shutdown()
+
+        if self.running:
+            self.progress.emit(100)
+
+        # without places there is no layer to read spilled reviews back; drop the temporary store
+        if len(placeData) == 0 and self.spillStore is not None:
+            self.spillStore.close()
+            self.spillStore = None
+
+        self._report_usage()
+        self.finished.emit(placeData)
@@ -0,0 +1,127 @@
+# coding=utf-8
+"""Geodesy helpers test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import unittest
+
+import numpy as np
+
+from geodesy import haversine, points_in_polygon, cover_polygon, cover_circle, circle_polygon, circle_bbox, \
+    tile_index, tile_bounds, tiles_in_circle
+
+# roughly 10 x 11 km square over kolkata
+SQUARE = [[(88.3, 22.5), (88.4, 22.5), (88.4, 22.6), (88.3, 22.6)]]
+# the same square with a hole in the middle
+SQUARE_WITH_HOLE = SQUARE + [[(88.34, 22.54), (88.36, 22.54), (88.36, 22.56), (88.34, 22.56)]]
+
+
+class GeodesyTest(unittest.TestCase):
+    """Test distances, clipping and covering."""
+
+    def test_haversine(self):
+        """Test one degree of latitude is about 111 km."""
+        self.assertAlmostEqual(haversine(0, 0, 1, 0), 111195, delta=1)
+        d = haversine(np.array([22.5, 22.5]), np.array([88.3, 88.3]), 22.5, np.array([88.3, 88.4]))
+        self.assertEqual(d.shape, (2,))
+        self.assertEqual(d[0], 0)
+
+    def test_points_in_polygon(self):
+        """Test inside, outside and hole points."""
+        inside = points_in_polygon([22.55, 22.7, 22.52], [88.35, 88.35, 88.32], SQUARE_WITH_HOLE)
+        self.assertEqual(inside.tolist(), [False, False, True])
+
+    def test_points_in_star(self):
+        """Test a concave polygon against a point by point ray cast, points on vertex latitudes included."""
+        angles = np.linspace(0, 2 * np.pi, 10, endpoint=False)
+        radii = np.where(np.arange(10) % 2 == 0, 0.05, 0.02)
+        star = np.column_stack((88.35 + radii * np.cos(angles), 22.55 + radii * np.sin(angles)))
+
+        rng = np.random.default_rng(0)
+        lats = np.concatenate([rng.uniform(22.49, 22.61, 5000), star[:, 1]])
+        lons = np.concatenate([rng.uniform(88.29, 88.41, 5000), star[:, 0] - 0.001])
+
+        expected = []
+        for lat, lon in zip(lats, lons):
+            inside = False
+            for (x1, y1), (x2, y2) in zip(star, np.roll(star, -1, axis=0)):
+                if (y1 > lat) != (y2 > lat) and lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1:
+                    inside = not inside
+            expected.append(inside)
+        self.assertEqual(points_in_polygon(lats, lons, [star]).tolist(), expected)
+
+    def test_circle_polygon(self):
+        """Test circle vertices lie at the radius and inside the circle's bounding box."""
+        lats, lons = circle_polygon(22.55, 88.35, 5000)
+        self.assertTrue(np.allclose(haversine(22.55, 88.35, lats, lons), 5000))
+
+        latMin, lonMin, latMax, lonMax = circle_bbox(22.55, 88.35, 5000)
+        self.assertTrue(((lats >= latMin - 1e-9) & (lats <= latMax + 1e-9)).all())
+        self.assertTrue(((lons >= lonMin - 1e-9) & (lons <= lonMax + 1e-9)).all())
+        self.assertAlmostEqual(lats.max(), latMax)
+
+    def test_cover_polygon(self):
+        """Test every point of the polygon lies in some circle."""
+        radius = 2000
+        lats, lons = cover_polygon(SQUARE, radius)
+        self.assertGreater(len(lats), 1)
+
+        rng = np.random.default_rng(0)
+        pointLats = rng.uniform(22.5, 22.6, 2000)
+        pointLons = rng.uniform(88.3, 88.4, 2000)
+        distance = haversine(pointLats[:, None], pointLons[:, None], lats[None, :], lons[None, :]).min(axis=1)
+        self.assertTrue((distance <= radius * 1.01).all())
+
+    def test_cover_circle(self):
+        """Test every point of a circle lies in one of its smaller covering circles."""
+        radius = 1000
+        lats, lons = cover_circle(22.55, 88.35, 5000, radius)
+        self.assertGreater(len(lats), 25)
+
+        rng = np.random.default_rng(0)
+        pointLats = rng.uniform(22.5, 22.6, 5000)
+        pointLons = rng.uniform(88.3, 88.4, 5000)
+        keep = haversine(22.55, 88.35, pointLats, pointLons) <= 5000
+        distance = haversine(pointLats[keep, None], pointLons[keep, None], lats[None, :], lons[None, :]).min(axis=1)
+        self.assertTrue((distance <= radius * 1.01).all())
+
+    def test_cover_small_polygon(self):
+        """Test a polygon smaller than one circle needs a single search."""
+        lats, lons = cover_polygon(SQUARE, 50000)
+        self.assertEqual(len(lats), 1)
+
+    def test_cover_polygon_needs_radius(self):
+        """Test a polygon can not be covered with circles of no size."""
+        self.assertRaises(ValueError, cover_polygon, SQUARE, 0)
+
+    def test_tiles_in_circle(self):
+        """Test tiles inside a circle lie within its radius and the circle's points fall in its tiles."""
+        radius = 2000
+        rows, cols, inside = tiles_in_circle(22.55, 88.35, radius, 16)
+        self.assertTrue(inside.any() and not inside.all())
+
+        latMin, lonMin, latMax, lonMax = tile_bounds(rows[inside], cols[inside], 16)
+        for lats, lons in ((latMin, lonMin), (latMin, lonMax), (latMax, lonMin), (latMax, lonMax)):
+            self.assertTrue((haversine(22.55, 88.35, lats, lons) <= radius).all())
+
+        rng = np.random.default_rng(0)
+        pointLats = rng.uniform(22.53, 22.57, 2000)
+        pointLons = rng.uniform(88.33, 88.37, 2000)
+        pointLats, pointLons = [points[haversine(22.55, 88.35, pointLats, pointLons) <= radius] for points in (pointLats, pointLons)]
+        pointRows, pointCols = tile_index(pointLats, pointLons, 16)
+        self.assertTrue(set(zip(pointRows.tolist(), pointCols.tolist())) <= set(zip(rows.tolist(), cols.tolist())))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(GeodesyTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
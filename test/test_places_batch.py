@@ -0,0 +1,89 @@
+# coding=utf-8
+"""Batch job list test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import os
+import tempfile
+import unittest
+
+from utilities import plugin_module
+
+read_jobs = plugin_module('places_batch').read_jobs
+
+
+class ReadJobsTest(unittest.TestCase):
+    """Test csv batch files are parsed into harvest jobs."""
+
+    def setUp(self):
+        self.dirName = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dirName.cleanup()
+
+    def write(self, text, encoding='utf-8'):
+        path = os.path.join(self.dirName.name, 'batch.csv')
+        with open(path, 'w', newline='', encoding=encoding) as f:
+            f.write(text)
+        return path
+
+    def test_columns(self):
+        """Test every column is read, in any order."""
+        jobs = read_jobs(self.write("keyword,lon,lat,radius,limit,name\ncafe,88.3,22.5,2,40,park street\n"))
+        self.assertEqual(len(jobs), 1)
+        job = jobs[0]
+        self.assertEqual((job.lat, job.long, job.radius, job.keyword, job.limitEntries, job.name),
+                         (22.5, 88.3, 2.0, 'cafe', 40, 'park street'))
+
+    def test_header_aliases(self):
+        """Test alternative header names, in any case and with spaces around them."""
+        jobs = read_jobs(self.write(" Latitude , LNG ,Radius_km,Query,Limit_Entries,Job\n22.5,88.3,1.5,bar,10,a\n"))
+        job = jobs[0]
+        self.assertEqual((job.lat, job.long, job.radius, job.keyword, job.limitEntries, job.name),
+                         (22.5, 88.3, 1.5, 'bar', 10, 'a'))
+
+    def test_dialog_defaults(self):
+        """Test missing columns and empty cells fall back to the dialog values."""
+        path = self.write("lat,lon,keyword\n22.5,88.3,\n22.6,88.4,bar\n,,\n")
+        jobs = read_jobs(path, radius=3, keyword='cafe', limitEntries=60)
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual([(job.radius, job.keyword, job.limitEntries) for job in jobs], [(3, 'cafe', 60), (3, 'bar', 60)])
+
+        # without a dialog value a missing number is an error
+        self.assertRaises(ValueError, read_jobs, path)
+
+    def test_bad_values(self):
+        """Test non numeric and out of range values name their row."""
+        cases = [
+            ("lat,lon,radius,limit\n22.5,88.3,1,10\nnorth,88.3,1,10\n", "row 3: lat, lon, radius and limit must be numeric"),
+            ("lat,lon,radius,limit\n91,88.3,1,10\n", "row 2: coordinates out of range"),
+            ("lat,lon,radius,limit\n22.5,181,1,10\n", "row 2: coordinates out of range"),
+            ("lat,lon,radius,limit\n22.5,88.3,51,10\n", "row 2: radius must lie between 0 and 50 kms"),
+            ("lat,lon,radius,limit\n22.5,88.3,1,-1\n", "row 2: entry limit cannot be negative"),
+            ("lat,radius\n22.5,1\n", "batch file needs lat and lon columns"),
+            ("lat,lon\n", "batch file needs a header row and at least one job"),
+        ]
+        for text, message in cases:
+            with self.assertRaises(ValueError) as context:
+                read_jobs(self.write(text))
+            self.assertEqual(str(context.exception), message)
+
+    def test_byte_order_mark(self):
+        """Test a utf-8 byte order mark, as written by excel, does not hide the first header."""
+        jobs = read_jobs(self.write("lat,lon,radius,limit,keyword\n22.5,88.3,1,10,café\n", encoding='utf-8-sig'))
+        self.assertEqual((jobs[0].lat, jobs[0].keyword), (22.5, 'café'))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ReadJobsTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
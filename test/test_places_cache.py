@@ -0,0 +1,111 @@
+# coding=utf-8
+"""Details cache test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import time
+import threading
+import unittest
+
+from places_model import Place, Review, Photo
+from places_cache import DetailsCache
+
+
+def make_place(place_id='a'):
+    return Place(22.5, 88.3, 'name', place_id, ('cafe',))
+
+
+class DetailsCacheTest(unittest.TestCase):
+    """Test details are reused across jobs."""
+
+    def test_fill_after_put(self):
+        """Test a cached place fills a fresh copy of it."""
+        cache = DetailsCache()
+        place = make_place()
+        self.assertFalse(cache.fill(place, ['reviews']))
+
+        place.reviews = (Review('alice', 'good', 0),)
+        place.photos = (Photo('ref', 10, 10),)
+        cache.put(place, ['reviews', 'photos'])
+
+        other = make_place()
+        self.assertTrue(cache.fill(other, ['reviews']))
+        self.assertEqual(other.reviews[0].author_name, 'alice')
+        self.assertEqual(len(cache), 1)
+
+    def test_missing_fields_are_fetched(self):
+        """Test an entry without photos does not serve a photo request."""
+        cache = DetailsCache()
+        cache.put(make_place(), ['reviews'])
+        self.assertFalse(cache.fill(make_place(), ['reviews', 'photos']))
+
+    def test_concurrent_fetches_share_one_call(self):
+        """Test places with the same place_id fetched at the same time make one details call."""
+        cache = DetailsCache()
+        calls = []
+
+        def fetch_details(place, fields):
+            calls.append(place.place_id)
+            time.sleep(0.1)
+            place.reviews = (Review('alice', 'good', 0),)
+
+        places = [make_place() for _ in range(8)]
+        threads = [threading.Thread(target=cache.fetch, args=(place, ['reviews'], fetch_details)) for place in places]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, ['a'])
+        self.assertTrue(all(place.reviews[0].author_name == 'alice' for place in places))
+        self.assertEqual(len(cache.detailFlights), 0)
+
+    def test_failed_fetch_is_not_cached(self):
+        """Test an error reaches the caller and a later fetch tries again."""
+        cache = DetailsCache()
+
+        def fail(place, fields):
+            raise ValueError('denied')
+
+        with self.assertRaises(ValueError):
+            cache.fetch(make_place(), ['reviews'], fail)
+        cache.fetch(make_place(), ['reviews'], lambda place, fields: None)
+        self.assertTrue(cache.fill(make_place(), ['reviews']))
+
+
+    def test_fresh_fetch_and_expiry(self):
+        """Test a changed place skips its cached details and entries expire after the ttl."""
+        cache = DetailsCache(ttl=0.1)
+        calls = []
+
+        def fetch_details(place, fields):
+            calls.append(place.place_id)
+            place.reviews = (Review('alice', f"visit {len(calls)}", 0),)
+
+        cache.fetch(make_place(), ['reviews'], fetch_details)
+        cache.fetch(make_place(), ['reviews'], fetch_details)
+        self.assertEqual(len(calls), 1)
+
+        place = make_place()
+        cache.fetch(place, ['reviews'], fetch_details, fresh=True)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(place.reviews[0].text, 'visit 2')
+
+        time.sleep(0.15)
+        self.assertFalse(cache.fill(make_place(), ['reviews']))
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(DetailsCacheTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
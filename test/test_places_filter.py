@@ -0,0 +1,74 @@
+# coding=utf-8
+"""Place filter test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import unittest
+
+from places_model import Place
+from places_filter import PlaceFilter, parse_types, rank_places, ARRIVAL, DISTANCE, RATINGS_TOTAL, RATING, TYPE_MATCH
+
+
+def make_place(name='cafe coffee day', types=('cafe', 'food'), rating=4.2, user_ratings_total=120):
+    return Place(22.5, 88.3, name, 'id', types, rating, user_ratings_total)
+
+
+class PlaceFilterTest(unittest.TestCase):
+    """Test filtering on basic search fields."""
+
+    def test_inactive_filter_accepts_all(self):
+        """Test an empty filter accepts every place."""
+        placeFilter = PlaceFilter()
+        self.assertFalse(placeFilter.active())
+        self.assertTrue(placeFilter(make_place(rating=0, user_ratings_total=0)))
+
+    def test_rating_filters(self):
+        """Test minimum rating and ratings count."""
+        placeFilter = PlaceFilter(minRating=4.0, minRatingsTotal=100)
+        self.assertTrue(placeFilter.active())
+        self.assertTrue(placeFilter(make_place()))
+        self.assertFalse(placeFilter(make_place(rating=3.9)))
+        self.assertFalse(placeFilter(make_place(user_ratings_total=99)))
+
+    def test_keyword_filter(self):
+        """Test keyword terms match the name or the types."""
+        placeFilter = PlaceFilter(keyword='Coffee bakery')
+        self.assertTrue(placeFilter(make_place()))
+        self.assertTrue(placeFilter(make_place(name='hot breads', types=('bakery',))))
+        self.assertFalse(placeFilter(make_place(name='big bazaar', types=('supermarket',))))
+
+    def test_type_filter(self):
+        """Test a place needs one of the requested types."""
+        placeFilter = PlaceFilter(types=parse_types('Cafe, night club'))
+        self.assertEqual(placeFilter.types, frozenset(['cafe', 'night_club']))
+        self.assertTrue(placeFilter(make_place()))
+        self.assertFalse(placeFilter(make_place(types=('bank', 'finance'))))
+
+
+    def test_rank_places(self):
+        """Test each priority puts the most valuable place first."""
+        a = make_place('a', ('cafe',), rating=4.8, user_ratings_total=10)
+        b = make_place('b', ('cafe', 'bakery'), rating=4.0, user_ratings_total=500)
+        c = make_place('c', ('bank',), rating=4.8, user_ratings_total=50)
+        places = [a, b, c]
+
+        self.assertEqual(rank_places(places, ARRIVAL), [a, b, c])
+        self.assertEqual(rank_places(places, DISTANCE, [300.0, 100.0, 200.0]), [b, c, a])
+        self.assertEqual(rank_places(places, RATINGS_TOTAL), [b, c, a])
+        self.assertEqual(rank_places(places, RATING), [c, a, b])
+        self.assertEqual(rank_places(places, TYPE_MATCH, types=('cafe', 'bakery')), [b, a, c])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(PlaceFilterTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
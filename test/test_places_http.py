@@ -0,0 +1,160 @@
+# coding=utf-8
+"""Adaptive concurrency test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import time
+import threading
+import unittest
+from concurrent.futures import CancelledError
+
+from places_http import AdaptiveConcurrency, HedgedRequests, RateLimiter, HEDGE_MIN_SAMPLES
+
+
+def complete(window, count, latency, throttled=False):
+    for _ in range(count):
+        window.acquire()
+        window.release(latency, throttled)
+
+
+class RateLimiterTest(unittest.TestCase):
+    """Test the token bucket."""
+
+    def test_burst_then_rate(self):
+        """Test a full bucket lets a burst through, then requests wait for tokens."""
+        limiter = RateLimiter(qps=20, burst=5)
+        self.assertEqual(sum(limiter.try_acquire() for _ in range(10)), 5)
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreater(time.monotonic() - start, 0.02)
+
+    def test_lower_rate_cuts_burst(self):
+        """Test lowering the rate also shrinks the burst and the tokens saved up at the old rate."""
+        limiter = RateLimiter(qps=50)
+        limiter.set_rate(2)
+        self.assertEqual((limiter.qps, limiter.burst), (2, 2))
+        self.assertEqual(sum(limiter.try_acquire() for _ in range(10)), 2)
+
+
+class AdaptiveConcurrencyTest(unittest.TestCase):
+    """Test the AIMD window of a request stage."""
+
+    def test_grows_while_latency_holds(self):
+        """Test the window opens up to its maximum at steady latency."""
+        window = AdaptiveConcurrency(initial=2, maximum=8)
+        complete(window, 10, 0.1)
+        self.assertGreater(window.limit, 2)
+        complete(window, 200, 0.1)
+        self.assertEqual(window.limit, 8)
+        self.assertEqual(window.peak, 8)
+
+    def test_holds_while_latency_rises(self):
+        """Test the window stops growing when requests slow down."""
+        window = AdaptiveConcurrency(initial=4, maximum=16)
+        complete(window, 4, 0.1)
+        limit = window.limit
+        complete(window, 20, 1.0)
+        self.assertEqual(window.limit, limit)
+
+    def test_throttling_cuts_once_per_window(self):
+        """Test a burst of throttled answers halves the window once."""
+        window = AdaptiveConcurrency(initial=8, maximum=16)
+        complete(window, 1, 0.1, throttled=True)
+        self.assertEqual(window.limit, 4)
+        complete(window, 4, 0.1, throttled=True)
+        self.assertEqual(window.limit, 4)
+        complete(window, 1, 0.1, throttled=True)
+        self.assertEqual(window.limit, 2)
+        self.assertEqual(window.countThrottled, 6)
+
+
+class HedgedRequestsTest(unittest.TestCase):
+    """Test slow requests are sent twice."""
+
+    def test_slow_request_is_hedged(self):
+        """Test a request slower than the p95 latency is answered by its hedge and the loser discarded."""
+        hedger = HedgedRequests()
+        for _ in range(HEDGE_MIN_SAMPLES):
+            hedger.call('REVIEWS', lambda: 'fast')
+        self.assertIsNotNone(hedger.delay('REVIEWS'))
+
+        attempts = []
+        discarded = threading.Event()
+
+        def send():
+            attempts.append(1)
+            if len(attempts) == 1:
+                time.sleep(0.3)
+                return 'stuck'
+            return 'hedge'
+
+        self.assertEqual(hedger.call('REVIEWS', send, lambda result: discarded.set()), 'hedge')
+        self.assertEqual((hedger.countHedged, hedger.countWon), (1, 1))
+        self.assertTrue(discarded.wait(1))
+
+    def test_failed_attempt_leaves_the_other(self):
+        """Test an error of the first attempt does not fail a request whose hedge succeeds."""
+        hedger = HedgedRequests()
+        for _ in range(HEDGE_MIN_SAMPLES):
+            hedger.call('PHOTOS', lambda: None)
+
+        attempts = []
+
+        def send():
+            attempts.append(1)
+            if len(attempts) == 1:
+                time.sleep(0.1)
+                raise ValueError('timeout')
+            time.sleep(0.2)
+            return 'photo'
+
+        self.assertEqual(hedger.call('PHOTOS', send), 'photo')
+
+    def test_no_hedge_without_rate_budget(self):
+        """Test a due hedge is dropped while the rate limiter has no token to spare."""
+        hedger = HedgedRequests()
+        for _ in range(HEDGE_MIN_SAMPLES):
+            hedger.call('REVIEWS', lambda: 'fast')
+
+        limiter = RateLimiter(qps=1, burst=1)
+        self.assertTrue(limiter.try_acquire())
+        attempts = []
+
+        def send():
+            attempts.append(1)
+            time.sleep(0.2)
+            return 'slow'
+
+        self.assertEqual(hedger.call('REVIEWS', send, mayHedge=limiter.try_acquire), 'slow')
+        self.assertEqual((len(attempts), hedger.countHedged), (1, 0))
+
+    def test_cancel_abandons_request(self):
+        """Test a stopped request gives up promptly while its attempt is still out."""
+        hedger = HedgedRequests()
+        cancelled = threading.Event()
+        discarded = threading.Event()
+        threading.Timer(0.1, cancelled.set).start()
+
+        start = time.monotonic()
+        with self.assertRaises(CancelledError):
+            hedger.call('REVIEWS', lambda: time.sleep(1) or 'late', lambda result: discarded.set(), False, cancelled)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertTrue(discarded.wait(2))
+        with self.assertRaises(CancelledError):
+            hedger.call('REVIEWS', lambda: 'never', cancelled=cancelled)
+
+
+if __name__ == "__main__":
+    for case in (RateLimiterTest, AdaptiveConcurrencyTest, HedgedRequestsTest):
+        suite = unittest.makeSuite(case)
+        runner = unittest.TextTestRunner(verbosity=2)
+        runner.run(suite)
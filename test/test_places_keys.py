@@ -0,0 +1,82 @@
+# coding=utf-8
+"""Api key pool test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import time
+import unittest
+
+import places_keys
+from places_keys import KeyPool, parse_keys, key_label, is_daily_quota
+
+
+class KeyPoolTest(unittest.TestCase):
+    """Test requests rotate over the keys still in service."""
+
+    def test_parse_keys(self):
+        """Test keys are split on separators and deduplicated."""
+        self.assertEqual(parse_keys(' a, b;c\nb '), ['a', 'b', 'c'])
+        self.assertEqual(parse_keys(''), [])
+
+    def test_round_robin(self):
+        """Test keys are handed out in turn."""
+        pool = KeyPool(['a', 'b'])
+        self.assertEqual([pool.acquire() for _ in range(4)], ['a', 'b', 'a', 'b'])
+
+    def test_retired_key_is_skipped(self):
+        """Test a retired key is no longer used and an empty pool yields None."""
+        pool = KeyPool(['a', 'b'])
+        pool.retire('a', 'OVER_QUERY_LIMIT')
+        self.assertEqual([pool.acquire() for _ in range(3)], ['b', 'b', 'b'])
+        self.assertEqual(pool.active(), ['b'])
+
+        pool.retire('b', 'REQUEST_DENIED')
+        self.assertIsNone(pool.acquire())
+        self.assertIsNone(KeyPool([]).acquire())
+
+    def test_throttled_key_comes_back(self):
+        """Test a throttled key sits out its backoff, doubling in a row, and is never retired for it."""
+        pool = KeyPool(['a'])
+        pool.bench('a', 'OVER_QUERY_LIMIT')
+        self.assertIsNone(pool.acquire())
+        self.assertAlmostEqual(pool.wait_time(), places_keys.BENCH_DELAY, delta=0.1)
+
+        # answers of requests already out do not extend the backoff
+        pool.bench('a', 'OVER_QUERY_LIMIT')
+        self.assertEqual(pool.strikes['a'], 1)
+
+        pool.benched['a'] = time.monotonic()
+        self.assertEqual(pool.acquire(), 'a')
+        pool.bench('a', 'OVER_QUERY_LIMIT')
+        self.assertAlmostEqual(pool.wait_time(), 2 * places_keys.BENCH_DELAY, delta=0.1)
+
+        pool.benched['a'] = time.monotonic()
+        pool.succeeded('a')
+        self.assertEqual(pool.strikes, {})
+        self.assertEqual(pool.active(), ['a'])
+
+    def test_daily_quota(self):
+        """Test only an exhausted daily quota is told apart from short throttling."""
+        self.assertTrue(is_daily_quota('OVER_QUERY_LIMIT', 'You have exceeded your daily request quota for this API.'))
+        self.assertTrue(is_daily_quota('RESOURCE_EXHAUSTED', "Quota exceeded for quota metric 'Requests' per day"))
+        self.assertFalse(is_daily_quota('RESOURCE_EXHAUSTED', "Quota exceeded for quota metric 'Requests' per minute"))
+        self.assertFalse(is_daily_quota('REQUEST_DENIED', 'daily'))
+
+    def test_key_label(self):
+        """Test labels keep only the end of a key."""
+        self.assertEqual(key_label('AIzaSy0123456789'), '...456789')
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(KeyPoolTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,86 @@
+# coding=utf-8
+"""Places model and xlsx export test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import os
+import tempfile
+import unittest
+
+from places_model import Place
+from places_export import write_xlsx
+
+
+def nearby_result(place_id, types=('cafe', 'food')):
+    return {
+        'geometry': {'location': {'lat': 22.5, 'lng': 88.3}},
+        'name': f"place {place_id}",
+        'place_id': place_id,
+        'types': list(types),
+        'vicinity': 'unused'
+    }
+
+
+DETAILS_RESULT = {
+    'reviews': [
+        {'author_name': 'alice', 'text': 'good', 'time': 1650000000, 'rating': 5},
+        {'author_name': 'bob', 'text': 'bad', 'time': 1650000100, 'rating': 1}
+    ],
+    'photos': [
+        {'photo_reference': 'ref1', 'width': 4000, 'height': 3000, 'html_attributions': []}
+    ]
+}
+
+
+class PlacesModelTest(unittest.TestCase):
+    """Test the compact places model."""
+
+    def test_from_nearby(self):
+        """Test only used nearby fields are kept."""
+        place = Place.from_nearby(nearby_result('a'))
+        self.assertEqual(place.place_id, 'a')
+        self.assertEqual(place.types, ('cafe', 'food'))
+        self.assertEqual(place.reviews, ())
+        self.assertFalse(hasattr(place, '__dict__'))
+
+    def test_types_are_shared(self):
+        """Test identical type lists share one tuple."""
+        a = Place.from_nearby(nearby_result('a'))
+        b = Place.from_nearby(nearby_result('b'))
+        self.assertIs(a.types, b.types)
+
+    def test_set_details(self):
+        """Test reviews and photos are parsed from details."""
+        place = Place.from_nearby(nearby_result('a'))
+        place.set_details(DETAILS_RESULT)
+        self.assertEqual(len(place.reviews), 2)
+        self.assertEqual(place.reviews[0].author_name, 'alice')
+        self.assertEqual(place.photos[0].reference, 'ref1')
+        self.assertEqual(place.reviews_as_dicts()[1], {'author_name': 'bob', 'text': 'bad', 'time': 1650000100})
+
+    def test_write_xlsx(self):
+        """Test the workbook is written and stops when not running."""
+        places = [Place.from_nearby(nearby_result(place_id)) for place_id in 'abc']
+        for place in places:
+            place.set_details(DETAILS_RESULT)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.xlsx')
+            self.assertTrue(write_xlsx(path, places))
+            self.assertTrue(os.path.exists(path))
+            self.assertFalse(write_xlsx(path, places, lambda: False))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(PlacesModelTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,114 @@
+# coding=utf-8
+"""Photo cache test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import os
+import tempfile
+import unittest
+
+from places_model import Photo
+from places_photos import PhotoCache, PhotoStore, photo_filename, fit_photo, THUMBNAIL_DIR, PHOTO_STORE_NAME
+
+
+class FakeResponse:
+    status_code = 200
+    content = b'jpeg'
+
+
+class FakeApi:
+    def __init__(self):
+        self.requests = []
+
+    def photo(self, photo, maxwidth, maxheight):
+        self.requests.append((photo.reference, maxwidth, maxheight))
+        return FakeResponse()
+
+
+class PhotoCacheTest(unittest.TestCase):
+    """Test photos are fetched once, at thumbnail size."""
+
+    def test_fit_photo(self):
+        """Test requested sizes are capped, never enlarged, and kept without a cap."""
+        self.assertEqual(fit_photo(Photo('r', 4000, 3000), 1600), (1600, 1600))
+        self.assertEqual(fit_photo(Photo('r', 800, 600), 1600), (800, 600))
+        self.assertEqual(fit_photo(Photo('r', 0, 0), 400), (400, 400))
+        self.assertEqual(fit_photo(Photo('r', 4000, 3000)), (4000, 3000))
+
+    def test_fetch_once_at_thumbnail_size(self):
+        """Test a photo is fetched scaled down and served from disk afterwards."""
+        with tempfile.TemporaryDirectory() as outputDirName:
+            api = FakeApi()
+            cache = PhotoCache(outputDirName, api, size=400)
+            photos = [Photo('ref1', 4000, 3000), Photo('ref2', 200, 100)]
+
+            self.assertEqual(cache.images('p', photos), [b'jpeg', b'jpeg'])
+            self.assertEqual(api.requests, [('ref1', 400, 400), ('ref2', 200, 100)])
+            self.assertTrue(os.path.exists(os.path.join(outputDirName, THUMBNAIL_DIR, photo_filename('p', 2))))
+
+            cache.images('p', photos)
+            self.assertEqual(len(api.requests), 2)
+
+    def test_saved_photos_are_reused(self):
+        """Test photos saved by the harvest are not fetched again."""
+        with tempfile.TemporaryDirectory() as outputDirName:
+            with open(os.path.join(outputDirName, photo_filename('p', 1)), 'wb') as f:
+                f.write(b'saved')
+            api = FakeApi()
+
+            images = PhotoCache(outputDirName, api).images('p', [Photo('ref1', 10, 10)], limit=1)
+            self.assertEqual(images, [b'saved'])
+            self.assertEqual(api.requests, [])
+
+
+class PhotoStoreTest(unittest.TestCase):
+    """Test the packed photo store."""
+
+    def test_put_get_dedup(self):
+        """Test photos are found by place and index and identical images stored once."""
+        with tempfile.TemporaryDirectory() as dirName:
+            store = PhotoStore(os.path.join(dirName, PHOTO_STORE_NAME))
+            store.put('a', 1, b'one')
+            store.put('a', 2, b'two')
+            store.put('b', 1, b'one')
+
+            self.assertEqual(store.get('a', 2), b'two')
+            self.assertEqual(store.get('b', 1), b'one')
+            self.assertIsNone(store.get('c', 1))
+            self.assertEqual(len(store), 3)
+            self.assertEqual(store.count_blobs(), 2)
+
+            self.assertEqual(store.extract(dirName), 3)
+            with open(os.path.join(dirName, photo_filename('b', 1)), 'rb') as f:
+                self.assertEqual(f.read(), b'one')
+            store.close()
+
+    def test_cache_fills_store(self):
+        """Test lazily fetched photos go into the store when there is one."""
+        with tempfile.TemporaryDirectory() as dirName:
+            store = PhotoStore(os.path.join(dirName, PHOTO_STORE_NAME))
+            api = FakeApi()
+            cache = PhotoCache(dirName, api, store=store)
+
+            cache.images('p', [Photo('ref1', 10, 10)])
+            cache.images('p', [Photo('ref1', 10, 10)])
+            self.assertEqual(len(api.requests), 1)
+            self.assertEqual(store.get('p', 1), b'jpeg')
+            self.assertFalse(os.path.exists(os.path.join(dirName, THUMBNAIL_DIR)))
+            store.close()
+
+
+if __name__ == "__main__":
+    for case in (PhotoCacheTest, PhotoStoreTest):
+        suite = unittest.makeSuite(case)
+        runner = unittest.TextTestRunner(verbosity=2)
+        runner.run(suite)
@@ -0,0 +1,62 @@
+# coding=utf-8
+"""Retry queue test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import unittest
+
+from places_model import Place, Photo
+from places_retry import RetryQueue, DETAILS, PHOTO, http_status, error_status
+
+
+class RetryQueueTest(unittest.TestCase):
+    """Test failed requests are kept for a retry and reported."""
+
+    def test_only_transient_failures_are_retried(self):
+        """Test timeouts and server errors are retried while denied or unknown places are not."""
+        queue = RetryQueue()
+        place = Place(22.5, 88.3, 'name', 'a', ('cafe',))
+        queue.add(DETAILS, 'a', place, 'TIMEOUT')
+        queue.add(DETAILS, 'b', Place(22.5, 88.3, 'name', 'b', ('cafe',)), 'NOT_FOUND')
+        queue.add(PHOTO, 'a', Photo('ref', 10, 20), http_status(503), 1)
+        queue.add(PHOTO, 'a', Photo('ref2', 10, 20), http_status(400), 2)
+
+        self.assertEqual([failure.item for failure in queue.retryable(DETAILS)], [place])
+        self.assertEqual([failure.index for failure in queue.retryable(PHOTO)], [1])
+        self.assertEqual(queue.count_by_status(), {'TIMEOUT': 1, 'NOT_FOUND': 1, 'HTTP_503': 1, 'HTTP_400': 1})
+
+    def test_retry_outcome(self):
+        """Test a request failing again counts an attempt and one that went through leaves the queue."""
+        queue = RetryQueue()
+        queue.add(DETAILS, 'a', Place(22.5, 88.3, 'name', 'a', ('cafe',)), 'TIMEOUT')
+        queue.add(PHOTO, 'a', Photo('ref', 10, 20), 'CONNECTION_ERROR', 1)
+
+        queue.add(DETAILS, 'a', None, 'OVER_QUERY_LIMIT')
+        queue.discard(PHOTO, 'a', 1)
+
+        remaining = queue.remaining()
+        self.assertEqual(len(queue), 1)
+        self.assertEqual([(failure.kind, failure.status, failure.attempts) for failure in remaining], [(DETAILS, 'OVER_QUERY_LIMIT', 2)])
+
+
+    def test_error_status(self):
+        """Test unexpected exceptions are classed by their type and never retried."""
+        queue = RetryQueue()
+        queue.add(DETAILS, 'a', Place(22.5, 88.3, 'name', 'a', ('cafe',)), error_status(ValueError('not json')))
+        self.assertEqual(queue.count_by_status(), {'ValueError': 1})
+        self.assertEqual(queue.retryable(DETAILS), [])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(RetryQueueTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,108 @@
+# coding=utf-8
+"""Harvest store test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import os
+import tempfile
+import unittest
+
+from places_model import Place, Review, Photo, HarvestJob, StoredReviews
+from places_store import HarvestStore, SpillStore, HARVEST_STORE_NAME
+
+
+def make_place(user_ratings_total=10, reviews=(), photos=()):
+    return Place(22.5, 88.3, 'name', 'a', ('cafe', 'food'), 4.2, user_ratings_total, reviews, photos)
+
+
+class HarvestStoreTest(unittest.TestCase):
+    """Test incremental merging of harvested places."""
+
+    def setUp(self):
+        self.dirName = tempfile.TemporaryDirectory()
+        self.store = HarvestStore(os.path.join(self.dirName.name, HARVEST_STORE_NAME))
+
+    def tearDown(self):
+        self.store.close()
+        self.dirName.cleanup()
+
+    def test_unknown_place_is_changed(self):
+        """Test places never stored need their details."""
+        self.assertIsNone(self.store.ratings_total('a'))
+        self.assertFalse(self.store.is_unchanged(make_place()))
+
+    def test_merge_adds_only_new_reviews(self):
+        """Test reviews are deduplicated by author and time across harvests."""
+        first = make_place(10, [Review('alice', 'good', 100), Review('bob', 'bad', 200)], [Photo('ref', 10, 20)])
+        self.assertEqual(self.store.merge(first), 2)
+        self.assertTrue(self.store.is_unchanged(make_place(10)))
+        self.assertFalse(self.store.is_unchanged(make_place(11)))
+
+        second = make_place(11, [Review('bob', 'bad', 200), Review('carol', 'ok', 300)])
+        self.assertEqual(self.store.merge(second), 1)
+
+        self.assertEqual([row[0] for row in self.store.reviews('a')], ['carol', 'bob', 'alice'])
+
+        # an edited review replaces the stored text without counting as new
+        self.assertEqual(self.store.merge(make_place(11, [Review('bob', 'not that bad', 200)])), 0)
+        self.assertEqual(self.store.reviews('a')[1], ('bob', 'not that bad', 200))
+        self.assertEqual(self.store.photos('a'), [('ref', 10, 20)])
+        self.assertEqual(self.store.ratings_total('a'), 11)
+        self.assertEqual(len(self.store), 1)
+
+    def test_load_harvest(self):
+        """Test a recorded harvest is reopened with its jobs and places."""
+        self.store.merge(make_place(10, [Review('alice', 'good', 100), Review('bob', 'bad', 200)], [Photo('ref', 10, 20)]))
+        job = HarvestJob(22.5, 88.3, 2, 'cafe', 20, [[(88.0, 22.0), (88.5, 22.0), (88.5, 22.5)]], 'kolkata')
+        harvestId = self.store.add_harvest('cafe around kolkata', [job.to_dict()], ['a'], {'packPhotos': False})
+
+        self.assertEqual([row[0:2] + row[3:] for row in self.store.harvests()], [(harvestId, 'cafe around kolkata', 1)])
+
+        label, jobs, settings, places = self.store.load_harvest(harvestId)
+        self.assertEqual(label, 'cafe around kolkata')
+        self.assertEqual(HarvestJob(**jobs[0]).name, 'kolkata')
+        self.assertEqual(jobs[0]['polygon'], [[[88.0, 22.0], [88.5, 22.0], [88.5, 22.5]]])
+        self.assertEqual(settings, {'packPhotos': False})
+        self.assertEqual(places, [('a', 'name', 22.5, 88.3, ('cafe', 'food'), 4.2, 10)])
+        self.assertIsNone(self.store.load_harvest(harvestId + 1))
+
+
+class SpillStoreTest(unittest.TestCase):
+    """Test reviews spilled past the memory budget."""
+
+    def test_spilled_reviews_read_back(self):
+        """Test spilled reviews read back in order, a place spilled again replaces them, and the file goes on close."""
+        store = SpillStore()
+        self.assertEqual(store.reviews('a'), [])
+        reviews = [Review('bob', 'bad', 200), Review('alice', 'good', 100), Review('bob', 'bad', 200)]
+        place = make_place(reviews=reviews)
+        place.reviews = StoredReviews(store, 'a', store.put('a', place.reviews))
+
+        self.assertEqual(len(place.reviews), 3)
+        self.assertEqual(place.reviews_as_dicts(), [review.to_dict() for review in reviews])
+        self.assertEqual(store.reviews('b'), [])
+
+        # a place spilled again replaces its reviews
+        self.assertEqual(store.put('a', reviews[:1]), 1)
+        self.assertEqual(store.reviews('a'), [('bob', 'bad', 200)])
+
+        path = store.path
+        self.assertTrue(os.path.exists(path))
+        store.close()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    for case in (HarvestStoreTest, SpillStoreTest):
+        suite = unittest.makeSuite(case)
+        runner = unittest.TextTestRunner(verbosity=2)
+        runner.run(suite)
@@ -0,0 +1,125 @@
+# coding=utf-8
+"""Search tile cache test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import unittest
+
+import numpy as np
+
+from geodesy import haversine
+from places_model import Place, Review, Photo
+from utilities import plugin_module
+
+SearchTileCache = plugin_module('places_tiles').SearchTileCache
+
+LAT, LONG = 22.55, 88.35
+QUERY = ('legacy', 'cafe', ())
+
+
+def grid_places(lat, long, radius, count=400):
+    # places spread over the square around a circle, some of them outside it
+    rng = np.random.default_rng(0)
+    degrees = radius / 111000
+    lats = lat + rng.uniform(-degrees, degrees, count)
+    longs = long + rng.uniform(-degrees, degrees, count)
+    return [Place(placeLat, placeLong, f"place {i}", f"id{i}", ['cafe']) for i, (placeLat, placeLong) in enumerate(zip(lats, longs))]
+
+
+def ids_within(places, lat, long, radius):
+    inside = haversine(lat, long, [place.lat for place in places], [place.long for place in places]) <= radius
+    return {place.place_id for place, keep in zip(places, inside) if keep}
+
+
+class SearchTileCacheTest(unittest.TestCase):
+    """Test complete searches answer later searches of the area they covered."""
+
+    def setUp(self):
+        self.places = grid_places(LAT, LONG, 3000)
+        self.cache = SearchTileCache()
+        self.cache.put(QUERY, LAT, LONG, 3000, [place for place in self.places
+                                                if place.place_id in ids_within(self.places, LAT, LONG, 3000)])
+
+    def test_same_circle(self):
+        """Test a searched circle is answered from the cache without a gap."""
+        places, gap = self.cache.lookup(QUERY, LAT, LONG, 3000)
+        self.assertIsNone(gap)
+        self.assertEqual({place.place_id for place in places}, ids_within(self.places, LAT, LONG, 3000))
+
+    def test_enclosed_circle(self):
+        """Test a circle inside a searched one gets the places within it only."""
+        places, gap = self.cache.lookup(QUERY, LAT + 0.005, LONG, 1000)
+        self.assertIsNone(gap)
+        self.assertEqual({place.place_id for place in places}, ids_within(self.places, LAT + 0.005, LONG, 1000))
+
+    def test_gap(self):
+        """Test a circle mostly covered by two searches is left a smaller gap covering the rest."""
+        west = LONG - 3000 / 103000
+        self.cache.put(QUERY, LAT, west, 3000, [place for place in self.places
+                                                if place.place_id in ids_within(self.places, LAT, west, 3000)])
+        lat, long = LAT + 1000 / 111000, LONG - 1500 / 103000
+        places, gap = self.cache.lookup(QUERY, lat, long, 2000)
+        self.assertIsNotNone(gap)
+        gapLat, gapLong, gapRadius = gap
+        self.assertLess(gapRadius, 2000)
+
+        # every place of the circle comes from the cache or lies in the gap
+        cached = {place.place_id for place in places}
+        inCircle = ids_within(self.places, lat, long, 2000)
+        self.assertTrue(0 < len(cached) and cached <= inCircle)
+        for place in self.places:
+            if place.place_id in inCircle and place.place_id not in cached:
+                self.assertLessEqual(haversine(gapLat, gapLong, place.lat, place.long), gapRadius)
+
+    def test_uncovered_circle(self):
+        """Test a circle far from any search is searched whole."""
+        places, gap = self.cache.lookup(QUERY, LAT + 0.2, LONG, 1000)
+        self.assertEqual(places, [])
+        self.assertEqual(gap, (LAT + 0.2, LONG, 1000))
+
+    def test_queries_do_not_mix(self):
+        """Test places of one query never answer another."""
+        places, gap = self.cache.lookup(('legacy', 'bar', ()), LAT, LONG, 3000)
+        self.assertEqual(places, [])
+        self.assertEqual(gap, (LAT, LONG, 3000))
+
+    def test_expiry(self):
+        """Test expired searches answer nothing."""
+        cache = SearchTileCache(ttl=-1)
+        cache.put(QUERY, LAT, LONG, 3000, self.places)
+        places, gap = cache.lookup(QUERY, LAT, LONG, 1000)
+        self.assertEqual(places, [])
+        self.assertEqual(gap, (LAT, LONG, 1000))
+        self.assertEqual(len(cache.circles[QUERY]), 1)
+
+    def test_basic_fields_only(self):
+        """Test details filled in after a search neither stay in the cache nor reach later lookups."""
+        place = Place(LAT, LONG, "centre", "centre", ['cafe'])
+        cache = SearchTileCache()
+        cache.put(QUERY, LAT, LONG, 1000, [place])
+
+        place.reviews = (Review('a', 'good', 0),)
+        place.photos = (Photo('ref', 100, 100),)
+        cached, _ = cache.lookup(QUERY, LAT, LONG, 1000)
+        self.assertEqual([found.place_id for found in cached], ['centre'])
+        self.assertEqual((cached[0].reviews, cached[0].photos), ((), ()))
+
+        # a lookup result filled in by one harvest is not seen by the next
+        cached[0].reviews = (Review('b', 'bad', 0),)
+        cached, _ = cache.lookup(QUERY, LAT, LONG, 1000)
+        self.assertEqual(cached[0].reviews, ())
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SearchTileCacheTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
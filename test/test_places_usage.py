@@ -0,0 +1,63 @@
+# coding=utf-8
+"""Api usage store test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'arkaprava.mail@gmail.com'
+__date__ = '2026-10-19'
+__copyright__ = 'Copyright 2022, Arka'
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from places_usage import read_usage, add_usage
+
+
+class UsageStoreTest(unittest.TestCase):
+    """Test usage reports add up in the store and start over each month."""
+
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+        self.filePath = os.path.join(self.dirName, 'usage.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def test_empty_store(self):
+        """Test a missing store reads as no usage."""
+        self.assertEqual(read_usage(self.filePath), ({'NEARBY': 0, 'REVIEWS': 0, 'PHOTOS': 0}, {}, None))
+
+    def test_reports_add_up(self):
+        """Test totals and per key counts of several reports are summed."""
+        usage = {'NEARBY': 2, 'REVIEWS': 5, 'KEYS': {'...abcdef': {'NEARBY': 2, 'REVIEWS': 5}}}
+        self.assertTrue(add_usage(self.filePath, usage))
+        self.assertTrue(add_usage(self.filePath, usage))
+
+        totals, keys, month = read_usage(self.filePath)
+        self.assertEqual(totals, {'NEARBY': 4, 'REVIEWS': 10, 'PHOTOS': 0})
+        self.assertEqual(keys, {'...abcdef': {'NEARBY': 4, 'REVIEWS': 10, 'PHOTOS': 0}})
+        self.assertEqual(month, datetime.now().month)
+
+    def test_new_month_starts_over(self):
+        """Test counts of an earlier month are dropped."""
+        with open(self.filePath, 'w') as f:
+            f.write(f"NEARBY=7\nREVIEWS=1\nPHOTOS=3\nKEY:...abcdef:NEARBY=7\nLASTDATE={datetime.now().month % 12 + 1}")
+        add_usage(self.filePath, {'PHOTOS': 1})
+
+        totals, keys, _ = read_usage(self.filePath)
+        self.assertEqual(totals, {'NEARBY': 0, 'REVIEWS': 0, 'PHOTOS': 1})
+        self.assertEqual(keys, {})
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(UsageStoreTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
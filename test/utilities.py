@@ -1,8 +1,11 @@
 # coding=utf-8
 """Common functionality used by regression tests."""
 
+import os
 import sys
+import types
 import logging
+import importlib
 
 
 LOGGER = logging.getLogger('QGIS')
@@ -11,6 +14,22 @@ CANVAS = None
 PARENT = None
 IFACE = None
 
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_PACKAGE = 'placesforqgis'
+
+
+def plugin_module(name):
+    """Import a plugin module that uses relative imports.
+
+    The plugin folder is registered as a package without running its
+    __init__, which needs QGIS.
+    """
+    if PLUGIN_PACKAGE not in sys.modules:
+        package = types.ModuleType(PLUGIN_PACKAGE)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[PLUGIN_PACKAGE] = package
+    return importlib.import_module(f"{PLUGIN_PACKAGE}.{name}")
+
 
 def get_qgis_app():
     """ Start one QGIS application to test against.